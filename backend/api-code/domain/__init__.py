@@ -1,3 +1,11 @@
-from .deploy_states import DEFAULT_STATUS_SEQUENCE, DeployStatus, is_valid_transition
+from .deploy_jobs import DeployJobKind, DeployJobState
+from .deploy_states import DEFAULT_STATUS_SEQUENCE, DeployStatus, allowed_predecessors, is_valid_transition
 
-__all__ = ["DEFAULT_STATUS_SEQUENCE", "DeployStatus", "is_valid_transition"]
+__all__ = [
+    "DEFAULT_STATUS_SEQUENCE",
+    "DeployJobKind",
+    "DeployJobState",
+    "DeployStatus",
+    "allowed_predecessors",
+    "is_valid_transition",
+]
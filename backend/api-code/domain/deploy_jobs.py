@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from enum import Enum
+
+
+class DeployJobKind(str, Enum):
+    DEPLOY = "deploy"
+    ROLLBACK = "rollback"
+
+
+class DeployJobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    @property
+    def is_finished(self) -> bool:
+        return self in {DeployJobState.DONE, DeployJobState.FAILED}
@@ -42,3 +42,8 @@ def is_valid_transition(current: DeployStatus, new: DeployStatus) -> bool:
     except ValueError:
         return False
     return new_index >= current_index
+
+
+def allowed_predecessors(new: DeployStatus) -> tuple[DeployStatus, ...]:
+    """Statuses a task may currently hold for a move to ``new`` (used as a write filter)."""
+    return tuple(status for status in DeployStatus if is_valid_transition(status, new))
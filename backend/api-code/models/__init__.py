@@ -1,9 +1,27 @@
-from .deploy import DeployReport, DeployTask, DeployTaskCreate, DeployTaskUpdate, utc_now
+from .deploy import (
+    TASK_SUMMARY_METADATA_KEYS,
+    DeployJob,
+    DeployLogChunk,
+    DeployPreview,
+    DeployReport,
+    DeployTask,
+    DeployTaskCreate,
+    DeployTaskQuery,
+    DeployTaskUpdate,
+    LLMPreviewMemo,
+    utc_now,
+)
 
 __all__ = [
+    "TASK_SUMMARY_METADATA_KEYS",
+    "DeployJob",
+    "DeployLogChunk",
+    "DeployPreview",
     "DeployReport",
     "DeployTask",
     "DeployTaskCreate",
+    "DeployTaskQuery",
     "DeployTaskUpdate",
+    "LLMPreviewMemo",
     "utc_now",
 ]
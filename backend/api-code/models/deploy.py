@@ -1,13 +1,19 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import hashlib
+import zlib
+from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, Optional
 
 from pydantic import BaseModel, Field
 
+from domain.deploy_jobs import DeployJobKind, DeployJobState
 from domain.deploy_states import DeployStatus
 
 
+LOG_CHUNK_COMPRESSION_LEVEL = 6
+
+
 def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -22,6 +28,10 @@ class MongoModel(BaseModel):
     }
 
 
+# Fields ``DeployTask.from_trusted`` copies only when present; the rest are required.
+_TASK_OPTIONAL_FIELDS = ("completed_at", "error_log", "metadata", "revision")
+
+
 class DeployTask(MongoModel):
     task_id: str = Field(..., alias="_id", description="Primary identifier (UUID).")
     status: DeployStatus = Field(..., description="Current execution state.")
@@ -37,6 +47,9 @@ class DeployTask(MongoModel):
     metadata: Dict[str, Any] = Field(
         default_factory=dict, description="Arbitrary metadata per stage."
     )
+    revision: int = Field(
+        default=0, description="Bumped by every write to the document (the task's version)."
+    )
 
     def to_mongo(self) -> dict[str, Any]:
         payload = self.model_dump(by_alias=True, exclude_none=True)
@@ -51,6 +64,19 @@ class DeployTask(MongoModel):
             data["task_id"] = data.pop("_id")
         return cls.model_validate(data)
 
+    @classmethod
+    def from_trusted(cls, document: dict[str, Any]) -> "DeployTask":
+        """Fast path for documents read back from ``deploy_tasks`` (written via ``to_mongo``).
+
+        Skips validation, so use ``from_mongo`` for anything that did not come from
+        our own collection. Projections must keep ``_id``, ``status`` and ``started_at``;
+        other missing fields take their defaults.
+        """
+        values = {name: document[name] for name in _TASK_OPTIONAL_FIELDS if name in document}
+        return cls.model_construct(
+            task_id=document["_id"], status=document["status"], started_at=document["started_at"], **values
+        )
+
     def mark_completed(self) -> "DeployTask":
         self.status = DeployStatus.COMPLETED
         self.completed_at = utc_now()
@@ -63,16 +89,32 @@ class DeployTask(MongoModel):
         return self
 
 
+# Metadata a task list row is built from; stage output (stdout/stderr, live tails) is left out.
+TASK_SUMMARY_METADATA_KEYS: tuple[str, ...] = (
+    "branch",
+    "action",
+    "actor",
+    "requested_by",
+    "summary",
+    "failure_context",
+)
+
+
 class DeployTaskCreate(BaseModel):
     task_id: str
     status: DeployStatus = Field(default=DeployStatus.PENDING)
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    started_at: Optional[datetime] = Field(
+        default=None, description="Defaults to now; set when importing or replaying tasks."
+    )
 
     def to_document(self) -> dict[str, Any]:
+        extra = {"started_at": self.started_at} if self.started_at is not None else {}
         return DeployTask(
             _id=self.task_id,
             status=self.status,
             metadata=self.metadata,
+            **extra,
         ).to_mongo()
 
 
@@ -104,9 +146,50 @@ class DeployTaskUpdate(BaseModel):
             if flattened:
                 update.setdefault("$set", {})
                 update["$set"].update({f"metadata.{key}": value for key, value in flattened.items()})
+        if update:
+            update["$inc"] = {"revision": 1}
         return update
 
 
+class DeployTaskQuery(BaseModel):
+    """Task history filters plus the keyset position (``started_at``, ``_id``) to continue after."""
+
+    branch: Optional[str] = None
+    action: Optional[str] = None
+    status: Optional[DeployStatus] = None
+    started_after: Optional[datetime] = Field(default=None, description="Inclusive lower bound.")
+    started_before: Optional[datetime] = Field(default=None, description="Exclusive upper bound.")
+    after_started_at: Optional[datetime] = None
+    after_task_id: Optional[str] = None
+
+    @property
+    def has_position(self) -> bool:
+        return self.after_started_at is not None and self.after_task_id is not None
+
+    def to_filter(self) -> dict[str, Any]:
+        query: dict[str, Any] = {}
+        if self.branch:
+            query["metadata.branch"] = self.branch
+        if self.action:
+            query["metadata.action"] = self.action
+        if self.status is not None:
+            query["status"] = self.status.value
+        started_range: dict[str, Any] = {}
+        if self.started_after is not None:
+            started_range["$gte"] = self.started_after
+        if self.started_before is not None:
+            started_range["$lt"] = self.started_before
+        if started_range:
+            query["started_at"] = started_range
+        if self.has_position:
+            # Strictly after the last row of the previous page in (started_at desc, _id desc) order.
+            query["$or"] = [
+                {"started_at": {"$lt": self.after_started_at}},
+                {"started_at": self.after_started_at, "_id": {"$lt": self.after_task_id}},
+            ]
+        return query
+
+
 def _flatten_metadata_updates(values: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
     flattened: Dict[str, Any] = {}
     for key, value in values.items():
@@ -118,6 +201,80 @@ def _flatten_metadata_updates(values: Dict[str, Any], prefix: str = "") -> Dict[
     return flattened
 
 
+class DeployJob(MongoModel):
+    """Durable queue entry driving one deploy/rollback task (``_id`` == task id)."""
+
+    job_id: str = Field(..., alias="_id", description="Same identifier as the deploy task.")
+    kind: DeployJobKind = Field(default=DeployJobKind.DEPLOY)
+    branch: str = Field(..., description="Branch the pipeline runs against.")
+    payload: Dict[str, Any] = Field(
+        default_factory=dict, description="Extra run_pipeline arguments (e.g. rollback commits)."
+    )
+    state: DeployJobState = Field(default=DeployJobState.QUEUED)
+    enqueued_at: datetime = Field(default_factory=utc_now)
+    claimed_at: Optional[datetime] = Field(default=None)
+    lease_expires_at: Optional[datetime] = Field(
+        default=None, description="Running jobs whose lease lapsed are reclaimed by another worker."
+    )
+    worker_id: Optional[str] = Field(default=None)
+    attempts: int = Field(default=0, description="Number of times the job has been claimed.")
+    coalesced: int = Field(default=0, description="Later requests folded into this job before it started.")
+    finished_at: Optional[datetime] = Field(default=None)
+    error: Optional[str] = Field(default=None)
+
+    def to_mongo(self) -> dict[str, Any]:
+        return self.model_dump(by_alias=True, exclude_none=True)
+
+    @classmethod
+    def from_mongo(cls, document: dict[str, Any]) -> "DeployJob":
+        data = {**document}
+        if "_id" in data and "job_id" not in data:
+            data["job_id"] = data.pop("_id")
+        return cls.model_validate(data)
+
+
+class DeployLogChunk(MongoModel):
+    """zlib-compressed, sequence-numbered slice of one step's stdout or stderr."""
+
+    chunk_id: str = Field(..., alias="_id", description="'<task_id>:<step_id>:<seq>'.")
+    task_id: str = Field(..., description="Foreign key to deploy_tasks._id.")
+    step_id: str = Field(..., description="Identifier referenced by the step's log_ref metadata.")
+    stream: str = Field(..., description="'stdout' or 'stderr'.")
+    seq: int = Field(..., description="Write order within the step.")
+    first_line: int = Field(..., description="Stream line number of the first line in the chunk.")
+    end_line: int = Field(..., description="Stream line number after the last line (exclusive).")
+    data: bytes = Field(..., description="zlib-compressed, newline-joined UTF-8 lines.")
+    created_at: datetime = Field(default_factory=utc_now)
+
+    @classmethod
+    def build(
+        cls, task_id: str, step_id: str, stream: str, seq: int, first_line: int, lines: list[str]
+    ) -> "DeployLogChunk":
+        return cls(
+            _id=f"{task_id}:{step_id}:{seq}",
+            task_id=task_id,
+            step_id=step_id,
+            stream=stream,
+            seq=seq,
+            first_line=first_line,
+            end_line=first_line + len(lines),
+            data=zlib.compress("\n".join(lines).encode(), LOG_CHUNK_COMPRESSION_LEVEL),
+        )
+
+    def lines(self) -> list[str]:
+        return zlib.decompress(self.data).decode(errors="replace").split("\n")
+
+    def to_mongo(self) -> dict[str, Any]:
+        return self.model_dump(by_alias=True, exclude_none=True)
+
+    @classmethod
+    def from_mongo(cls, document: dict[str, Any]) -> "DeployLogChunk":
+        data = {**document}
+        if "_id" in data and "chunk_id" not in data:
+            data["chunk_id"] = data.pop("_id")
+        return cls.model_validate(data)
+
+
 class DeployReport(MongoModel):
     report_id: str = Field(..., alias="_id")
     task_id: str = Field(..., description="Foreign key to deploy_tasks._id.")
@@ -133,3 +290,71 @@ class DeployReport(MongoModel):
         if "_id" in data and "report_id" not in data:
             data["report_id"] = data.pop("_id")
         return cls.model_validate(data)
+
+    @classmethod
+    def from_trusted(cls, document: dict[str, Any]) -> "DeployReport":
+        """Unvalidated counterpart of ``from_mongo`` for documents from ``deploy_reports``."""
+        return cls.model_construct(
+            report_id=document["_id"],
+            task_id=document["task_id"],
+            metrics=document.get("metrics", {}),
+            created_at=document["created_at"],
+        )
+
+
+class DeployPreview(MongoModel):
+    """Diff context for one (base, head) commit pair, shared by /preview, ETA and preflight."""
+
+    preview_key: str = Field(..., alias="_id", description="Hash of the commit pair and preview settings.")
+    base_commit: str = Field(..., description="Commit of the last successful deploy.")
+    head_commit: str = Field(..., description="Commit being previewed.")
+    diff_context: Dict[str, Any] = Field(
+        default_factory=dict, description="Resolved diff (output, stats, source, compare metadata)."
+    )
+    created_at: datetime = Field(default_factory=utc_now)
+    expires_at: datetime = Field(..., description="Dropped by the TTL index after this time.")
+
+    def to_mongo(self) -> dict[str, Any]:
+        return self.model_dump(by_alias=True, exclude_none=True)
+
+    @classmethod
+    def from_mongo(cls, document: dict[str, Any]) -> "DeployPreview":
+        data = {**document}
+        if "_id" in data and "preview_key" not in data:
+            data["preview_key"] = data.pop("_id")
+        return cls.model_validate(data)
+
+
+class LLMPreviewMemo(MongoModel):
+    """Structured LLM preview stored for one (model, normalized prompt) pair."""
+
+    memo_key: str = Field(..., alias="_id", description="sha256 of the model name and normalized prompt.")
+    model: str = Field(..., description="LLM that produced the response.")
+    response: Dict[str, Any] = Field(..., description="Structured preview ({summary, highlights, risks}).")
+    created_at: datetime = Field(default_factory=utc_now)
+    expires_at: datetime = Field(..., description="Dropped by the TTL index after this time.")
+
+    @staticmethod
+    def key_for(model: str, prompt: str) -> str:
+        # Indentation and blank lines do not change what the model is asked.
+        normalized = "\n".join(line.strip() for line in prompt.strip().splitlines() if line.strip())
+        return hashlib.sha256(f"{model}\0{normalized}".encode()).hexdigest()
+
+    @classmethod
+    def build(cls, model: str, prompt: str, response: Dict[str, Any], *, ttl_seconds: float) -> "LLMPreviewMemo":
+        return cls(
+            _id=cls.key_for(model, prompt),
+            model=model,
+            response=response,
+            expires_at=utc_now() + timedelta(seconds=ttl_seconds),
+        )
+
+    def to_mongo(self) -> dict[str, Any]:
+        return self.model_dump(by_alias=True, exclude_none=True)
+
+    @classmethod
+    def from_mongo(cls, document: dict[str, Any]) -> "LLMPreviewMemo":
+        data = {**document}
+        if "_id" in data and "memo_key" not in data:
+            data["memo_key"] = data.pop("_id")
+        return cls.model_validate(data)
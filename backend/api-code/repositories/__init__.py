@@ -1,4 +1,5 @@
+from .caching import CachingDeployTaskRepository
 from .deploy_tasks import DeployTaskRepository
 from .in_memory import InMemoryDeployTaskRepository
 
-__all__ = ["DeployTaskRepository", "InMemoryDeployTaskRepository"]
+__all__ = ["CachingDeployTaskRepository", "DeployTaskRepository", "InMemoryDeployTaskRepository"]
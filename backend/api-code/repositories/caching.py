@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from domain import DeployStatus
+from models import DeployTask, DeployTaskCreate, DeployTaskUpdate
+
+
+class _CachedTask(NamedTuple):
+    task: DeployTask
+    expires_at: float
+
+
+class CachingDeployTaskRepository:
+    """Read-through LRU/TTL cache for ``get_task`` in front of another repository.
+
+    Task documents are written only by this process's pipeline, so every task write
+    goes through here and refreshes (or drops) the cached copy; the TTL bounds how
+    stale a document changed elsewhere can get. Methods not defined here are
+    delegated unchanged.
+    """
+
+    def __init__(
+        self,
+        inner: Any,
+        *,
+        max_entries: int = 256,
+        ttl_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.inner = inner
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self._clock = clock
+        self._entries: "OrderedDict[str, _CachedTask]" = OrderedDict()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    async def get_task(self, task_id: str) -> Optional[DeployTask]:
+        now = self._clock()
+        entry = self._entries.get(task_id)
+        if entry is not None and entry.expires_at > now:
+            self._entries.move_to_end(task_id)
+            self.hits += 1
+            return entry.task.model_copy(deep=True)
+
+        self.misses += 1
+        writes_before = self._writes
+        task = await self.inner.get_task(task_id)
+        if task is None:
+            self._entries.pop(task_id, None)
+            return None
+        if self._writes == writes_before:
+            # Otherwise a write landed while we were reading and the document may predate it.
+            self._store(task)
+        return task.model_copy(deep=True)
+
+    async def get_task_revision(self, task_id: str) -> Optional[int]:
+        """Versioned read: the stored ``revision`` of the task, without copying the document.
+
+        ``revision`` lives in the document and every write bumps it, so it is the same
+        in every process; a cached copy answers without a round trip.
+        """
+        entry = self._entries.get(task_id)
+        if entry is not None and entry.expires_at > self._clock():
+            self._entries.move_to_end(task_id)
+            self.hits += 1
+            return entry.task.revision
+        self.misses += 1
+        return await self.inner.get_task_revision(task_id)
+
+    async def create_task(self, payload: DeployTaskCreate) -> DeployTask:
+        task = await self.inner.create_task(payload)
+        self._refresh(task.task_id, task)
+        return task
+
+    async def update_task(self, task_id: str, update: DeployTaskUpdate) -> Optional[DeployTask]:
+        self._writes += 1
+        task = await self.inner.update_task(task_id, update)
+        self._refresh(task_id, task)
+        return task
+
+    async def mark_status(
+        self, task_id: str, status: DeployStatus, *, error_log: Optional[str] = None
+    ) -> Optional[DeployTask]:
+        self._writes += 1
+        task = await self.inner.mark_status(task_id, status, error_log=error_log)
+        self._refresh(task_id, task)
+        return task
+
+    async def transition_status(
+        self,
+        task_id: str,
+        status: DeployStatus,
+        *,
+        append_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[DeployStatus]:
+        self._writes += 1
+        previous = await self.inner.transition_status(task_id, status, append_metadata=append_metadata)
+        self._writes += 1
+        # Only the previous status comes back, so the next read reloads the document.
+        self._entries.pop(task_id, None)
+        return previous
+
+    def invalidate(self, task_id: Optional[str] = None) -> None:
+        if task_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(task_id, None)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def _refresh(self, task_id: str, task: Optional[DeployTask]) -> None:
+        # Counted on both sides of a write so no overlapping read can cache its result.
+        self._writes += 1
+        if task is None:
+            self._entries.pop(task_id, None)
+            return
+        self._store(task.model_copy(deep=True))
+
+    def _store(self, task: DeployTask) -> None:
+        if not self.ttl_seconds:
+            return
+        self._entries[task.task_id] = _CachedTask(task, self._clock() + self.ttl_seconds)
+        self._entries.move_to_end(task.task_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
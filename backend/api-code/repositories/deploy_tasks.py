@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
 
 try:
     from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
@@ -12,38 +12,93 @@ try:
     from pymongo import ReturnDocument
 except ImportError:  # pragma: no cover - fallback for test environments
     class _ReturnDocument:
+        BEFORE = False
         AFTER = True
 
     ReturnDocument = _ReturnDocument()  # type: ignore
+try:
+    from pymongo import ASCENDING, ReplaceOne
+except ImportError:  # pragma: no cover - fallback for test environments
+    ASCENDING = 1  # type: ignore
+    ReplaceOne = None  # type: ignore
 
 from db.mongo import get_database
-from domain.deploy_states import DeployStatus
-from models.deploy import DeployReport, DeployTask, DeployTaskCreate, DeployTaskUpdate
+from domain.deploy_jobs import DeployJobKind, DeployJobState
+from domain.deploy_states import DeployStatus, allowed_predecessors
+from models.deploy import (
+    TASK_SUMMARY_METADATA_KEYS,
+    DeployJob,
+    DeployLogChunk,
+    DeployPreview,
+    DeployReport,
+    DeployTask,
+    DeployTaskCreate,
+    DeployTaskQuery,
+    DeployTaskUpdate,
+    LLMPreviewMemo,
+)
+from repositories import indexes
+
+
+_TASK_SUMMARY_PROJECTION: Dict[str, Any] = {
+    "status": True,
+    "started_at": True,
+    "completed_at": True,
+    **{f"metadata.{key}": True for key in TASK_SUMMARY_METADATA_KEYS},
+}
+
+
+_TASK_CHANGE_PIPELINE: list[Dict[str, Any]] = [
+    {"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}},
+    # Only the status of new/replaced documents; updates already carry their $set paths.
+    {
+        "$project": {
+            "operationType": True,
+            "documentKey": True,
+            "fullDocument.status": True,
+            "updateDescription.updatedFields": True,
+        }
+    },
+]
 
 
 class DeployTaskRepository:
-    """MongoDB repository handling deploy_tasks and deploy_reports collections."""
+    """MongoDB repository handling deploy_tasks, deploy_reports, deploy_jobs, deploy_log_chunks,
+    deploy_previews and llm_preview_memos."""
 
     def __init__(self, database: Optional[AsyncIOMotorDatabase] = None):
         self._db = database or get_database()
         self._tasks: AsyncIOMotorCollection = self._db["deploy_tasks"]
         self._reports: AsyncIOMotorCollection = self._db["deploy_reports"]
+        self._jobs: AsyncIOMotorCollection = self._db["deploy_jobs"]
+        self._log_chunks: AsyncIOMotorCollection = self._db["deploy_log_chunks"]
+        self._previews: AsyncIOMotorCollection = self._db["deploy_previews"]
+        self._llm_memos: AsyncIOMotorCollection = self._db["llm_preview_memos"]
 
     async def ensure_indexes(self) -> None:
-        await self._tasks.create_index("status")
-        await self._tasks.create_index("started_at")
-        await self._reports.create_index("task_id")
+        await indexes.ensure_catalog_indexes(self._db)
+
+    async def verify_query_plans(self) -> list[Dict[str, Any]]:
+        """Explain every catalogued repository query (see ``repositories.indexes``)."""
+        return await indexes.verify_query_plans(self._db)
 
     async def create_task(self, payload: DeployTaskCreate) -> DeployTask:
         document = payload.to_document()
         await self._tasks.insert_one(document)
-        return DeployTask.from_mongo(document)
+        return DeployTask.from_trusted(document)
 
     async def get_task(self, task_id: str) -> Optional[DeployTask]:
         document = await self._tasks.find_one({"_id": task_id})
         if not document:
             return None
-        return DeployTask.from_mongo(document)
+        return DeployTask.from_trusted(document)
+
+    async def get_task_revision(self, task_id: str) -> Optional[int]:
+        """The task's write counter alone, for callers checking whether it changed."""
+        document = await self._tasks.find_one({"_id": task_id}, projection={"_id": False, "revision": True})
+        if document is None:
+            return None
+        return document.get("revision", 0)
 
     async def update_task(self, task_id: str, update: DeployTaskUpdate) -> Optional[DeployTask]:
         update_query = update.to_update_query()
@@ -57,7 +112,7 @@ class DeployTaskRepository:
         )
         if not document:
             return None
-        return DeployTask.from_mongo(document)
+        return DeployTask.from_trusted(document)
 
     async def mark_status(
         self, task_id: str, status: DeployStatus, *, error_log: Optional[str] = None
@@ -67,16 +122,67 @@ class DeployTaskRepository:
             update.completed_at = datetime.now(timezone.utc)
         return await self.update_task(task_id, update)
 
+    async def transition_status(
+        self,
+        task_id: str,
+        status: DeployStatus,
+        *,
+        append_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[DeployStatus]:
+        """Compare-and-set ``status`` plus ``append_metadata`` in a single write.
+
+        The transition rule is part of the filter, so no read precedes the update and
+        only the previous status is sent back. Returns ``None`` when the task is
+        missing or its current status cannot move to ``status``.
+        """
+        update = DeployTaskUpdate(status=status, append_metadata=append_metadata or {})
+        if status.is_terminal:
+            update.completed_at = datetime.now(timezone.utc)
+        document = await self._tasks.find_one_and_update(
+            {"_id": task_id, "status": {"$in": [value.value for value in allowed_predecessors(status)]}},
+            update.to_update_query(),
+            projection={"_id": False, "status": True},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if not document:
+            return None
+        return DeployStatus(document["status"])
+
+    async def watch_task_changes(
+        self, *, resume_after: Any = None, poll_seconds: float = 1.0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``deploy_tasks`` inserts/updates from a change stream (requires a replica set).
+
+        Each change is ``{task_id, operation, status, updated, resume_token}`` where
+        ``updated`` holds the ``$set`` paths of an update. ``poll_seconds`` is unused
+        here; the server pushes changes.
+        """
+        async with self._tasks.watch(_TASK_CHANGE_PIPELINE, resume_after=resume_after) as stream:
+            async for change in stream:
+                operation = change["operationType"]
+                updated = (change.get("updateDescription") or {}).get("updatedFields") or {}
+                if operation == "update":
+                    status = updated.get("status")
+                else:
+                    status = (change.get("fullDocument") or {}).get("status")
+                yield {
+                    "task_id": change["documentKey"]["_id"],
+                    "operation": "insert" if operation == "insert" else "update",
+                    "status": status,
+                    "updated": updated,
+                    "resume_token": change["_id"],
+                }
+
     async def insert_report(self, report: DeployReport) -> DeployReport:
         document = report.to_mongo()
         await self._reports.insert_one(document)
-        return DeployReport.from_mongo(document)
+        return DeployReport.from_trusted(document)
 
     async def get_report(self, report_id: str) -> Optional[DeployReport]:
         document = await self._reports.find_one({"_id": report_id})
         if not document:
             return None
-        return DeployReport.from_mongo(document)
+        return DeployReport.from_trusted(document)
 
     async def get_recent_successes(self, branch: str, limit: int = 2) -> list[DeployTask]:
         cursor = (
@@ -90,19 +196,213 @@ class DeployTaskRepository:
             .limit(limit)
         )
         documents = await cursor.to_list(length=limit)
-        return [DeployTask.from_mongo(doc) for doc in documents]
+        return [DeployTask.from_trusted(doc) for doc in documents]
 
     async def get_recent_tasks(self, limit: int = 5) -> list[DeployTask]:
         cursor = self._tasks.find().sort("started_at", -1).limit(limit)
         documents = await cursor.to_list(length=limit)
-        return [DeployTask.from_mongo(doc) for doc in documents]
+        return [DeployTask.from_trusted(doc) for doc in documents]
+
+    async def get_recent_task_summaries(self, limit: int = 5) -> list[DeployTask]:
+        return await self.list_task_summaries(DeployTaskQuery(), limit=limit)
+
+    async def list_task_summaries(self, query: DeployTaskQuery, *, limit: int) -> list[DeployTask]:
+        """One keyset page of tasks, newest first, with only the list-view fields projected."""
+        cursor = (
+            self._tasks.find(query.to_filter(), projection=_TASK_SUMMARY_PROJECTION)
+            .sort([("started_at", -1), ("_id", -1)])
+            .limit(limit)
+        )
+        documents = await cursor.to_list(length=limit)
+        return [DeployTask.from_trusted(doc) for doc in documents]
 
     async def get_latest_task(self) -> Optional[DeployTask]:
         cursor = self._tasks.find().sort("started_at", -1).limit(1)
         documents = await cursor.to_list(length=1)
         if not documents:
             return None
-        return DeployTask.from_mongo(documents[0])
+        return DeployTask.from_trusted(documents[0])
+
+    async def insert_log_chunks(self, chunks: Sequence[DeployLogChunk]) -> None:
+        if chunks:
+            await self._log_chunks.insert_many([chunk.to_mongo() for chunk in chunks], ordered=False)
+
+    async def get_log_chunks(
+        self, task_id: str, step_id: str, stream: str, *, from_line: int, to_line: int
+    ) -> list[DeployLogChunk]:
+        """Chunks overlapping stream lines ``[from_line, to_line)``, in line order."""
+        cursor = self._log_chunks.find(
+            {
+                "task_id": task_id,
+                "step_id": step_id,
+                "stream": stream,
+                "end_line": {"$gt": from_line},
+                "first_line": {"$lt": to_line},
+            }
+        ).sort("end_line", ASCENDING)
+        documents = await cursor.to_list(length=None)
+        return [DeployLogChunk.from_mongo(doc) for doc in documents]
+
+    async def get_preview(self, preview_key: str) -> Optional[DeployPreview]:
+        # The TTL monitor runs once a minute, so expired documents may still be present.
+        document = await self._previews.find_one(
+            {"_id": preview_key, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+        if not document:
+            return None
+        return DeployPreview.from_mongo(document)
+
+    async def save_preview(self, preview: DeployPreview) -> None:
+        document = preview.to_mongo()
+        await self._previews.replace_one({"_id": document["_id"]}, document, upsert=True)
+
+    async def get_llm_memo(self, memo_key: str) -> Optional[LLMPreviewMemo]:
+        document = await self._llm_memos.find_one(
+            {"_id": memo_key, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+        if not document:
+            return None
+        return LLMPreviewMemo.from_mongo(document)
+
+    async def save_llm_memo(self, memo: LLMPreviewMemo, *, max_entries: int) -> None:
+        """Store ``memo`` and evict the oldest memos beyond ``max_entries`` (0 = unbounded)."""
+        document = memo.to_mongo()
+        await self._llm_memos.replace_one({"_id": document["_id"]}, document, upsert=True)
+        if not max_entries:
+            return
+        overflow = await self._llm_memos.estimated_document_count() - max_entries
+        if overflow > 0:
+            cursor = self._llm_memos.find({}, projection={"_id": True}).sort("created_at", ASCENDING).limit(overflow)
+            stale = [doc["_id"] for doc in await cursor.to_list(length=overflow)]
+            await self._llm_memos.delete_many({"_id": {"$in": stale}})
+
+    async def enqueue_job(self, job: DeployJob) -> DeployJob:
+        await self._jobs.insert_one(job.to_mongo())
+        return job
+
+    async def coalesce_queued_job(self, branch: str, kind: DeployJobKind) -> Optional[DeployJob]:
+        """Fold a new request into the oldest not-yet-claimed job for ``branch``/``kind``."""
+        document = await self._jobs.find_one_and_update(
+            {"state": DeployJobState.QUEUED.value, "branch": branch, "kind": kind.value},
+            {"$inc": {"coalesced": 1}},
+            sort=[("enqueued_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if not document:
+            return None
+        return DeployJob.from_mongo(document)
+
+    async def discard_queued_job(self, job_id: str, *, error: str) -> bool:
+        """Fail a still-queued job without running it, taking back the request just coalesced into it."""
+        result = await self._jobs.update_one(
+            {"_id": job_id, "state": DeployJobState.QUEUED.value},
+            {
+                "$set": {
+                    "state": DeployJobState.FAILED.value,
+                    "finished_at": datetime.now(timezone.utc),
+                    "error": error,
+                },
+                "$inc": {"coalesced": -1},
+            },
+        )
+        return result.matched_count == 1
+
+    async def claim_next_job(
+        self,
+        worker_id: str,
+        lease_seconds: float,
+        *,
+        exclude_branches: Sequence[str] = (),
+    ) -> Optional[DeployJob]:
+        """Atomically lease the oldest queued job (or one whose lease lapsed) to ``worker_id``."""
+        now = datetime.now(timezone.utc)
+        query: Dict[str, Any] = {
+            "$or": [
+                {"state": DeployJobState.QUEUED.value},
+                {"state": DeployJobState.RUNNING.value, "lease_expires_at": {"$lt": now}},
+            ]
+        }
+        if exclude_branches:
+            query["branch"] = {"$nin": list(exclude_branches)}
+        document = await self._jobs.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "state": DeployJobState.RUNNING.value,
+                    "worker_id": worker_id,
+                    "claimed_at": now,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("enqueued_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if not document:
+            return None
+        return DeployJob.from_mongo(document)
+
+    async def heartbeat_job(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        result = await self._jobs.update_one(
+            {"_id": job_id, "worker_id": worker_id, "state": DeployJobState.RUNNING.value},
+            {"$set": {"lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)}},
+        )
+        return result.matched_count == 1
+
+    async def finish_job(
+        self,
+        job_id: str,
+        worker_id: str,
+        *,
+        state: DeployJobState,
+        error: Optional[str] = None,
+    ) -> bool:
+        update: Dict[str, Any] = {"state": state.value, "finished_at": datetime.now(timezone.utc)}
+        if error is not None:
+            update["error"] = error
+        result = await self._jobs.update_one({"_id": job_id, "worker_id": worker_id}, {"$set": update})
+        return result.matched_count == 1
+
+    async def release_worker_jobs(self, worker_id: str) -> int:
+        """Expire the leases held by ``worker_id`` (used when that worker restarts)."""
+        result = await self._jobs.update_many(
+            {"worker_id": worker_id, "state": DeployJobState.RUNNING.value},
+            {"$set": {"lease_expires_at": datetime.fromtimestamp(0, timezone.utc)}},
+        )
+        return result.modified_count
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        queued = await self._jobs.count_documents({"state": DeployJobState.QUEUED.value})
+        running = await self._jobs.count_documents({"state": DeployJobState.RUNNING.value})
+        oldest = await self._jobs.find_one(
+            {"state": DeployJobState.QUEUED.value},
+            projection={"enqueued_at": 1},
+            sort=[("enqueued_at", ASCENDING)],
+        )
+        return {
+            "queued": queued,
+            "running": running,
+            "oldest_enqueued_at": oldest.get("enqueued_at") if oldest else None,
+        }
+
+    async def restore_snapshot(self, snapshot: Dict[str, list[Any]]) -> Dict[str, int]:
+        """Upsert documents exported from the in-memory fallback; safe to repeat."""
+        collections = {
+            "tasks": self._tasks,
+            "reports": self._reports,
+            "jobs": self._jobs,
+            "log_chunks": self._log_chunks,
+        }
+        counts: Dict[str, int] = {}
+        for name, collection in collections.items():
+            documents = [item.to_mongo() for item in snapshot.get(name, ())]
+            if documents:
+                await collection.bulk_write(
+                    [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents],
+                    ordered=False,
+                )
+            counts[name] = len(documents)
+        return counts
 
     async def ping(self) -> bool:
         try:
@@ -1,32 +1,104 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Dict, Optional
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
 
-from domain import DeployStatus
-from models import DeployReport, DeployTask, DeployTaskCreate, DeployTaskUpdate, utc_now
+from domain import DeployJobKind, DeployJobState, DeployStatus, is_valid_transition
+from models import (
+    TASK_SUMMARY_METADATA_KEYS,
+    DeployJob,
+    DeployLogChunk,
+    DeployPreview,
+    DeployReport,
+    DeployTask,
+    DeployTaskCreate,
+    DeployTaskQuery,
+    DeployTaskUpdate,
+    LLMPreviewMemo,
+    utc_now,
+)
+
+
+_TimelineKey = tuple[datetime, str]
+
+# Task changes kept for ``watch_task_changes`` tailers; one poll interval's worth is plenty.
+TASK_CHANGE_LOG_SIZE = 1024
+
+# Cached previews kept; each is one commit pair, so only the newest few are ever asked for.
+PREVIEW_CACHE_SIZE = 64
 
 
 class InMemoryDeployTaskRepository:
-    """Fallback repository used when MongoDB is unavailable."""
+    """Fallback repository used when MongoDB is unavailable.
+
+    Tasks are indexed the way the Mongo collection is: a ``(started_at, task_id)``
+    timeline and per-branch ``(completed_at, task_id)`` success lists, both kept
+    sorted, so the recent/latest/success lookups touch only the rows they return.
+    Beyond ``max_tasks`` (0 disables the cap) the oldest finished tasks are evicted
+    together with their reports and log files; running tasks are never evicted.
+
+    Log chunks are written to files under ``log_root`` (a temporary directory by
+    default) so large build output does not sit in process memory. LLM preview memos
+    are JSON files under ``memo_root``; pointed at a persistent directory they outlive
+    the process, so a restart without MongoDB does not pay for the same prompts again.
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self, *, log_root: Optional[Path] = None, memo_root: Optional[Path] = None, max_tasks: int = 0
+    ) -> None:
         self._tasks: Dict[str, DeployTask] = {}
         self._reports: Dict[str, DeployReport] = {}
+        self._jobs: Dict[str, DeployJob] = {}
+        # Bumped by every write so a reader can tell whether a snapshot is still current.
+        self.revision = 0
+        self._max_tasks = max(0, max_tasks)
+        self._timeline: list[_TimelineKey] = []
+        self._latest_task_id: Optional[str] = None
+        self._successes: Dict[str, list[_TimelineKey]] = defaultdict(list)
+        # task_id -> (branch, key) of its entry in ``_successes``.
+        self._success_keys: Dict[str, tuple[str, _TimelineKey]] = {}
+        self._task_reports: Dict[str, list[str]] = defaultdict(list)
+        self._finished_jobs: deque[str] = deque()
+        self._changes: deque[tuple[int, Dict[str, Any]]] = deque(maxlen=TASK_CHANGE_LOG_SIZE)
+        self._change_seq = 0
+        self._previews: OrderedDict[str, DeployPreview] = OrderedDict()
+        self._log_root = log_root
+        self._memo_root = memo_root
+        # task_id -> (step_id, stream) -> chunk headers (``data`` stripped) and their files, in line order.
+        self._log_chunks: Dict[str, Dict[tuple[str, str], list[tuple[DeployLogChunk, Path]]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
 
     async def ensure_indexes(self) -> None:  # pragma: no cover - no-op
         return
 
     async def create_task(self, payload: DeployTaskCreate) -> DeployTask:
+        self.revision += 1
         document = payload.to_document()
-        task = DeployTask.from_mongo(document)
-        self._tasks[task.task_id] = task
+        task = DeployTask.from_trusted(document)
+        self._put_task(task)
+        self._evict_overflow()
+        self._record_change(task.task_id, "insert", task.status, {})
         return task
 
     async def get_task(self, task_id: str) -> Optional[DeployTask]:
         return self._tasks.get(task_id)
 
+    async def get_task_revision(self, task_id: str) -> Optional[int]:
+        task = self._tasks.get(task_id)
+        return task.revision if task is not None else None
+
     async def update_task(self, task_id: str, update: DeployTaskUpdate) -> Optional[DeployTask]:
+        self.revision += 1
         task = self._tasks.get(task_id)
         if not task:
             return None
@@ -42,7 +114,11 @@ class InMemoryDeployTaskRepository:
         if update.append_metadata:
             _merge_metadata(task.metadata, update.append_metadata)
 
-        self._tasks[task_id] = task
+        self._index_success(task)
+        updated = update.to_update_query().get("$set", {})
+        if updated:
+            task.revision += 1
+        self._record_change(task_id, "update", updated.get("status"), updated)
         return task
 
     async def mark_status(
@@ -52,6 +128,7 @@ class InMemoryDeployTaskRepository:
         *,
         error_log: Optional[str] = None,
     ) -> Optional[DeployTask]:
+        self.revision += 1
         task = self._tasks.get(task_id)
         if not task:
             return None
@@ -60,10 +137,45 @@ class InMemoryDeployTaskRepository:
             task.error_log = error_log
         if status in (DeployStatus.COMPLETED, DeployStatus.FAILED):
             task.completed_at = utc_now()
-        self._tasks[task_id] = task
+        task.revision += 1
+        self._index_success(task)
+        updated: Dict[str, Any] = {"status": status.value, "completed_at": task.completed_at}
+        if error_log:
+            updated["error_log"] = error_log
+        self._record_change(task_id, "update", status.value, updated)
         return task
 
+    async def transition_status(
+        self,
+        task_id: str,
+        status: DeployStatus,
+        *,
+        append_metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[DeployStatus]:
+        self.revision += 1
+        task = self._tasks.get(task_id)
+        if not task:
+            return None
+        previous = DeployStatus(task.status)
+        if not is_valid_transition(previous, status):
+            return None
+        task.status = status
+        if status.is_terminal:
+            task.completed_at = utc_now()
+        if append_metadata:
+            _merge_metadata(task.metadata, append_metadata)
+        task.revision += 1
+        self._index_success(task)
+        update = DeployTaskUpdate(
+            status=status, append_metadata=append_metadata or {}, completed_at=task.completed_at
+        )
+        self._record_change(task_id, "update", status.value, update.to_update_query()["$set"])
+        return previous
+
     async def insert_report(self, report: DeployReport) -> DeployReport:
+        self.revision += 1
+        if report.report_id not in self._reports:
+            self._task_reports[report.task_id].append(report.report_id)
         self._reports[report.report_id] = report
         return report
 
@@ -71,32 +183,355 @@ class InMemoryDeployTaskRepository:
         return self._reports.get(report_id)
 
     async def get_recent_successes(self, branch: str, limit: int = 2) -> list[DeployTask]:
-        successes = [
-            task
-            for task in self._tasks.values()
-            if task.status == DeployStatus.COMPLETED and task.metadata.get("branch") == branch
-        ]
-        successes.sort(
-            key=lambda t: t.completed_at or utc_now(),
-            reverse=True,
-        )
-        return successes[:limit]
+        entries = self._successes.get(branch, ())
+        return [self._tasks[task_id] for _, task_id in islice(reversed(entries), max(0, limit))]
 
     async def get_recent_tasks(self, limit: int = 5) -> list[DeployTask]:
-        tasks = sorted(
-            self._tasks.values(),
-            key=lambda t: t.started_at,
-            reverse=True,
-        )
-        return tasks[:limit]
+        return [self._tasks[task_id] for _, task_id in islice(reversed(self._timeline), max(0, limit))]
+
+    async def get_recent_task_summaries(self, limit: int = 5) -> list[DeployTask]:
+        return await self.list_task_summaries(DeployTaskQuery(), limit=limit)
+
+    async def list_task_summaries(self, query: DeployTaskQuery, *, limit: int) -> list[DeployTask]:
+        # The time range and cursor narrow the timeline slice by bisection; only the
+        # branch/action/status filters are checked row by row.
+        upper = len(self._timeline)
+        if query.has_position:
+            upper = bisect_left(self._timeline, (_as_utc(query.after_started_at), query.after_task_id))
+        if query.started_before is not None:
+            upper = min(upper, bisect_left(self._timeline, (_as_utc(query.started_before),)))
+        lower = 0
+        if query.started_after is not None:
+            lower = bisect_left(self._timeline, (_as_utc(query.started_after),))
+        tasks: list[DeployTask] = []
+        for index in range(upper - 1, lower - 1, -1):
+            if len(tasks) >= limit:
+                break
+            task = self._tasks[self._timeline[index][1]]
+            if _matches_query(task, query):
+                tasks.append(task)
+        # Mirrors the Mongo projection so callers cannot come to rely on stage output here.
+        return [
+            task.model_copy(
+                update={
+                    "error_log": None,
+                    "metadata": {
+                        key: task.metadata[key] for key in TASK_SUMMARY_METADATA_KEYS if key in task.metadata
+                    },
+                }
+            )
+            for task in tasks[:limit]
+        ]
 
     async def get_latest_task(self) -> Optional[DeployTask]:
-        tasks = await self.get_recent_tasks(limit=1)
-        return tasks[0] if tasks else None
+        if self._latest_task_id is None:
+            return None
+        return self._tasks.get(self._latest_task_id)
+
+    async def insert_log_chunks(self, chunks: Sequence[DeployLogChunk]) -> None:
+        self.revision += 1
+        if not chunks:
+            return
+        if self._log_root is None:
+            self._log_root = Path(tempfile.mkdtemp(prefix="cherry-deploy-logs-"))
+        # Chunks arrive with every flush of streaming build output; keep the disk writes off the loop.
+        paths = await asyncio.to_thread(_write_log_chunks, self._log_root, chunks)
+        for chunk, path in zip(chunks, paths):
+            entries = self._log_chunks[chunk.task_id][(chunk.step_id, chunk.stream)]
+            entries.append((chunk.model_copy(update={"data": b""}), path))
+            entries.sort(key=lambda entry: entry[0].end_line)
+
+    async def get_log_chunks(
+        self, task_id: str, step_id: str, stream: str, *, from_line: int, to_line: int
+    ) -> list[DeployLogChunk]:
+        selected = [
+            (header, path)
+            for header, path in self._log_chunks.get(task_id, {}).get((step_id, stream), [])
+            if header.end_line > from_line and header.first_line < to_line
+        ]
+        if not selected:
+            return []
+        payloads = await asyncio.to_thread(_read_files, [path for _, path in selected])
+        return [header.model_copy(update={"data": data}) for (header, _), data in zip(selected, payloads)]
+
+    async def get_preview(self, preview_key: str) -> Optional[DeployPreview]:
+        preview = self._previews.get(preview_key)
+        if preview is None or _as_utc(preview.expires_at) <= utc_now():
+            return None
+        self._previews.move_to_end(preview_key)
+        return preview
+
+    async def save_preview(self, preview: DeployPreview) -> None:
+        # A cache, not deploy history: not counted in ``revision`` nor replayed into Mongo.
+        self._previews[preview.preview_key] = preview
+        self._previews.move_to_end(preview.preview_key)
+        while len(self._previews) > PREVIEW_CACHE_SIZE:
+            self._previews.popitem(last=False)
+
+    async def get_llm_memo(self, memo_key: str) -> Optional[LLMPreviewMemo]:
+        path = self._memo_path(memo_key)
+        try:
+            memo = LLMPreviewMemo.from_mongo(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            return None
+        if _as_utc(memo.expires_at) <= utc_now():
+            path.unlink(missing_ok=True)
+            return None
+        return memo
+
+    async def save_llm_memo(self, memo: LLMPreviewMemo, *, max_entries: int) -> None:
+        path = self._memo_path(memo.memo_key)
+        partial = path.with_suffix(".tmp")
+        partial.write_text(memo.model_dump_json(by_alias=True))
+        os.replace(partial, path)
+        if not max_entries:
+            return
+        memos = sorted(path.parent.glob("*.json"), key=lambda item: item.stat().st_mtime)
+        for stale in memos[: max(0, len(memos) - max_entries)]:
+            stale.unlink(missing_ok=True)
+
+    def _memo_path(self, memo_key: str) -> Path:
+        if self._memo_root is None:
+            self._memo_root = Path(tempfile.mkdtemp(prefix="cherry-deploy-llm-memo-"))
+        self._memo_root.mkdir(parents=True, exist_ok=True)
+        return self._memo_root / f"{memo_key}.json"
+
+    async def enqueue_job(self, job: DeployJob) -> DeployJob:
+        self.revision += 1
+        self._jobs[job.job_id] = job
+        return job
+
+    async def coalesce_queued_job(self, branch: str, kind: DeployJobKind) -> Optional[DeployJob]:
+        self.revision += 1
+        candidates = [
+            job
+            for job in self._jobs.values()
+            if job.state == DeployJobState.QUEUED and job.branch == branch and job.kind == kind
+        ]
+        if not candidates:
+            return None
+        job = min(candidates, key=lambda item: item.enqueued_at)
+        job.coalesced += 1
+        return job.model_copy()
+
+    async def discard_queued_job(self, job_id: str, *, error: str) -> bool:
+        self.revision += 1
+        job = self._jobs.get(job_id)
+        if not job or job.state != DeployJobState.QUEUED:
+            return False
+        job.state = DeployJobState.FAILED
+        job.finished_at = utc_now()
+        job.error = error
+        job.coalesced -= 1
+        self._record_finished_job(job_id)
+        return True
+
+    async def claim_next_job(
+        self,
+        worker_id: str,
+        lease_seconds: float,
+        *,
+        exclude_branches: Sequence[str] = (),
+    ) -> Optional[DeployJob]:
+        self.revision += 1
+        now = utc_now()
+        candidates = [
+            job
+            for job in self._jobs.values()
+            if job.branch not in exclude_branches
+            and (
+                job.state == DeployJobState.QUEUED
+                or (
+                    job.state == DeployJobState.RUNNING
+                    and job.lease_expires_at is not None
+                    and job.lease_expires_at < now
+                )
+            )
+        ]
+        if not candidates:
+            return None
+        job = min(candidates, key=lambda item: item.enqueued_at)
+        job.state = DeployJobState.RUNNING
+        job.worker_id = worker_id
+        job.claimed_at = now
+        job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        job.attempts += 1
+        return job.model_copy()
+
+    async def heartbeat_job(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        self.revision += 1
+        job = self._jobs.get(job_id)
+        if not job or job.worker_id != worker_id or job.state != DeployJobState.RUNNING:
+            return False
+        job.lease_expires_at = utc_now() + timedelta(seconds=lease_seconds)
+        return True
+
+    async def finish_job(
+        self,
+        job_id: str,
+        worker_id: str,
+        *,
+        state: DeployJobState,
+        error: Optional[str] = None,
+    ) -> bool:
+        self.revision += 1
+        job = self._jobs.get(job_id)
+        if not job or job.worker_id != worker_id:
+            return False
+        job.state = state
+        job.finished_at = utc_now()
+        if error is not None:
+            job.error = error
+        self._record_finished_job(job_id)
+        return True
+
+    async def release_worker_jobs(self, worker_id: str) -> int:
+        self.revision += 1
+        released = 0
+        for job in self._jobs.values():
+            if job.worker_id == worker_id and job.state == DeployJobState.RUNNING:
+                job.lease_expires_at = datetime.fromtimestamp(0, timezone.utc)
+                released += 1
+        return released
+
+    def _record_finished_job(self, job_id: str) -> None:
+        self._finished_jobs.append(job_id)
+        if self._max_tasks:
+            while len(self._finished_jobs) > self._max_tasks:
+                self._jobs.pop(self._finished_jobs.popleft(), None)
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        queued = [job for job in self._jobs.values() if job.state == DeployJobState.QUEUED]
+        running = [job for job in self._jobs.values() if job.state == DeployJobState.RUNNING]
+        return {
+            "queued": len(queued),
+            "running": len(running),
+            "oldest_enqueued_at": min((job.enqueued_at for job in queued), default=None),
+        }
 
     async def ping(self) -> bool:  # pragma: no cover - always true for in-memory
         return True
 
+    async def watch_task_changes(
+        self, *, resume_after: Any = None, poll_seconds: float = 1.0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Tail the task change log, in the same shape as the Mongo change stream.
+
+        Starts after ``resume_after`` (a previous ``resume_token``) or at the current
+        end of the log; changes that rolled off the bounded log are skipped.
+        """
+        position = self._change_seq if resume_after is None else int(resume_after)
+        while True:
+            for seq, change in list(self._changes):
+                if seq > position:
+                    position = seq
+                    yield change
+            await asyncio.sleep(poll_seconds)
+
+    def export_snapshot(self) -> Dict[str, list[Any]]:
+        """Copy every stored document (log chunks with their data) for replay elsewhere."""
+        return {
+            "tasks": [task.model_copy(deep=True) for task in self._tasks.values()],
+            "reports": [report.model_copy(deep=True) for report in self._reports.values()],
+            "jobs": [job.model_copy(deep=True) for job in self._jobs.values()],
+            "log_chunks": [
+                header.model_copy(update={"data": path.read_bytes()})
+                for streams in self._log_chunks.values()
+                for entries in streams.values()
+                for header, path in entries
+            ],
+        }
+
+    async def restore_snapshot(self, snapshot: Dict[str, list[Any]]) -> Dict[str, int]:
+        self.revision += 1
+        for task in snapshot.get("tasks", ()):
+            self._put_task(task.model_copy(deep=True))
+        for report in snapshot.get("reports", ()):
+            await self.insert_report(report)
+        for job in snapshot.get("jobs", ()):
+            self._jobs[job.job_id] = job.model_copy()
+        chunks = list(snapshot.get("log_chunks", ()))
+        for chunk in chunks:
+            entries = self._log_chunks.get(chunk.task_id, {}).get((chunk.step_id, chunk.stream), [])
+            entries[:] = [entry for entry in entries if entry[0].seq != chunk.seq]
+        await self.insert_log_chunks(chunks)
+        self._evict_overflow()
+        return {name: len(items) for name, items in snapshot.items()}
+
+    def _record_change(self, task_id: str, operation: str, status: Any, updated: Dict[str, Any]) -> None:
+        self._change_seq += 1
+        self._changes.append(
+            (
+                self._change_seq,
+                {
+                    "task_id": task_id,
+                    "operation": operation,
+                    "status": status,
+                    "updated": updated,
+                    "resume_token": self._change_seq,
+                },
+            )
+        )
+
+    def _put_task(self, task: DeployTask) -> None:
+        previous = self._tasks.get(task.task_id)
+        if previous is not None:
+            key = (_as_utc(previous.started_at), previous.task_id)
+            index = bisect_left(self._timeline, key)
+            if index < len(self._timeline) and self._timeline[index] == key:
+                del self._timeline[index]
+        self._tasks[task.task_id] = task
+        key = (_as_utc(task.started_at), task.task_id)
+        insort(self._timeline, key)
+        if self._timeline[-1] == key:
+            self._latest_task_id = task.task_id
+        self._index_success(task)
+
+    def _index_success(self, task: DeployTask) -> None:
+        """Re-file ``task`` in the per-branch success lists after any write to it."""
+        self._unindex_success(task.task_id)
+        branch = (task.metadata or {}).get("branch")
+        if task.status == DeployStatus.COMPLETED and branch:
+            key = (_as_utc(task.completed_at or task.started_at), task.task_id)
+            insort(self._successes[branch], key)
+            self._success_keys[task.task_id] = (branch, key)
+
+    def _unindex_success(self, task_id: str) -> None:
+        previous = self._success_keys.pop(task_id, None)
+        if previous is None:
+            return
+        branch, key = previous
+        entries = self._successes[branch]
+        index = bisect_left(entries, key)
+        if index < len(entries) and entries[index] == key:
+            del entries[index]
+        if not entries:
+            del self._successes[branch]
+
+    def _evict_overflow(self) -> None:
+        if not self._max_tasks:
+            return
+        overflow = len(self._tasks) - self._max_tasks
+        index = 0
+        while overflow > 0 and index < len(self._timeline):
+            task_id = self._timeline[index][1]
+            if not DeployStatus(self._tasks[task_id].status).is_terminal:
+                index += 1
+                continue
+            del self._timeline[index]
+            self._drop_task(task_id)
+            overflow -= 1
+        if self._latest_task_id not in self._tasks:
+            self._latest_task_id = self._timeline[-1][1] if self._timeline else None
+
+    def _drop_task(self, task_id: str) -> None:
+        del self._tasks[task_id]
+        self._unindex_success(task_id)
+        for report_id in self._task_reports.pop(task_id, ()):
+            self._reports.pop(report_id, None)
+        if self._log_chunks.pop(task_id, None) is not None and self._log_root is not None:
+            shutil.rmtree(self._log_root / task_id, ignore_errors=True)
+
 
 def _merge_metadata(base: dict, extra: dict) -> None:
     for key, value in extra.items():
@@ -105,3 +540,42 @@ def _merge_metadata(base: dict, extra: dict) -> None:
             _merge_metadata(child, value)
         else:
             base[key] = value
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _matches_query(task: DeployTask, query: DeployTaskQuery) -> bool:
+    metadata = task.metadata or {}
+    started_at = _as_utc(task.started_at)
+    if query.branch and metadata.get("branch") != query.branch:
+        return False
+    if query.action and metadata.get("action") != query.action:
+        return False
+    if query.status is not None and task.status != query.status:
+        return False
+    if query.started_after is not None and started_at < _as_utc(query.started_after):
+        return False
+    if query.started_before is not None and started_at >= _as_utc(query.started_before):
+        return False
+    if query.has_position:
+        position = (_as_utc(query.after_started_at), query.after_task_id)
+        if (started_at, task.task_id) >= position:
+            return False
+    return True
+
+
+def _write_log_chunks(log_root: Path, chunks: Sequence[DeployLogChunk]) -> list[Path]:
+    paths = []
+    for chunk in chunks:
+        task_dir = log_root / chunk.task_id
+        task_dir.mkdir(parents=True, exist_ok=True)
+        path = task_dir / f"{chunk.step_id}.{chunk.stream}.{chunk.seq:06d}.z"
+        path.write_bytes(chunk.data)
+        paths.append(path)
+    return paths
+
+
+def _read_files(paths: Sequence[Path]) -> list[bytes]:
+    return [path.read_bytes() for path in paths]
@@ -0,0 +1,209 @@
+"""Declared MongoDB indexes and the repository query shapes they are meant to serve.
+
+``DeployTaskRepository.ensure_indexes`` creates ``INDEX_CATALOG``; ``verify_query_plans``
+explains every ``QUERY_CATALOG`` entry and reports winning plans that still contain a
+collection scan or a blocking in-memory sort (``backend/check_query_plans.py`` runs
+it against the configured mongod).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, NamedTuple
+
+try:
+    from pymongo import ASCENDING, DESCENDING
+except ImportError:  # pragma: no cover - fallback for test environments
+    ASCENDING = 1  # type: ignore
+    DESCENDING = -1  # type: ignore
+
+from domain.deploy_jobs import DeployJobKind, DeployJobState
+from domain.deploy_states import DeployStatus
+
+
+UNINDEXED_PLAN_STAGES = frozenset({"COLLSCAN", "SORT"})
+
+_SAMPLE_BRANCH = "deploy"
+_SAMPLE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_SAMPLE_PAGE_POSITION = {
+    "$or": [
+        {"started_at": {"$lt": _SAMPLE_TIME}},
+        {"started_at": _SAMPLE_TIME, "_id": {"$lt": "task"}},
+    ]
+}
+_HISTORY_SORT = (("started_at", DESCENDING), ("_id", DESCENDING))
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: tuple[tuple[str, int], ...]
+    options: Dict[str, Any] = {}
+
+
+class QueryShape(NamedTuple):
+    """A representative query issued by a repository method (sample values, real shape)."""
+
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: tuple[tuple[str, int], ...] = ()
+    limit: int = 0
+
+
+INDEX_CATALOG: tuple[IndexSpec, ...] = (
+    # Equality fields first, then the sort key, so the index returns rows already ordered.
+    IndexSpec(
+        "deploy_tasks",
+        (("status", ASCENDING), ("metadata.branch", ASCENDING), ("completed_at", DESCENDING)),
+    ),
+    # Task history pages: (started_at, _id) is the keyset, optionally behind one equality filter.
+    IndexSpec("deploy_tasks", (("started_at", DESCENDING), ("_id", DESCENDING))),
+    IndexSpec("deploy_tasks", (("metadata.branch", ASCENDING), ("started_at", DESCENDING), ("_id", DESCENDING))),
+    IndexSpec("deploy_tasks", (("status", ASCENDING), ("started_at", DESCENDING), ("_id", DESCENDING))),
+    IndexSpec("deploy_tasks", (("metadata.action", ASCENDING), ("started_at", DESCENDING), ("_id", DESCENDING))),
+    IndexSpec("deploy_reports", (("task_id", ASCENDING),)),
+    IndexSpec(
+        "deploy_log_chunks",
+        (
+            ("task_id", ASCENDING),
+            ("step_id", ASCENDING),
+            ("stream", ASCENDING),
+            ("end_line", ASCENDING),
+            ("first_line", ASCENDING),
+        ),
+    ),
+    # Also serves the expired-lease branch of claim_next_job: few jobs are running at once.
+    IndexSpec(
+        "deploy_jobs",
+        (("state", ASCENDING), ("enqueued_at", ASCENDING), ("lease_expires_at", ASCENDING)),
+    ),
+    IndexSpec(
+        "deploy_jobs",
+        (("state", ASCENDING), ("branch", ASCENDING), ("kind", ASCENDING), ("enqueued_at", ASCENDING)),
+    ),
+    IndexSpec("deploy_jobs", (("worker_id", ASCENDING), ("state", ASCENDING))),
+    # TTL index: previews are looked up by _id only; mongod deletes them once expires_at passes.
+    IndexSpec("deploy_previews", (("expires_at", ASCENDING),), {"expireAfterSeconds": 0}),
+    IndexSpec("llm_preview_memos", (("expires_at", ASCENDING),), {"expireAfterSeconds": 0}),
+    # Oldest-first eviction once the memo store is over its size bound.
+    IndexSpec("llm_preview_memos", (("created_at", ASCENDING),)),
+)
+
+QUERY_CATALOG: tuple[QueryShape, ...] = (
+    QueryShape(
+        "get_recent_successes",
+        "deploy_tasks",
+        {"status": DeployStatus.COMPLETED.value, "metadata.branch": _SAMPLE_BRANCH},
+        (("completed_at", DESCENDING),),
+        2,
+    ),
+    QueryShape("get_recent_tasks", "deploy_tasks", {}, (("started_at", DESCENDING),), 5),
+    QueryShape("get_recent_task_summaries", "deploy_tasks", {}, _HISTORY_SORT, 20),
+    QueryShape("list_task_summaries", "deploy_tasks", dict(_SAMPLE_PAGE_POSITION), _HISTORY_SORT, 51),
+    QueryShape(
+        "list_task_summaries[branch]",
+        "deploy_tasks",
+        {"metadata.branch": _SAMPLE_BRANCH, **_SAMPLE_PAGE_POSITION},
+        _HISTORY_SORT,
+        51,
+    ),
+    QueryShape(
+        "list_task_summaries[status]",
+        "deploy_tasks",
+        {"status": DeployStatus.FAILED.value, **_SAMPLE_PAGE_POSITION},
+        _HISTORY_SORT,
+        51,
+    ),
+    QueryShape(
+        "list_task_summaries[action]",
+        "deploy_tasks",
+        {"metadata.action": "rollback", **_SAMPLE_PAGE_POSITION},
+        _HISTORY_SORT,
+        51,
+    ),
+    QueryShape("get_latest_task", "deploy_tasks", {}, (("started_at", DESCENDING),), 1),
+    QueryShape(
+        "get_log_chunks",
+        "deploy_log_chunks",
+        {
+            "task_id": "task",
+            "step_id": "step",
+            "stream": "stdout",
+            "end_line": {"$gt": 0},
+            "first_line": {"$lt": 1000},
+        },
+        (("end_line", ASCENDING),),
+    ),
+    QueryShape(
+        "claim_next_job",
+        "deploy_jobs",
+        {
+            "$or": [
+                {"state": DeployJobState.QUEUED.value},
+                {"state": DeployJobState.RUNNING.value, "lease_expires_at": {"$lt": _SAMPLE_TIME}},
+            ],
+            "branch": {"$nin": [_SAMPLE_BRANCH]},
+        },
+        (("enqueued_at", ASCENDING),),
+        1,
+    ),
+    QueryShape(
+        "coalesce_queued_job",
+        "deploy_jobs",
+        {"state": DeployJobState.QUEUED.value, "branch": _SAMPLE_BRANCH, "kind": DeployJobKind.DEPLOY.value},
+        (("enqueued_at", ASCENDING),),
+        1,
+    ),
+    QueryShape(
+        "get_queue_stats",
+        "deploy_jobs",
+        {"state": DeployJobState.QUEUED.value},
+        (("enqueued_at", ASCENDING),),
+        1,
+    ),
+    QueryShape("save_llm_memo[evict]", "llm_preview_memos", {}, (("created_at", ASCENDING),), 1),
+    QueryShape(
+        "release_worker_jobs",
+        "deploy_jobs",
+        {"worker_id": "worker", "state": DeployJobState.RUNNING.value},
+    ),
+)
+
+
+async def ensure_catalog_indexes(database: Any) -> None:
+    for spec in INDEX_CATALOG:
+        await database[spec.collection].create_index(list(spec.keys), **spec.options)
+
+
+async def verify_query_plans(database: Any) -> list[Dict[str, Any]]:
+    """Explain each catalogued query; entries with non-empty ``problems`` need an index."""
+    report: list[Dict[str, Any]] = []
+    for shape in QUERY_CATALOG:
+        command: Dict[str, Any] = {"find": shape.collection, "filter": shape.filter}
+        if shape.sort:
+            command["sort"] = dict(shape.sort)
+        if shape.limit:
+            command["limit"] = shape.limit
+        explained = await database.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = list(plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {})))
+        report.append(
+            {
+                "query": shape.name,
+                "collection": shape.collection,
+                "stages": stages,
+                "problems": sorted(set(stages) & UNINDEXED_PLAN_STAGES),
+            }
+        )
+    return report
+
+
+def plan_stages(plan: Dict[str, Any]) -> Iterator[str]:
+    """Yield stage names of an explain plan tree (classic and slot-based engine layouts)."""
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("queryPlan", "inputStage"):
+        child = plan.get(key)
+        if isinstance(child, dict):
+            yield from plan_stages(child)
+    for child in plan.get("inputStages", ()):
+        yield from plan_stages(child)
@@ -1,23 +1,39 @@
 from __future__ import annotations
 
-from typing import Callable, Optional
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
-from domain import DeployStatus
+from domain import DeployJobKind, DeployStatus
+from models import DeployTaskQuery
 from schemas import (
     DeployPreviewResponse,
+    DeployQueueStats,
     DeployRequest,
     DeployResponse,
     DeployStatusResponse,
     DeployTaskLogResponse,
+    DeployTaskPage,
     DeployTaskSummary,
     RollbackRequest,
 )
-from services import DeployService
+from services import DeployQueue, DeployService
+from services.log_store import LOG_STREAMS
 
 
-def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable) -> APIRouter:
+EVENT_STREAM_HEARTBEAT_SECONDS = 15.0
+
+
+def build_deploy_router(
+    deploy_service: DeployService,
+    auth_dependency: Callable,
+    deploy_queue: DeployQueue,
+) -> APIRouter:
     router = APIRouter(prefix="/api/v1", tags=["deploy"])
 
     @router.post(
@@ -28,24 +44,20 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
     )
     async def trigger_deploy(
         payload: DeployRequest,
-        background_tasks: BackgroundTasks,
         user=Depends(auth_dependency),  # type: ignore[valid-type]
     ) -> DeployResponse:
         branch_input = (payload.branch or "").strip() or None
         try:
-            task = await deploy_service.create_task(branch=branch_input or "")
+            task, absorbing_job = await deploy_queue.submit_deploy(branch_input)
         except ValueError as exc:
             raise HTTPException(status_code=400, detail=str(exc)) from exc
         except Exception as exc:  # pragma: no cover - defensive guard
             raise HTTPException(status_code=500, detail=str(exc)) from exc
 
         branch = task.metadata.get("branch", deploy_service.default_branch)
-
-        background_tasks.add_task(
-            deploy_service.run_pipeline,
-            task.task_id,
-            branch,
-        )
+        context: Dict[str, Any] = {}
+        if absorbing_job is not None:
+            context = {"coalesced": True, "coalesced_requests": absorbing_job.coalesced}
 
         try:
             eta_minutes = await deploy_service.estimate_runtime_minutes()
@@ -59,7 +71,7 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
             action="deploy",
             queued_at=deploy_service.as_display_time(task.started_at),
             estimated_duration_minutes=eta_minutes,
-            context={},
+            context=context,
             dev_server_restart_planned=deploy_service.dev_server_mode,
         )
 
@@ -70,12 +82,24 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
     )
     async def get_status(
         task_id: str,
+        request: Request,
+        response: Response,
         user=Depends(auth_dependency),  # type: ignore[valid-type]
-    ) -> DeployStatusResponse:
+    ) -> DeployStatusResponse | Response:
+        # The ETag pairs the task's stored revision with the blue/green state, the one
+        # part of the response that changes without a write to the task.
+        blue_green_plan = await deploy_service.describe_blue_green_state()
+        if_none_match = request.headers.get("if-none-match")
         try:
+            if if_none_match:
+                revision = await deploy_service.get_task_revision(task_id)
+                etag = _status_etag(revision, blue_green_plan)
+                if _etag_matches(if_none_match, etag):
+                    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
             task = await deploy_service.get_task(task_id)
         except RuntimeError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
+        response.headers["ETag"] = _status_etag(task.revision, blue_green_plan)
 
         stages = deploy_service.build_stage_snapshot(task.metadata)
         failure_context = task.metadata.get("failure_context")
@@ -86,7 +110,6 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
         cost_estimate = preflight_meta.get("cost_estimate")
         risk_assessment = preflight_meta.get("risk_assessment")
         llm_preview = preflight_meta.get("llm_preview")
-        blue_green_plan = await deploy_service.describe_blue_green_state()
 
         return DeployStatusResponse(
             task_id=task.task_id,
@@ -104,6 +127,54 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
             timezone=deploy_service.display_timezone_name,
         )
 
+    @router.get(
+        "/status/{task_id}/events",
+        summary="Stream stage transitions, step progress and log chunks (Server-Sent Events).",
+        response_class=StreamingResponse,
+    )
+    async def stream_status(
+        task_id: str,
+        user=Depends(auth_dependency),  # type: ignore[valid-type]
+    ) -> StreamingResponse:
+        # Subscribe before reading the snapshot so no transition falls between the two.
+        subscription = deploy_service.subscribe_task_events(task_id)
+        try:
+            task = await deploy_service.get_task(task_id)
+        except RuntimeError as exc:
+            subscription.close()
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+        snapshot = {
+            "status": task.status,
+            "terminal": DeployStatus(task.status).is_terminal,
+            "stages": deploy_service.build_stage_snapshot(task.metadata),
+            "started_at": deploy_service.as_display_time(task.started_at),
+            "completed_at": deploy_service.as_display_time(task.completed_at),
+            "error_log": task.error_log,
+        }
+
+        async def event_source() -> AsyncIterator[str]:
+            try:
+                yield _format_sse({"id": 0, "type": "snapshot", "task_id": task_id, "data": snapshot})
+                if snapshot["terminal"]:
+                    return
+                while True:
+                    event = await subscription.get(timeout=EVENT_STREAM_HEARTBEAT_SECONDS)
+                    if event is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield _format_sse(event)
+                    if event["type"] == "status" and event["data"].get("terminal"):
+                        return
+            finally:
+                subscription.close()
+
+        return StreamingResponse(
+            event_source(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @router.get(
         "/preview",
         response_model=DeployPreviewResponse,
@@ -127,7 +198,6 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
     )
     async def rollback(
         payload: RollbackRequest,
-        background_tasks: BackgroundTasks,
         user=Depends(auth_dependency),  # type: ignore[valid-type]
     ) -> DeployResponse:
         try:
@@ -139,12 +209,10 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
         except RuntimeError as exc:
             raise HTTPException(status_code=409, detail=str(exc)) from exc
 
-        background_tasks.add_task(
-            deploy_service.perform_rollback,
-            task.task_id,
-            branch_value,
-            target_commit,
-            current_commit,
+        await deploy_queue.enqueue(
+            task,
+            kind=DeployJobKind.ROLLBACK,
+            payload={"target_commit": target_commit, "current_commit": current_commit},
         )
 
         try:
@@ -165,6 +233,18 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
             dev_server_restart_planned=deploy_service.dev_server_mode,
         )
 
+    @router.get(
+        "/queue",
+        response_model=DeployQueueStats,
+        summary="Show deploy queue depth, wait time and worker state.",
+    )
+    async def queue_stats(
+        user=Depends(auth_dependency),  # type: ignore[valid-type]
+    ) -> DeployQueueStats:
+        stats = await deploy_queue.stats()
+        stats["oldest_enqueued_at"] = deploy_service.as_display_time(stats.get("oldest_enqueued_at"))
+        return DeployQueueStats.model_validate(stats)
+
     @router.get(
         "/tasks/recent",
         response_model=list[DeployTaskSummary],
@@ -178,20 +258,73 @@ def build_deploy_router(deploy_service: DeployService, auth_dependency: Callable
         summaries = await deploy_service.list_recent_tasks(limit=bounded_limit)
         return [DeployTaskSummary.model_validate(summary) for summary in summaries]
 
+    @router.get(
+        "/tasks",
+        response_model=DeployTaskPage,
+        summary="Page through task history (newest first) with optional filters.",
+    )
+    async def list_task_history(
+        branch: Optional[str] = None,
+        action: Optional[str] = None,
+        status_filter: Optional[DeployStatus] = Query(default=None, alias="status"),
+        started_after: Optional[datetime] = None,
+        started_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        user=Depends(auth_dependency),  # type: ignore[valid-type]
+    ) -> DeployTaskPage:
+        query = DeployTaskQuery(
+            branch=branch,
+            action=action,
+            status=status_filter,
+            started_after=started_after,
+            started_before=started_before,
+        )
+        try:
+            page = await deploy_service.list_task_history(query, limit=max(1, min(limit, 100)), cursor=cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return DeployTaskPage.model_validate(page)
+
     @router.get(
         "/tasks/{task_id}/logs",
         response_model=DeployTaskLogResponse,
-        summary="Return stdout/stderr metadata for a specific task.",
+        summary="Return stdout/stderr metadata for a task, or a page of one step's full output.",
     )
     async def task_logs(
         task_id: str,
+        step_id: Optional[str] = None,
+        stream: str = "stdout",
+        offset: int = 0,
+        limit: int = 1000,
         user=Depends(auth_dependency),  # type: ignore[valid-type]
     ) -> DeployTaskLogResponse:
+        if stream not in LOG_STREAMS:
+            raise HTTPException(status_code=400, detail=f"stream must be one of {list(LOG_STREAMS)}")
         try:
             payload = await deploy_service.get_task_logs(task_id)
         except RuntimeError as exc:
             raise HTTPException(status_code=404, detail=str(exc)) from exc
         payload["stages"] = deploy_service.build_stage_snapshot(payload.get("metadata", {}))
+        if step_id:
+            payload["log_range"] = await deploy_service.read_task_log(
+                task_id, step_id, stream=stream, offset=offset, limit=limit
+            )
         return DeployTaskLogResponse.model_validate(payload)
 
     return router
+
+
+def _status_etag(revision: int, blue_green_plan: Dict[str, Any]) -> str:
+    plan = json.dumps(jsonable_encoder(blue_green_plan), sort_keys=True)
+    return f'W/"{revision}-{hashlib.sha1(plan.encode()).hexdigest()[:16]}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    payload = json.dumps(jsonable_encoder(event), ensure_ascii=False)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
@@ -8,13 +8,13 @@ from typing import Any, Dict, Tuple
 
 from fastapi import APIRouter
 
-from services import DeployService
+from services import DeployQueue, DeployService
 
 
 PM2_TARGETS: Tuple[str, ...] = ("main-api", "frontend-dev")
 
 
-def build_health_router(deploy_service: DeployService) -> APIRouter:
+def build_health_router(deploy_service: DeployService, deploy_queue: DeployQueue) -> APIRouter:
     router = APIRouter()
 
     @router.get("/healthz")
@@ -23,7 +23,9 @@ def build_health_router(deploy_service: DeployService) -> APIRouter:
         blue_green_task = asyncio.create_task(deploy_service.describe_blue_green_state())
 
         mongo_ok = await deploy_service.repository.ping()
-        latest_task = await deploy_service.repository.get_latest_task()
+        recent_tasks = await deploy_service.repository.get_recent_task_summaries(limit=1)
+        latest_task = recent_tasks[0] if recent_tasks else None
+        queue_stats = await deploy_queue.stats()
 
         pm2_states = await pm2_task
         blue_green = await blue_green_task
@@ -33,8 +35,11 @@ def build_health_router(deploy_service: DeployService) -> APIRouter:
         for name, status in pm2_states.items():
             if status not in {"online", "launching"}:
                 issues.append(f"pm2:{name} is {status}.")
+        if not queue_stats["worker_running"]:
+            issues.append("Deploy queue worker is not running.")
 
         overall_status = "healthy" if not issues else "degraded"
+        cache_stats = getattr(deploy_service.repository, "cache_stats", None)
 
         response: Dict[str, Any] = {
             "status": overall_status,
@@ -44,6 +49,13 @@ def build_health_router(deploy_service: DeployService) -> APIRouter:
             "last_task_status": latest_task.status if latest_task else None,
             "issues": issues,
             "blue_green": blue_green,
+            "deploy_queue": {
+                "queued": queue_stats["queued"],
+                "running": queue_stats["running"],
+                "oldest_wait_seconds": queue_stats["oldest_wait_seconds"],
+            },
+            "task_cache": cache_stats() if cache_stats else None,
+            "single_flight": deploy_service.single_flight.stats(),
         }
         return response
 
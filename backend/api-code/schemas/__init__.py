@@ -1,11 +1,14 @@
 from .auth import LoginRequest, LoginResponse, LogoutResponse, MeResponse
 from .chat import ChatRequest, ChatResponse
 from .deploy import (
+    DeployLogRange,
     DeployPreviewResponse,
+    DeployQueueStats,
     DeployRequest,
     DeployResponse,
     DeployStatusResponse,
     DeployTaskLogResponse,
+    DeployTaskPage,
     DeployTaskSummary,
     RollbackRequest,
 )
@@ -17,11 +20,14 @@ __all__ = [
     "MeResponse",
     "ChatRequest",
     "ChatResponse",
+    "DeployLogRange",
     "DeployPreviewResponse",
+    "DeployQueueStats",
     "DeployRequest",
     "DeployResponse",
     "DeployStatusResponse",
     "DeployTaskLogResponse",
+    "DeployTaskPage",
     "DeployTaskSummary",
     "RollbackRequest",
 ]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -148,6 +148,39 @@ class DeployTaskSummary(BaseModel):
     )
 
 
+class DeployTaskPage(BaseModel):
+    items: List[DeployTaskSummary] = Field(default_factory=list, description="Tasks, newest first.")
+    next_cursor: Optional[str] = Field(
+        default=None, description="Opaque cursor for the next (older) page; null on the last page."
+    )
+
+
+class DeployQueueStats(BaseModel):
+    queued: int = Field(..., description="Jobs waiting for the worker.")
+    running: int = Field(..., description="Jobs currently leased by a worker.")
+    oldest_enqueued_at: Optional[datetime] = Field(
+        default=None, description="Enqueue time of the oldest waiting job."
+    )
+    oldest_wait_seconds: float = Field(..., description="How long the oldest waiting job has been queued.")
+    avg_wait_seconds: Optional[float] = Field(
+        default=None, description="Average enqueue-to-claim time over recent jobs handled by this worker."
+    )
+    worker_id: str = Field(..., description="Identity of this process's queue worker.")
+    worker_running: bool = Field(..., description="Whether the worker loop is alive.")
+    concurrency: int = Field(..., description="Jobs this worker may run at once (1 unless worktree isolation).")
+    current_task_ids: list[str] = Field(default_factory=list, description="Tasks being executed right now.")
+    processed: int = Field(..., description="Jobs processed by this worker since startup.")
+
+
+class DeployLogRange(BaseModel):
+    step_id: str = Field(..., description="Step identifier from the step's log_ref metadata.")
+    stream: str = Field(..., description="'stdout' or 'stderr'.")
+    offset: int = Field(..., description="Line number of the first returned line.")
+    lines: List[str] = Field(default_factory=list, description="Output lines in order.")
+    next_offset: Optional[int] = Field(default=None, description="Offset of the next page when has_more.")
+    has_more: bool = Field(default=False, description="More lines exist after this page.")
+
+
 class DeployTaskLogResponse(BaseModel):
     task_id: str = Field(..., description="Task identifier.")
     status: DeployStatus = Field(..., description="Current status.")
@@ -157,3 +190,6 @@ class DeployTaskLogResponse(BaseModel):
     failure_context: Optional[Dict[str, Any]] = Field(
         default=None, description="Failure context describing remediation attempts."
     )
+    log_range: Optional[DeployLogRange] = Field(
+        default=None, description="Requested slice of a step's full output (when step_id is given)."
+    )
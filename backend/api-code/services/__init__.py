@@ -1,5 +1,15 @@
 from .auth_service import AuthService
 from .chat_service import GeminiChatService
+from .deploy_queue import DeployQueue
 from .deploy_service import DeployService
+from .mongo_supervisor import MongoReconnectSupervisor
+from .task_change_feed import TaskChangeRelay
 
-__all__ = ["AuthService", "GeminiChatService", "DeployService"]
+__all__ = [
+    "AuthService",
+    "GeminiChatService",
+    "DeployQueue",
+    "DeployService",
+    "MongoReconnectSupervisor",
+    "TaskChangeRelay",
+]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from .file_ops import KeyedLocks, copy_tree, read_optional_text, remove_path, temp_sibling, tree_size
+
+
+logger = logging.getLogger("cherry-deploy.cache")
+
+
+class BuildArtifactCache:
+    """Fingerprint-keyed store of exported build outputs with LRU eviction by disk budget.
+
+    Entries are immutable directories under ``<root>/entries/<key>``; ``index.json``
+    tracks their size and last use so eviction can drop the least recently
+    restored artifacts once the budget is exceeded.
+    """
+
+    def __init__(self, root: Path, *, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self._entries_dir = root / "entries"
+        self._index_path = root / "index.json"
+        self._lock = threading.Lock()  # index.json; taken after an entry lock, never before
+        self._entry_locks = KeyedLocks()
+
+    @staticmethod
+    def fingerprint(
+        *,
+        tree_hash: str,
+        lockfile_hash: Optional[str],
+        commands: Iterable[Optional[Iterable[str]]],
+        env: Mapping[str, str],
+    ) -> str:
+        payload = {
+            "tree": tree_hash,
+            "lockfile": lockfile_hash,
+            "commands": [" ".join(command) if command else None for command in commands],
+            "env": sorted(env.items()),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    async def restore(self, key: str, destination: Path) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._restore, key, destination)
+
+    async def store(self, key: str, source: Path) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._store, key, source)
+
+    def _restore(self, key: str, destination: Path) -> Optional[Dict[str, Any]]:
+        entry_dir = self._entries_dir / key
+        with self._entry_locks.hold(key):
+            with self._lock:
+                index = self._read_index()
+                record = index.get(key)
+                if record is None or not entry_dir.is_dir():
+                    return None
+                record["last_used_at"] = time.time()
+                record["hits"] = int(record.get("hits", 0)) + 1
+                self._write_index(index)
+            started = time.monotonic()
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            restored_bytes = copy_tree(entry_dir, destination)
+        return {
+            "size_bytes": restored_bytes,
+            "restore_seconds": round(time.monotonic() - started, 3),
+            "hits": record["hits"],
+        }
+
+    def _store(self, key: str, source: Path) -> Dict[str, Any]:
+        entry_dir = self._entries_dir / key
+        self._entries_dir.mkdir(parents=True, exist_ok=True)
+        staging_dir = temp_sibling(entry_dir)
+        size = copy_tree(source, staging_dir)
+        if self.max_bytes and size > self.max_bytes:
+            remove_path(staging_dir)
+            return {"stored": False, "reason": "artifact exceeds cache budget", "size_bytes": size}
+        with self._entry_locks.hold(key), self._lock:
+            if entry_dir.exists():
+                remove_path(entry_dir)
+            os.replace(staging_dir, entry_dir)
+            index = self._read_index()
+            now = time.time()
+            index[key] = {"size": size, "created_at": now, "last_used_at": now, "hits": 0}
+            evicted = self._evict(index, keep=key)
+            self._write_index(index)
+        return {"stored": True, "size_bytes": size, "evicted": evicted}
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], *, keep: str) -> int:
+        if not self.max_bytes:
+            return 0
+        total = sum(int(record.get("size", 0)) for record in index.values())
+        evicted = 0
+        for key, record in sorted(index.items(), key=lambda item: item[1].get("last_used_at", 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            with self._entry_locks.try_hold(key) as free:
+                if not free:
+                    continue  # being restored; a later store retries
+                remove_path(self._entries_dir / key)
+            logger.info("Evicted build artifact %s (%s bytes)", key, record.get("size", 0))
+            total -= int(record.get("size", 0))
+            index.pop(key, None)
+            evicted += 1
+        return evicted
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        raw = read_optional_text(self._index_path)
+        if not raw:
+            return self._rebuild_index()
+        try:
+            payload = json.loads(raw)
+        except json.JSONDecodeError:
+            return self._rebuild_index()
+        return payload if isinstance(payload, dict) else self._rebuild_index()
+
+    def _rebuild_index(self) -> Dict[str, Dict[str, Any]]:
+        index: Dict[str, Dict[str, Any]] = {}
+        if not self._entries_dir.is_dir():
+            return index
+        for entry_dir in self._entries_dir.iterdir():
+            if entry_dir.is_dir() and not entry_dir.name.startswith("."):
+                mtime = entry_dir.stat().st_mtime
+                index[entry_dir.name] = {
+                    "size": tree_size(entry_dir),
+                    "created_at": mtime,
+                    "last_used_at": mtime,
+                    "hits": 0,
+                }
+        return index
+
+    def _write_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_path = temp_sibling(self._index_path)
+        temp_path.write_text(json.dumps(index, sort_keys=True))
+        os.replace(temp_path, self._index_path)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .file_ops import KeyedLocks, copy_tree, read_optional_text, remove_path, temp_sibling, tree_size
+
+
+logger = logging.getLogger("cherry-deploy.cache")
+
+NEXT_CACHE_RELATIVE_PATH = Path(".next") / "cache"
+_SLUG_PATTERN = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def _slug(value: str) -> str:
+    return _SLUG_PATTERN.sub("_", value.strip("/")) or "_"
+
+
+class NextBuildCache:
+    """Per project/branch copies of Next.js ``.next/cache`` kept outside the repository.
+
+    ``git clean -fdx`` removes ``.next/cache`` before every build; restoring it lets
+    SWC/webpack reuse their incremental results. Entries are bounded per entry and
+    in total (LRU), and ``metrics.json`` keeps running averages of warm vs cold
+    build durations so each deploy can report how much the cache saved.
+    """
+
+    def __init__(self, root: Path, *, max_bytes: int, max_entry_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self.max_entry_bytes = max(0, max_entry_bytes)
+        self._entries_dir = root / "entries"
+        self._metrics_path = root / "metrics.json"
+        self._lock = threading.Lock()  # metrics.json and eviction; taken after an entry lock
+        self._entry_locks = KeyedLocks()
+
+    @staticmethod
+    def key_for(project: str, branch: str) -> str:
+        return f"{_slug(project)}--{_slug(branch)}"
+
+    async def restore(
+        self, key: str, project_path: Path, *, fallback_key: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._restore, key, project_path, fallback_key)
+
+    async def save(self, key: str, project_path: Path) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._save, key, project_path)
+
+    async def record_build(self, key: str, *, warm: bool, seconds: float) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._record_build, key, warm, seconds)
+
+    def _restore(self, key: str, project_path: Path, fallback_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        # A fresh branch starts from the default branch's cache rather than cold.
+        for candidate in (key, fallback_key):
+            if not candidate:
+                continue
+            entry_dir = self._entries_dir / candidate
+            with self._entry_locks.hold(candidate):
+                if not entry_dir.is_dir():
+                    continue
+                started = time.monotonic()
+                destination = project_path / NEXT_CACHE_RELATIVE_PATH
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                restored_bytes = copy_tree(entry_dir, destination)
+                os.utime(entry_dir)  # LRU marker
+            return {
+                "source_key": candidate,
+                "size_bytes": restored_bytes,
+                "restore_seconds": round(time.monotonic() - started, 3),
+            }
+        return None
+
+    def _save(self, key: str, project_path: Path) -> Dict[str, Any]:
+        source = project_path / NEXT_CACHE_RELATIVE_PATH
+        if not source.is_dir():
+            return {"saved": False, "reason": ".next/cache missing after build"}
+        size = tree_size(source)
+        if self.max_entry_bytes and size > self.max_entry_bytes:
+            return {"saved": False, "reason": "build cache exceeds per-entry cap", "size_bytes": size}
+        entry_dir = self._entries_dir / key
+        self._entries_dir.mkdir(parents=True, exist_ok=True)
+        staging_dir = temp_sibling(entry_dir)
+        try:
+            copy_tree(source, staging_dir)
+            with self._entry_locks.hold(key), self._lock:
+                if entry_dir.exists():
+                    remove_path(entry_dir)
+                os.replace(staging_dir, entry_dir)
+                evicted = self._evict(keep=key)
+        finally:
+            remove_path(staging_dir)
+        return {"saved": True, "size_bytes": size, "evicted": evicted}
+
+    def _evict(self, *, keep: str) -> int:
+        if not self.max_bytes:
+            return 0
+        entries = [
+            (entry, entry.stat().st_mtime, tree_size(entry))
+            for entry in self._entries_dir.iterdir()
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
+        total = sum(size for _entry, _mtime, size in entries)
+        evicted = 0
+        for entry, _mtime, size in sorted(entries, key=lambda item: item[1]):
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            with self._entry_locks.try_hold(entry.name) as free:
+                if not free:
+                    continue  # being restored; a later save retries
+                remove_path(entry)
+            logger.info("Evicted Next.js build cache %s (%s bytes)", entry.name, size)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def _record_build(self, key: str, warm: bool, seconds: float) -> Dict[str, Any]:
+        with self._lock:
+            metrics = self._read_metrics()
+            record = metrics.setdefault(key, {})
+            bucket = record.setdefault("warm" if warm else "cold", {"count": 0, "total_seconds": 0.0})
+            bucket["count"] += 1
+            bucket["total_seconds"] = round(bucket["total_seconds"] + seconds, 3)
+            self._write_metrics(metrics)
+
+        summary: Dict[str, Any] = {"warm": warm, "build_seconds": round(seconds, 3)}
+        for label in ("warm", "cold"):
+            stats = record.get(label)
+            if stats and stats["count"]:
+                summary[f"{label}_builds"] = stats["count"]
+                summary[f"{label}_avg_seconds"] = round(stats["total_seconds"] / stats["count"], 3)
+        if summary.get("warm_avg_seconds") and summary.get("cold_avg_seconds"):
+            summary["speedup_vs_cold"] = round(summary["cold_avg_seconds"] / summary["warm_avg_seconds"], 2)
+        if warm and summary.get("cold_avg_seconds") is not None:
+            summary["saved_seconds_vs_cold"] = round(summary["cold_avg_seconds"] - seconds, 3)
+        return summary
+
+    def _read_metrics(self) -> Dict[str, Dict[str, Any]]:
+        raw = read_optional_text(self._metrics_path)
+        if not raw:
+            return {}
+        try:
+            payload = json.loads(raw)
+        except json.JSONDecodeError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+    def _write_metrics(self, metrics: Dict[str, Dict[str, Any]]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_path = temp_sibling(self._metrics_path)
+        temp_path.write_text(json.dumps(metrics, sort_keys=True))
+        os.replace(temp_path, self._metrics_path)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+
+READ_CHUNK_BYTES = 64 * 1024
+MAX_LINE_CHARS = 4000
+
+
+class OutputRingBuffer:
+    """Bounded line buffer that keeps only the most recent lines of a stream."""
+
+    def __init__(self, max_lines: int, *, max_line_chars: int = MAX_LINE_CHARS) -> None:
+        self._lines: Deque[str] = deque(maxlen=max(1, max_lines))
+        self.max_line_chars = max_line_chars
+        self.total_lines = 0
+        self.total_bytes = 0
+        self.published_lines = 0
+
+    def append(self, line: str) -> None:
+        self.total_lines += 1
+        self.total_bytes += len(line)
+        if len(line) > self.max_line_chars:
+            line = line[: self.max_line_chars] + "… (line truncated)"
+        self._lines.append(line)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_lines > len(self._lines)
+
+    def lines_since(self, seen_lines: int) -> List[str]:
+        """Return lines appended after the first ``seen_lines`` that are still buffered."""
+        unseen = min(self.total_lines - seen_lines, len(self._lines))
+        if unseen <= 0:
+            return []
+        return list(self._lines)[-unseen:]
+
+    def tail(self, lines: Optional[int] = None) -> str:
+        if lines is None or lines >= len(self._lines):
+            return "\n".join(self._lines).strip()
+        return "\n".join(list(self._lines)[-lines:]).strip()
+
+
+def tail_lines(text: str, lines: int) -> str:
+    """Return the last ``lines`` lines of ``text``."""
+    split = text.splitlines()
+    if len(split) <= lines:
+        return text
+    return "\n".join(split[-lines:])
+
+
+async def pump_stream(
+    reader: Optional[asyncio.StreamReader],
+    buffer: OutputRingBuffer,
+    sink: Optional[Callable[[str], None]] = None,
+) -> None:
+    """Read ``reader`` until EOF, pushing decoded lines into ``buffer`` (and ``sink``).
+
+    Reads fixed-size chunks instead of ``readline`` so that a single huge line
+    (minified bundles, progress bars without newlines) cannot exceed the
+    StreamReader limit or grow memory unbounded.
+    """
+    if reader is None:
+        return
+    max_partial = buffer.max_line_chars * 4
+    partial = b""
+    while True:
+        chunk = await reader.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        partial += chunk
+        *lines, partial = partial.split(b"\n")
+        for raw_line in lines:
+            _emit(_decode_line(raw_line), buffer, sink)
+        if len(partial) > max_partial:
+            _emit(_decode_line(partial), buffer, sink)
+            partial = b""
+    if partial:
+        _emit(_decode_line(partial), buffer, sink)
+
+
+def _emit(line: str, buffer: OutputRingBuffer, sink: Optional[Callable[[str], None]]) -> None:
+    buffer.append(line)
+    if sink is not None:
+        sink(line)
+
+
+def _decode_line(raw_line: bytes) -> str:
+    return raw_line.decode(errors="replace").rstrip("\r")
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from .file_ops import KeyedLocks, copy_tree, remove_path, temp_sibling
+
+
+logger = logging.getLogger("cherry-deploy.cache")
+
+
+class DependencyCache:
+    """``node_modules`` snapshots keyed by lockfile hash, plus a shared npm cache directory.
+
+    Both live outside the chatbot repository so ``git clean -fdx`` cannot wipe them.
+    """
+
+    def __init__(self, root: Path, *, max_snapshots: int) -> None:
+        self.root = root
+        self.max_snapshots = max(1, max_snapshots)
+        self.npm_cache_dir = root / "npm"
+        self._snapshots_dir = root / "node_modules"
+        self._locks = KeyedLocks()
+        self._evict_lock = threading.Lock()
+
+    @staticmethod
+    def key_for(lockfile_hash: str, install_command: Iterable[str]) -> str:
+        # The resolved node binary path changes with nvm/toolchain upgrades, which invalidates native addons.
+        node_binary = shutil.which("node")
+        node_identity = os.path.realpath(node_binary) if node_binary else ""
+        payload = "\0".join([lockfile_hash, " ".join(install_command), node_identity])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def has_snapshot(self, key: str) -> bool:
+        return (self._snapshots_dir / key / "node_modules").is_dir()
+
+    async def restore(self, key: str, project_path: Path) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._restore, key, project_path)
+
+    async def save(self, key: str, project_path: Path) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._save, key, project_path)
+
+    def _restore(self, key: str, project_path: Path) -> Optional[Dict[str, Any]]:
+        snapshot_dir = self._snapshots_dir / key
+        with self._locks.hold(key):
+            if not (snapshot_dir / "node_modules").is_dir():
+                return None
+            started = time.monotonic()
+            restored_bytes = copy_tree(snapshot_dir / "node_modules", project_path / "node_modules")
+            os.utime(snapshot_dir)  # LRU marker
+        return {
+            "size_bytes": restored_bytes,
+            "restore_seconds": round(time.monotonic() - started, 3),
+        }
+
+    def _save(self, key: str, project_path: Path) -> Dict[str, Any]:
+        source = project_path / "node_modules"
+        if not source.is_dir():
+            return {"saved": False, "reason": "node_modules missing after install"}
+        snapshot_dir = self._snapshots_dir / key
+        self._snapshots_dir.mkdir(parents=True, exist_ok=True)
+        staging_dir = temp_sibling(snapshot_dir)
+        staging_dir.mkdir()
+        try:
+            size = copy_tree(source, staging_dir / "node_modules")
+            with self._locks.hold(key):
+                if snapshot_dir.exists():
+                    remove_path(snapshot_dir)
+                os.replace(staging_dir, snapshot_dir)
+        finally:
+            remove_path(staging_dir)
+        return {"saved": True, "size_bytes": size, "evicted": self._evict(keep=key)}
+
+    def _evict(self, *, keep: str) -> int:
+        with self._evict_lock:
+            snapshots = sorted(
+                (
+                    entry
+                    for entry in self._snapshots_dir.iterdir()
+                    if entry.is_dir() and not entry.name.startswith(".")
+                ),
+                key=lambda entry: entry.stat().st_mtime,
+                reverse=True,
+            )
+            evicted = 0
+            for entry in snapshots[self.max_snapshots :]:
+                if entry.name == keep:
+                    continue
+                with self._locks.try_hold(entry.name) as free:
+                    if not free:
+                        continue  # being restored; next save retries
+                    remove_path(entry)
+                logger.info("Evicted node_modules snapshot %s", entry.name)
+                evicted += 1
+            return evicted
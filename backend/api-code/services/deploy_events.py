@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Set
+
+from models import utc_now
+
+
+ALL_TASKS = "*"
+LOCAL_TASK_MEMORY = 1024
+
+
+class DeployEventSubscription:
+    """Bounded per-subscriber queue fed by :class:`DeployEventBroker`."""
+
+    def __init__(self, broker: "DeployEventBroker", task_id: str, max_queue: int) -> None:
+        self._broker = broker
+        self.task_id = task_id
+        self._queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=max(1, max_queue))
+        self.dropped = 0
+        self.closed = False
+
+    def _offer(self, event: Dict[str, Any]) -> None:
+        # Slow consumers lose their oldest events instead of back-pressuring the pipeline.
+        if self._queue.full():
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:  # pragma: no cover - race guard
+                pass
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the next event, or None when ``timeout`` elapses first."""
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._broker._unsubscribe(self)
+
+
+class DeployEventBroker:
+    """In-process publisher that fans deploy task events out to stream subscribers.
+
+    Events for tasks run by another process arrive ``relayed`` from the task change
+    feed. Tasks whose pipeline runs in this process are marked local (``mark_local``)
+    so the feed does not echo their writes back as duplicate events; publishing
+    alone does not, since an API worker also publishes for tasks it only queued.
+    """
+
+    def __init__(self, *, max_queue: int = 256) -> None:
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[DeployEventSubscription]] = defaultdict(set)
+        self._sequence = itertools.count(1)
+        self._local_tasks: "OrderedDict[str, None]" = OrderedDict()
+        self.published = 0
+        self.relayed = 0
+
+    def subscribe(self, task_id: str = ALL_TASKS) -> DeployEventSubscription:
+        subscription = DeployEventSubscription(self, task_id, self.max_queue)
+        self._subscribers[task_id].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: DeployEventSubscription) -> None:
+        subscribers = self._subscribers.get(subscription.task_id)
+        if not subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            self._subscribers.pop(subscription.task_id, None)
+
+    def subscriber_count(self, task_id: Optional[str] = None) -> int:
+        if task_id is not None:
+            return len(self._subscribers.get(task_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def mark_local(self, task_id: str) -> None:
+        self._local_tasks[task_id] = None
+        self._local_tasks.move_to_end(task_id)
+        while len(self._local_tasks) > LOCAL_TASK_MEMORY:
+            self._local_tasks.popitem(last=False)
+
+    def is_local(self, task_id: str) -> bool:
+        return task_id in self._local_tasks
+
+    def publish(
+        self,
+        task_id: str,
+        event_type: str,
+        data: Optional[Dict[str, Any]] = None,
+        *,
+        relayed: bool = False,
+    ) -> Dict[str, Any]:
+        event = {
+            "id": next(self._sequence),
+            "task_id": task_id,
+            "type": event_type,
+            "timestamp": utc_now().isoformat(),
+            "data": data or {},
+        }
+        if relayed:
+            event["relayed"] = True
+            self.relayed += 1
+        self.published += 1
+        for key in (task_id, ALL_TASKS):
+            for subscription in tuple(self._subscribers.get(key, ())):
+                subscription._offer(event)
+        return event
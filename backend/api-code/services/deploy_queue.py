@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import socket
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, Set
+
+from domain import DeployJobKind, DeployJobState, DeployStatus
+from models import DeployJob, DeployTask, DeployTaskUpdate, utc_now
+from settings import Settings
+
+from .deploy_service import DeployService
+
+
+logger = logging.getLogger("cherry-deploy.queue")
+
+WAIT_SAMPLE_SIZE = 50
+
+
+class DeployQueue:
+    """Durable deploy/rollback queue persisted through the task repository.
+
+    API handlers enqueue a job next to each task; the worker loop claims jobs in
+    FIFO order under a renewable lease and runs them through ``DeployService`` —
+    one at a time with a shared checkout, or up to the service's pipeline cap
+    (one per branch) in worktree isolation mode.
+    A job whose worker died (no heartbeat before the lease lapses) is reclaimed,
+    and its task is reset to ``pending`` so the pipeline restarts from the clone stage.
+    """
+
+    def __init__(self, deploy_service: DeployService, settings: Settings) -> None:
+        self.deploy_service = deploy_service
+        # Must survive restarts: startup releases every lease still held under this id.
+        self.worker_id = (settings.deploy_queue_worker_id or "").strip() or socket.gethostname()
+        self.lease_seconds = max(5.0, settings.deploy_queue_lease_seconds)
+        self.heartbeat_seconds = self.lease_seconds / 3
+        self.poll_seconds = max(0.05, settings.deploy_queue_poll_seconds)
+        self.max_attempts = max(1, settings.deploy_queue_max_attempts)
+        self.coalesce_requests = settings.deploy_coalesce_requests
+        self._submit_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task[None]] = None
+        self._runners: Set[asyncio.Task[None]] = set()
+        self._active: Dict[str, str] = {}  # job_id -> branch
+        self._wait_samples: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._processed = 0
+
+    @property
+    def concurrency(self) -> int:
+        if self.deploy_service.isolation_mode != "worktree":
+            return 1
+        return self.deploy_service.max_parallel_pipelines
+
+    @property
+    def repository(self) -> Any:
+        # Resolved on each use: startup may swap the Mongo repository for the in-memory one.
+        return self.deploy_service.repository
+
+    async def enqueue(
+        self,
+        task: DeployTask,
+        *,
+        kind: DeployJobKind = DeployJobKind.DEPLOY,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> DeployJob:
+        job = DeployJob(
+            _id=task.task_id,
+            kind=kind,
+            branch=task.metadata.get("branch", self.deploy_service.default_branch),
+            payload=payload or {},
+        )
+        await self.repository.enqueue_job(job)
+        self._wakeup.set()
+        return job
+
+    async def submit_deploy(self, branch: Optional[str]) -> tuple[DeployTask, Optional[DeployJob]]:
+        """Queue a deploy for ``branch``; returns ``(task, absorbing_job)``.
+
+        ``absorbing_job`` is set when the request was coalesced into a deploy that is
+        still waiting in the queue: the pipeline fetches the branch head when it
+        starts, so one run covers every request made before then.
+        """
+        branch = self.deploy_service.resolve_branch(branch)
+        # Serializes the check-then-create within this process so a burst cannot enqueue twice.
+        async with self._submit_lock:
+            while self.coalesce_requests:
+                job = await self.repository.coalesce_queued_job(branch, DeployJobKind.DEPLOY)
+                if job is None:
+                    break
+                task = await self.repository.get_task(job.job_id)
+                if task is not None:
+                    await self._record_coalesced_request(task, job)
+                    return task, job
+                # Its task is gone (the worker would drop it too): retire the job so later
+                # requests stop folding into it, and take back the count just added.
+                await self.repository.discard_queued_job(job.job_id, error="task no longer exists")
+            task = await self.deploy_service.create_task(branch=branch)
+            await self.enqueue(task, kind=DeployJobKind.DEPLOY)
+            return task, None
+
+    async def _record_coalesced_request(self, task: DeployTask, job: DeployJob) -> None:
+        requested_at = utc_now().isoformat()
+        await self.repository.update_task(
+            job.job_id,
+            DeployTaskUpdate(
+                append_metadata={"coalesced": {"requests": job.coalesced, "last_requested_at": requested_at}}
+            ),
+        )
+        self.deploy_service.events.publish(
+            job.job_id, "coalesced", {"requests": job.coalesced, "requested_at": requested_at}
+        )
+        logger.info(
+            "Coalesced deploy request into queued task=%s branch=%s (absorbed=%s)",
+            task.task_id,
+            job.branch,
+            job.coalesced,
+        )
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="deploy-queue-worker")
+
+    async def stop(self) -> None:
+        # Interrupted jobs keep their lease and are reclaimed by the next start.
+        pending = [task for task in (self._worker, *self._runners) if task is not None]
+        for task in pending:
+            task.cancel()
+        for task in pending:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._worker = None
+
+    async def stats(self) -> Dict[str, Any]:
+        stats = dict(await self.repository.get_queue_stats())
+        oldest = stats.get("oldest_enqueued_at")
+        stats["oldest_wait_seconds"] = (
+            round((utc_now() - _as_utc(oldest)).total_seconds(), 3) if oldest else 0.0
+        )
+        stats["avg_wait_seconds"] = (
+            round(sum(self._wait_samples) / len(self._wait_samples), 3) if self._wait_samples else None
+        )
+        stats.update(
+            {
+                "worker_id": self.worker_id,
+                "worker_running": self._worker is not None and not self._worker.done(),
+                "concurrency": self.concurrency,
+                "current_task_ids": sorted(self._active),
+                "processed": self._processed,
+            }
+        )
+        return stats
+
+    async def run_once(self) -> Optional[DeployJob]:
+        """Claim and run at most one job; returns it, or ``None`` when the queue is empty."""
+        job = await self.repository.claim_next_job(self.worker_id, self.lease_seconds)
+        if job is None:
+            return None
+        await self._process(job)
+        return job
+
+    async def _run(self) -> None:
+        released = await self.repository.release_worker_jobs(self.worker_id)
+        if released:
+            logger.warning("Reclaiming %s deploy job(s) interrupted by a previous run.", released)
+        logger.info("Deploy queue worker %s started (concurrency=%s).", self.worker_id, self.concurrency)
+        while True:
+            # Cleared before claiming so an enqueue or a finished job during the claim is not missed.
+            self._wakeup.clear()
+            try:
+                await self._fill_slots()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Deploy queue iteration failed (%s)", exc)
+            # Not wait_for: before Python 3.12 it swallows a cancel that races the wakeup,
+            # which left stop() waiting on a worker that kept looping.
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=self.poll_seconds)
+            finally:
+                waiter.cancel()
+
+    async def _fill_slots(self) -> None:
+        while len(self._active) < self.concurrency:
+            # A branch runs one job at a time; its next job waits for the checkout to be free.
+            job = await self.repository.claim_next_job(
+                self.worker_id,
+                self.lease_seconds,
+                exclude_branches=sorted(set(self._active.values())),
+            )
+            if job is None:
+                return
+            self._active[job.job_id] = job.branch
+            runner = asyncio.create_task(self._process(job), name=f"deploy-job-{job.job_id}")
+            self._runners.add(runner)
+            runner.add_done_callback(self._on_runner_done)
+
+    def _on_runner_done(self, runner: "asyncio.Task[None]") -> None:
+        self._runners.discard(runner)
+        self._wakeup.set()
+
+    async def _process(self, job: DeployJob) -> None:
+        self._active[job.job_id] = job.branch
+        heartbeat = asyncio.create_task(self._heartbeat(job.job_id))
+        state, error = DeployJobState.DONE, None
+        try:
+            if await self._prepare_task(job):
+                await self._dispatch(job)
+            task = await self.repository.get_task(job.job_id)
+            if task is not None and task.status == DeployStatus.FAILED:
+                state, error = DeployJobState.FAILED, task.error_log
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Deploy job %s crashed (%s)", job.job_id, exc)
+            state, error = DeployJobState.FAILED, str(exc)
+        finally:
+            heartbeat.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await heartbeat
+            self._active.pop(job.job_id, None)
+        await self.repository.finish_job(job.job_id, self.worker_id, state=state, error=error)
+        self._processed += 1
+
+    async def _prepare_task(self, job: DeployJob) -> bool:
+        """Record queue timing on the task and reset it when recovering an interrupted run."""
+        task = await self.repository.get_task(job.job_id)
+        if task is None:
+            logger.warning("Dropping deploy job %s: task no longer exists.", job.job_id)
+            return False
+        status = DeployStatus(task.status)
+        if status.is_terminal:
+            return False
+
+        claimed_at = _as_utc(job.claimed_at) if job.claimed_at else utc_now()
+        wait_seconds = max(0.0, (claimed_at - _as_utc(job.enqueued_at)).total_seconds())
+        queue_meta: Dict[str, Any] = {
+            "worker_id": self.worker_id,
+            "attempt": job.attempts,
+            "wait_seconds": round(wait_seconds, 3),
+        }
+        if job.attempts == 1:
+            self._wait_samples.append(wait_seconds)
+
+        if status != DeployStatus.PENDING:
+            if job.attempts > self.max_attempts:
+                error = f"deploy job abandoned after {job.attempts - 1} interrupted attempt(s)"
+                await self.repository.mark_status(job.job_id, DeployStatus.FAILED, error_log=error)
+                self.deploy_service.events.publish(
+                    job.job_id,
+                    "status",
+                    {"status": DeployStatus.FAILED.value, "terminal": True, "error_log": error},
+                )
+                return False
+            logger.warning(
+                "Recovering deploy task %s stuck in %s (attempt %s).", job.job_id, status.value, job.attempts
+            )
+            queue_meta["recovered_from"] = status.value
+            await self.repository.update_task(
+                job.job_id,
+                DeployTaskUpdate(status=DeployStatus.PENDING, append_metadata={"queue": queue_meta}),
+            )
+            return True
+
+        await self.repository.update_task(job.job_id, DeployTaskUpdate(append_metadata={"queue": queue_meta}))
+        return True
+
+    async def _dispatch(self, job: DeployJob) -> None:
+        if job.kind == DeployJobKind.ROLLBACK:
+            await self.deploy_service.perform_rollback(
+                job.job_id,
+                job.branch,
+                job.payload["target_commit"],
+                job.payload.get("current_commit"),
+            )
+        else:
+            await self.deploy_service.run_pipeline(job.job_id, job.branch)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                if not await self.repository.heartbeat_job(job_id, self.worker_id, self.lease_seconds):
+                    logger.warning("Lost lease on deploy job %s.", job_id)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Deploy job heartbeat failed job=%s (%s)", job_id, exc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Mongo returns naive UTC datetimes unless the client is tz_aware.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import binascii
+import contextlib
+import copy
+import functools
 import logging
 import os
 import re
@@ -8,23 +13,36 @@ import shlex
 import shutil
 import textwrap
 import time
+from contextvars import ContextVar
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional
 from uuid import uuid4
 
 import getpass
 import json
-from urllib import error as urllib_error, parse as urllib_parse, request as urllib_request
 from zoneinfo import ZoneInfo
 
 import google.generativeai as genai
 
-from domain import DeployStatus, is_valid_transition
-from models import DeployTask, DeployTaskCreate, DeployTaskUpdate, utc_now
+from domain import DeployStatus
+from models import DeployTask, DeployTaskCreate, DeployTaskQuery, DeployTaskUpdate, LLMPreviewMemo, utc_now
 from repositories import DeployTaskRepository
 from settings import Settings
 
+from .command_output import OutputRingBuffer, pump_stream, tail_lines
+from .artifact_cache import BuildArtifactCache
+from .build_cache import NextBuildCache
+from .dependency_cache import DependencyCache
+from .deploy_events import DeployEventBroker, DeployEventSubscription
+from .file_ops import hash_file, hash_tree
+from .diff_summary import DiffSummary, RangeChanges, github_file_changes
+from .github_compare import COMPARE_FILE_LIMIT, GitHubCompareClient
+from .log_store import StepLogWriter, read_log_range
+from .preview_cache import PreviewCache
+from .single_flight import SingleFlight
+from .slot_sync import BlueGreenSyncEngine
+
 
 logger = logging.getLogger("cherry-deploy.deploy")
 
@@ -58,6 +76,30 @@ STAGE_PLAN_DESCRIPTIONS: Dict[str, str] = {
 
 ESTIMATED_DEPLOY_HOURLY_COST = 6.0  # rough EC2/engineer blended cost per hour (USD)
 COMMIT_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+LOCKFILE_NAMES = ("package-lock.json", "pnpm-lock.yaml", "yarn.lock")
+# Environment that changes the exported bundle and therefore belongs in the build fingerprint.
+BUILD_FINGERPRINT_ENV_PREFIXES = ("NEXT_PUBLIC_",)
+BUILD_FINGERPRINT_ENV_KEYS = ("NODE_ENV",)
+BUILD_FINGERPRINT_EXCLUDED_DIRS = ("node_modules", ".next", ".git")
+DEPENDENCY_CACHE_SAVED_SECONDS = 40  # share of the default build ETA spent in a cold npm install
+
+ISOLATION_MODES = ("shared", "worktree")
+_BRANCH_DIR_PATTERN = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class _Checkout(NamedTuple):
+    repo_path: Path
+    project_path: Path
+    output_path: Optional[Path]
+
+
+# Checkout used by the pipeline running in the current task (per-branch worktree or the shared repo).
+_PIPELINE_CHECKOUT: ContextVar[Optional[_Checkout]] = ContextVar("deploy_pipeline_checkout", default=None)
+
+# (task_id, stage) whose metadata receives live output of the commands currently running.
+_STAGE_LOG_TARGET: ContextVar[Optional[tuple[str, str]]] = ContextVar(
+    "deploy_stage_log_target", default=None
+)
 
 
 class AsyncReentrantLock:
@@ -68,6 +110,10 @@ class AsyncReentrantLock:
         self._owner: Optional[asyncio.Task[Any]] = None
         self._depth = 0
 
+    @property
+    def locked(self) -> bool:
+        return self._owner is not None
+
     async def acquire(self) -> None:
         current = asyncio.current_task()
         if current is None:
@@ -116,6 +162,23 @@ class CommandExecutionError(RuntimeError):
         super().__init__(f"command failed ({' '.join(command)}): {message}")
 
 
+def _encode_history_cursor(task: DeployTask) -> str:
+    started_at = task.started_at
+    if started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    raw = json.dumps({"started_at": started_at.isoformat(), "task_id": task.task_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_history_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return datetime.fromisoformat(payload["started_at"]), str(payload["task_id"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise ValueError("invalid task history cursor") from exc
+
+
 class DeployService:
     """Coordinates deploy task lifecycle and orchestrates pipeline execution."""
 
@@ -123,11 +186,14 @@ class DeployService:
         self.repository = repository
         self.settings = settings
         self.dry_run = settings.deploy_dry_run
-        self.chatbot_repo_path = Path(settings.chatbot_repo_path)
-        self.frontend_project_path = self._resolve_frontend_path(settings.frontend_project_subdir)
+        self._chatbot_repo_path = Path(settings.chatbot_repo_path)
+        self._frontend_project_path = self._resolve_frontend_path(settings.frontend_project_subdir)
         self.nginx_green_path = Path(settings.nginx_green_path)
         self.nginx_blue_path = Path(settings.nginx_blue_path)
         self.nginx_live_symlink = Path(settings.nginx_live_symlink)
+        self.slot_sync = BlueGreenSyncEngine(
+            workers=settings.cutover_sync_workers or min(8, (os.cpu_count() or 1) + 2)
+        )
         self.default_branch = settings.deploy_default_branch.strip()
         self.allowed_branches = {
             branch.strip()
@@ -145,17 +211,97 @@ class DeployService:
         self.frontend_build_command = self._parse_command(settings.frontend_build_command)
         export_cmd = (settings.frontend_export_command or "").strip()
         self.frontend_export_command = self._parse_command(export_cmd) if export_cmd else None
-        self.frontend_build_output_path = self._resolve_output_path(
+        self._frontend_build_output_path = self._resolve_output_path(
             settings.frontend_build_output_subdir
         )
+        self.isolation_mode = settings.deploy_isolation_mode.strip().lower()
+        if self.isolation_mode not in ISOLATION_MODES:
+            logger.warning("Unknown DEPLOY_ISOLATION_MODE=%s; using 'shared'.", self.isolation_mode)
+            self.isolation_mode = "shared"
+        self.worktree_root = (
+            Path(settings.deploy_worktree_root).expanduser()
+            if settings.deploy_worktree_root
+            else self._chatbot_repo_path.parent / f"{self._chatbot_repo_path.name}-worktrees"
+        )
+        self.max_parallel_pipelines = (
+            max(1, settings.deploy_max_parallel_pipelines)
+            if settings.deploy_max_parallel_pipelines > 0
+            else max(1, (os.cpu_count() or 1) // 2)
+        )
         self.dev_server_mode = self.frontend_build_output_path is None
+        self.cache_root = Path(settings.deploy_cache_root).expanduser()
+        self.artifact_cache = (
+            BuildArtifactCache(
+                self.cache_root / "artifacts",
+                max_bytes=max(0, settings.build_artifact_cache_max_mb) * 1024 * 1024,
+            )
+            if settings.build_artifact_cache_enabled
+            else None
+        )
+        self.next_build_cache = (
+            NextBuildCache(
+                self.cache_root / "next-cache",
+                max_bytes=settings.next_build_cache_max_mb * 1024 * 1024,
+                max_entry_bytes=settings.next_build_cache_entry_max_mb * 1024 * 1024,
+            )
+            if settings.next_build_cache_enabled
+            else None
+        )
+        self.frontend_project_subdir = settings.frontend_project_subdir
+        self.frontend_ci_install_command = self._parse_command(settings.frontend_ci_install_command)
+        self.dependency_cache = (
+            DependencyCache(
+                self.cache_root / "dependencies",
+                max_snapshots=settings.dependency_cache_max_snapshots,
+            )
+            if settings.dependency_cache_enabled and self.frontend_ci_install_command
+            else None
+        )
+        self.stream_command_output = settings.deploy_stream_command_output
+        self.log_tail_lines = max(1, int(settings.deploy_log_tail_lines or 1))
+        self.log_metadata_tail_lines = max(1, int(settings.deploy_log_metadata_tail_lines or 1))
+        self.log_flush_seconds = max(0.1, float(settings.deploy_log_flush_seconds or 0.1))
         self.preview_use_github_compare = settings.preview_use_github_compare
         self.github_compare_repo = (settings.github_compare_repo or "").strip()
         self.github_compare_head_ref = (settings.github_compare_head_ref or "").strip()
         self.github_compare_token = (settings.github_compare_token or "").strip() or None
-        self.github_compare_cache_seconds = max(0, int(settings.github_compare_cache_seconds or 0))
-        self._compare_cache: Dict[str, tuple[float, Dict[str, Any]]] = {}
+        self.github_compare_max_commits = max(0, settings.github_compare_max_commits)
+        self.github_compare: Optional[GitHubCompareClient] = None
+        if self.preview_use_github_compare and self.github_compare_repo:
+            try:
+                self.github_compare = GitHubCompareClient(
+                    self.github_compare_repo,
+                    token=self.github_compare_token,
+                    api_url=settings.github_api_url,
+                    cache_seconds=max(0, int(settings.github_compare_cache_seconds or 0)),
+                    max_entries=settings.github_compare_cache_max_entries,
+                    concurrency=settings.github_compare_concurrency,
+                )
+            except RuntimeError as exc:
+                logger.warning("GitHub Compare API disabled (%s); using local git diff.", exc)
+        # Dashboards fire /preview, /status and /healthz together; identical git/LLM work runs once.
+        self.single_flight = SingleFlight()
+        self.preview_cache = PreviewCache(
+            lambda: self.repository,
+            fingerprint={
+                "branch": self.default_branch,
+                "compare_repo": self.github_compare_repo if self._should_use_github_compare() else None,
+                "compare_head_ref": self.github_compare_head_ref,
+            },
+            ttl_seconds=settings.preview_cache_ttl_seconds,
+            pointer_seconds=settings.preview_cache_pointer_seconds,
+        )
+        self.llm_memo_ttl_seconds = max(0, settings.llm_memo_ttl_seconds)
+        self.llm_memo_max_entries = max(0, settings.llm_memo_max_entries)
         self._pipeline_lock = AsyncReentrantLock()
+        self._branch_locks: Dict[str, AsyncReentrantLock] = {}
+        self._pipeline_slots = asyncio.Semaphore(self.max_parallel_pipelines)
+        # The live symlink/slots and the base repository's refs are shared by every branch.
+        self._cutover_lock = asyncio.Lock()
+        self._git_lock = asyncio.Lock()
+        self.preflight_wait_seconds = max(0.0, settings.preflight_wait_seconds)
+        self._background_tasks: set[asyncio.Task[Any]] = set()
+        self.events = DeployEventBroker()
         if self.preview_use_github_compare and not self.github_compare_repo:
             logger.warning(
                 "PREVIEW_USE_GITHUB_COMPARE is enabled but GITHUB_COMPARE_REPO is not configured; "
@@ -168,21 +314,74 @@ class DeployService:
             self.display_timezone = ZoneInfo("UTC")
             self.display_timezone_name = "UTC"
 
-    def _resolve_frontend_path(self, subdir: str) -> Path:
+    @property
+    def chatbot_repo_path(self) -> Path:
+        checkout = _PIPELINE_CHECKOUT.get()
+        return checkout.repo_path if checkout else self._chatbot_repo_path
+
+    @property
+    def frontend_project_path(self) -> Path:
+        checkout = _PIPELINE_CHECKOUT.get()
+        return checkout.project_path if checkout else self._frontend_project_path
+
+    @property
+    def frontend_build_output_path(self) -> Optional[Path]:
+        checkout = _PIPELINE_CHECKOUT.get()
+        return checkout.output_path if checkout else self._frontend_build_output_path
+
+    @frontend_build_output_path.setter
+    def frontend_build_output_path(self, value: Optional[Path]) -> None:
+        self._frontend_build_output_path = value
+
+    def _resolve_frontend_path(self, subdir: str, repo_path: Optional[Path] = None) -> Path:
         subdir = (subdir or "").strip()
         candidate = Path(subdir)
         if candidate.is_absolute():
             return candidate
-        return (self.chatbot_repo_path / candidate).resolve()
+        return ((repo_path or self._chatbot_repo_path) / candidate).resolve()
 
-    def _resolve_output_path(self, subdir: str) -> Optional[Path]:
+    def _resolve_output_path(self, subdir: str, project_path: Optional[Path] = None) -> Optional[Path]:
         subdir = (subdir or "").strip()
         if not subdir:
             return None
         candidate = Path(subdir)
         if candidate.is_absolute():
             return candidate
-        return (self.frontend_project_path / candidate).resolve()
+        return ((project_path or self._frontend_project_path) / candidate).resolve()
+
+    def worktree_path_for(self, branch: str) -> Path:
+        return self.worktree_root / (_BRANCH_DIR_PATTERN.sub("_", branch) or "_")
+
+    def _checkout_for(self, branch: str) -> _Checkout:
+        if self.isolation_mode != "worktree":
+            return _Checkout(self._chatbot_repo_path, self._frontend_project_path, self._frontend_build_output_path)
+        repo_path = self.worktree_path_for(branch)
+        project_path = self._resolve_frontend_path(self.settings.frontend_project_subdir, repo_path)
+        output_path = self._resolve_output_path(self.settings.frontend_build_output_subdir, project_path)
+        return _Checkout(repo_path, project_path, output_path)
+
+    def _pipeline_lock_for(self, branch: str) -> AsyncReentrantLock:
+        if self.isolation_mode != "worktree":
+            return self._pipeline_lock
+        return self._branch_locks.setdefault(branch, AsyncReentrantLock())
+
+    @contextlib.asynccontextmanager
+    async def _pipeline_slot(self, branch: str) -> AsyncIterator[None]:
+        """Hold the checkout's lock and a global pipeline slot, and bind the branch checkout."""
+        async with contextlib.AsyncExitStack() as stack:
+            await stack.enter_async_context(self._pipeline_lock_for(branch))
+            # Auto-rollback re-enters run_pipeline from inside a pipeline that already holds a slot.
+            if _PIPELINE_CHECKOUT.get() is None:
+                await stack.enter_async_context(self._pipeline_slots)
+            token = _PIPELINE_CHECKOUT.set(self._checkout_for(branch))
+            try:
+                yield
+            finally:
+                _PIPELINE_CHECKOUT.reset(token)
+
+    def busy_branches(self) -> set[str]:
+        """Branches whose checkout is currently locked by a running pipeline (worktree mode)."""
+        return {branch for branch, lock in self._branch_locks.items() if lock.locked}
 
     @staticmethod
     def _parse_command(command: str) -> list[str]:
@@ -293,6 +492,9 @@ class DeployService:
         build_seconds = STAGE_DEFAULT_SECONDS[DeployStatus.RUNNING_BUILD.value] + file_count * 5
         if lockfile:
             build_seconds += 45
+        elif self.dependency_cache is not None:
+            # Unchanged lockfile: node_modules comes from the snapshot instead of npm install.
+            build_seconds -= DEPENDENCY_CACHE_SAVED_SECONDS
         if config:
             build_seconds += 15
         build_seconds = min(build_seconds, 420)
@@ -351,9 +553,9 @@ class DeployService:
         return list(dict.fromkeys(warnings))
 
     async def _prepare_preview_inputs(
-        self,
+        self, *, head_commit: Optional[str] = None
     ) -> tuple[Dict[str, Any], Dict[str, Any], Dict[str, int], List[str], Dict[str, Any]]:
-        diff_context = await self._resolve_preview_context()
+        diff_context = await self._resolve_preview_context(head_commit=head_commit)
         diff_stats = diff_context.get("diff_stats", {})
         stage_seconds = self._estimate_stage_seconds(diff_stats)
         warnings = self._build_preview_warnings(diff_stats, diff_context)
@@ -382,12 +584,16 @@ class DeployService:
             context["actor"] = actor
         return context
 
-    async def create_task(self, *, branch: str) -> DeployTask:
+    def resolve_branch(self, branch: Optional[str]) -> str:
         branch = (branch or self.default_branch).strip()
         if branch not in self.allowed_branches:
             raise ValueError(
                 f"Branch '{branch}' is not allowed. Allowed branches: {sorted(self.allowed_branches)}"
             )
+        return branch
+
+    async def create_task(self, *, branch: str) -> DeployTask:
+        branch = self.resolve_branch(branch)
         task_id = uuid4().hex
         metadata: Dict[str, Any] = {
             "branch": branch,
@@ -405,11 +611,7 @@ class DeployService:
     async def prepare_rollback(
         self, branch: Optional[str] = None
     ) -> tuple[DeployTask, str, Optional[str], str]:
-        branch = (branch or self.default_branch).strip()
-        if branch not in self.allowed_branches:
-            raise ValueError(
-                f"Branch '{branch}' is not allowed. Allowed branches: {sorted(self.allowed_branches)}"
-            )
+        branch = self.resolve_branch(branch)
 
         recent = await self.repository.get_recent_successes(branch=branch, limit=2)
         if len(recent) < 2:
@@ -493,6 +695,12 @@ class DeployService:
             raise RuntimeError(f"deploy task not found: {task_id}")
         return task
 
+    async def get_task_revision(self, task_id: str) -> int:
+        revision = await self.repository.get_task_revision(task_id)
+        if revision is None:
+            raise RuntimeError(f"deploy task not found: {task_id}")
+        return revision
+
     async def run_pipeline(
         self,
         task_id: str,
@@ -501,7 +709,9 @@ class DeployService:
         target_commit: Optional[str] = None,
         force_push: bool = False,
     ) -> None:
-        async with self._pipeline_lock:
+        # Before the first write, so the change feed never relays this task's own updates.
+        self.events.mark_local(task_id)
+        async with self._pipeline_slot(branch):
             logger.info(
                 "Starting deploy pipeline task=%s branch=%s target_commit=%s force_push=%s",
                 task_id,
@@ -512,61 +722,70 @@ class DeployService:
             task_document = await self.repository.get_task(task_id)
             action = (task_document.metadata.get("action") if task_document else None) or "deploy"
             auto_recovery: Optional[Dict[str, Any]] = None
-            try:
-                await self._prime_preflight_metadata(task_id)
-            except Exception as snapshot_exc:  # pragma: no cover - diagnostic only
-                logger.warning(
-                    "Unable to cache preflight snapshot for task=%s (%s)",
-                    task_id,
-                    snapshot_exc,
-                )
+            preflight = await self._start_preflight(task_id)
 
             try:
                 await self._ensure_valid_transition(task_id, DeployStatus.RUNNING_CLONE)
-                clone_metadata = await self._run_clone_stage(
-                    branch,
-                    target_commit=target_commit,
-                    force_push=force_push,
-                )
-                await self._append_stage_metadata(task_id, DeployStatus.RUNNING_CLONE, clone_metadata)
+                with self._stage_log_target(task_id, DeployStatus.RUNNING_CLONE):
+                    clone_metadata = await self._run_clone_stage(
+                        branch,
+                        target_commit=target_commit,
+                        force_push=force_push,
+                    )
 
-                await self._ensure_valid_transition(task_id, DeployStatus.RUNNING_BUILD)
-                build_metadata = await self._run_build_stage()
-                await self._append_stage_metadata(task_id, DeployStatus.RUNNING_BUILD, build_metadata)
+                await self._ensure_valid_transition(
+                    task_id,
+                    DeployStatus.RUNNING_BUILD,
+                    finished_stage=(DeployStatus.RUNNING_CLONE, clone_metadata),
+                )
+                with self._stage_log_target(task_id, DeployStatus.RUNNING_BUILD):
+                    build_metadata = await self._run_build_stage(branch)
 
-                await self._ensure_valid_transition(task_id, DeployStatus.RUNNING_CUTOVER)
-                cutover_metadata = await self._run_cutover_stage()
-                await self._append_stage_metadata(task_id, DeployStatus.RUNNING_CUTOVER, cutover_metadata)
+                await self._ensure_valid_transition(
+                    task_id,
+                    DeployStatus.RUNNING_CUTOVER,
+                    finished_stage=(DeployStatus.RUNNING_BUILD, build_metadata),
+                )
+                with self._stage_log_target(task_id, DeployStatus.RUNNING_CUTOVER):
+                    async with self._cutover_lock:
+                        cutover_metadata = await self._run_cutover_stage()
 
-                await self._ensure_valid_transition(task_id, DeployStatus.RUNNING_OBSERVABILITY)
-                observability_metadata = await self._run_observability_stage()
-                await self._append_stage_metadata(
+                await self._ensure_valid_transition(
                     task_id,
                     DeployStatus.RUNNING_OBSERVABILITY,
-                    observability_metadata,
+                    finished_stage=(DeployStatus.RUNNING_CUTOVER, cutover_metadata),
                 )
+                with self._stage_log_target(task_id, DeployStatus.RUNNING_OBSERVABILITY):
+                    observability_metadata = await self._run_observability_stage()
 
-                await self.repository.mark_status(task_id, DeployStatus.COMPLETED)
+                await self._await_preflight(task_id, preflight)
                 summary_commit = await self._get_current_commit()
                 commit_details = await self._get_commit_details()
                 actor_identity = self._resolve_actor_identity()
-                await self.repository.update_task(
+                await self._ensure_valid_transition(
                     task_id,
-                    DeployTaskUpdate(
-                        append_metadata={
-                            "summary": {
-                                "completed_at": utc_now().isoformat(),
-                                "result": "success",
-                                "commit": summary_commit,
-                                "git_commit": commit_details,
-                                "actor": actor_identity,
-                            }
+                    DeployStatus.COMPLETED,
+                    finished_stage=(DeployStatus.RUNNING_OBSERVABILITY, observability_metadata),
+                    extra_metadata={
+                        "summary": {
+                            "completed_at": utc_now().isoformat(),
+                            "result": "success",
+                            "commit": summary_commit,
+                            "git_commit": commit_details,
+                            "actor": actor_identity,
                         }
-                    ),
+                    },
+                )
+                self.preview_cache.forget_base()
+                self.events.publish(
+                    task_id,
+                    "status",
+                    {"status": DeployStatus.COMPLETED.value, "terminal": True, "commit": summary_commit},
                 )
                 logger.info("Deploy pipeline succeeded task=%s", task_id)
             except Exception as exc:  # pylint: disable=broad-except
                 logger.exception("Deploy pipeline failed task=%s error=%s", task_id, exc)
+                await self._await_preflight(task_id, preflight)
                 await self.repository.mark_status(
                     task_id,
                     DeployStatus.FAILED,
@@ -597,48 +816,126 @@ class DeployService:
                         append_metadata={"failure_context": failure_metadata},
                     ),
                 )
+                self.events.publish(
+                    task_id,
+                    "status",
+                    {"status": DeployStatus.FAILED.value, "terminal": True, "error_log": str(exc)},
+                )
 
-    async def _ensure_valid_transition(self, task_id: str, new_status: DeployStatus) -> None:
-        document = await self.repository.get_task(task_id)
-        if not document:
-            raise RuntimeError(f"deploy task not found: {task_id}")
-        if not is_valid_transition(document.status, new_status):
+    async def _ensure_valid_transition(
+        self,
+        task_id: str,
+        new_status: DeployStatus,
+        *,
+        finished_stage: Optional[tuple[DeployStatus, Dict[str, Any]]] = None,
+        extra_metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Move the task to ``new_status`` in one conditional write.
+
+        ``finished_stage`` carries the metadata of the stage that just ended so it
+        rides along with the transition instead of costing its own round trip.
+        """
+        append_metadata: Dict[str, Any] = dict(extra_metadata or {})
+        if not new_status.is_terminal:
+            append_metadata[new_status.value] = {"timestamp": utc_now().isoformat()}
+        if finished_stage is not None:
+            stage, metadata = finished_stage
+            metadata = dict(metadata)
+            metadata.setdefault("timestamp", utc_now().isoformat())
+            append_metadata[stage.value] = metadata
+        previous = await self.repository.transition_status(
+            task_id, new_status, append_metadata=append_metadata
+        )
+        if previous is None:
+            # Only the failure path pays for a read, to say why the write did not match.
+            document = await self.repository.get_task(task_id)
+            if not document:
+                raise RuntimeError(f"deploy task not found: {task_id}")
             raise RuntimeError(
                 f"invalid status transition from {document.status} to {new_status}"
             )
-        await self.repository.update_task(
-            task_id,
-            DeployTaskUpdate(
-                status=new_status,
-                append_metadata={
-                    new_status.value: {"timestamp": utc_now().isoformat()}
-                },
-            ),
+        if finished_stage is not None:
+            self.events.publish(task_id, "stage_finished", {"stage": finished_stage[0].value})
+        if not new_status.is_terminal:
+            self.events.publish(
+                task_id,
+                "stage_started",
+                {"status": new_status.value, "stage": new_status.value, "previous_status": previous.value},
+            )
+
+    def subscribe_task_events(self, task_id: str) -> DeployEventSubscription:
+        """Subscribe to live events (stage/step transitions, log chunks) for ``task_id``."""
+        return self.events.subscribe(task_id)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _stage_log_target(task_id: str, status: DeployStatus) -> Iterator[None]:
+        token = _STAGE_LOG_TARGET.set((task_id, status.value))
+        try:
+            yield
+        finally:
+            _STAGE_LOG_TARGET.reset(token)
+
+    async def _start_preflight(self, task_id: str) -> "asyncio.Task[Optional[Dict[str, Any]]]":
+        """Launch the preflight snapshot beside the pipeline so LLM latency stays off the critical path.
+
+        HEAD is pinned first: the clone stage moves it while the diff is being computed.
+        """
+        try:
+            head_commit: Optional[str] = await self._get_current_commit()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.debug("Preflight could not pin HEAD for task=%s (%s)", task_id, exc)
+            head_commit = None
+        preflight = asyncio.create_task(
+            self._run_preflight_side_task(task_id, head_commit), name=f"preflight-{task_id}"
         )
+        self._background_tasks.add(preflight)
+        preflight.add_done_callback(self._background_tasks.discard)
+        return preflight
 
-    async def _append_stage_metadata(
-        self,
-        task_id: str,
-        status: DeployStatus,
-        metadata: Dict[str, Any],
-    ) -> None:
-        metadata = dict(metadata)
-        metadata.setdefault("timestamp", utc_now().isoformat())
-        await self.repository.update_task(
+    async def _run_preflight_side_task(
+        self, task_id: str, head_commit: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        started = time.monotonic()
+        try:
+            snapshot = await self._prime_preflight_metadata(task_id, head_commit=head_commit)
+        except Exception as snapshot_exc:  # pragma: no cover - diagnostic only
+            logger.warning(
+                "Unable to cache preflight snapshot for task=%s (%s)",
+                task_id,
+                snapshot_exc,
+            )
+            return None
+        self.events.publish(
             task_id,
-            DeployTaskUpdate(
-                append_metadata={status.value: metadata},
-            ),
+            "preflight_ready",
+            {"duration_seconds": round(time.monotonic() - started, 3), "snapshot": snapshot},
         )
+        return snapshot
+
+    async def _await_preflight(
+        self, task_id: str, preflight: "asyncio.Task[Optional[Dict[str, Any]]]"
+    ) -> None:
+        # Shielded: on timeout the snapshot keeps running and is written whenever it finishes.
+        try:
+            await asyncio.wait_for(asyncio.shield(preflight), timeout=self.preflight_wait_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Preflight snapshot for task=%s still running after %.1fs; closing task without it.",
+                task_id,
+                self.preflight_wait_seconds,
+            )
 
-    async def _prime_preflight_metadata(self, task_id: str) -> Dict[str, Any]:
+    async def _prime_preflight_metadata(
+        self, task_id: str, *, head_commit: Optional[str] = None
+    ) -> Dict[str, Any]:
         (
             diff_context,
             diff_stats,
             stage_seconds,
             warnings,
             cost_estimate,
-        ) = await self._prepare_preview_inputs()
+        ) = await self._prepare_preview_inputs(head_commit=head_commit)
         llm_preview = await self._generate_llm_preview(diff_context)
         warnings = list(dict.fromkeys(warnings))
         if not warnings:
@@ -671,6 +968,97 @@ class DeployService:
     ) -> Dict[str, Any]:
         steps: list[Dict[str, Any]] = []
 
+        if self.isolation_mode == "worktree":
+            await self._prepare_worktree(branch, target_commit or f"origin/{branch}", steps)
+            commands: list[tuple[list[str], str]] = self._worktree_sync_commands(
+                target_commit or f"origin/{branch}"
+            )
+        else:
+            commands = self._shared_checkout_commands(branch, target_commit)
+
+        try:
+            for cmd, description in commands:
+                steps.append(
+                    await self._run_command(
+                        cmd,
+                        cwd=self.chatbot_repo_path,
+                        description=description,
+                    )
+                )
+        finally:
+            # The fetch/reset may have moved HEAD; previews must resolve it again.
+            self.preview_cache.forget_head()
+
+        if force_push and target_commit and not self.dry_run:
+            steps.append(
+                await self._run_command(
+                    ["git", "push", "origin", f"+{target_commit}:{branch}"],
+                    cwd=self.chatbot_repo_path,
+                    description="Force push branch to target commit",
+                )
+            )
+        elif force_push and target_commit and self.dry_run:
+            steps.append(
+                {
+                    "description": "Force push branch to target commit",
+                    "command": f"git push origin +{target_commit}:{branch}",
+                    "cwd": str(self.chatbot_repo_path),
+                    "dry_run": True,
+                }
+            )
+
+        return {
+            "branch": branch,
+            "target_commit": target_commit,
+            "force_push": force_push,
+            "isolation_mode": self.isolation_mode,
+            "checkout_path": str(self.chatbot_repo_path),
+            "dry_run": self.dry_run,
+            "steps": steps,
+        }
+
+    async def _prepare_worktree(self, branch: str, ref: str, steps: list[Dict[str, Any]]) -> None:
+        """Fetch in the base repository and create the branch worktree on first use."""
+        worktree_path = self.chatbot_repo_path
+        # Ref updates and worktree bookkeeping live in the base repository, so they are serialized.
+        async with self._git_lock:
+            steps.append(
+                await self._run_command(
+                    ["git", "fetch", "origin"],
+                    cwd=self._chatbot_repo_path,
+                    description="Fetch latest refs from origin",
+                )
+            )
+            if (worktree_path / ".git").exists():
+                return
+            steps.append(
+                await self._run_command(
+                    ["git", "worktree", "prune"],
+                    cwd=self._chatbot_repo_path,
+                    description="Prune stale worktree registrations",
+                )
+            )
+            steps.append(
+                await self._run_command(
+                    ["git", "worktree", "add", "--force", "--detach", str(worktree_path), ref],
+                    cwd=self._chatbot_repo_path,
+                    description=f"Create worktree for {branch}",
+                )
+            )
+
+    @staticmethod
+    def _worktree_sync_commands(ref: str) -> list[tuple[list[str], str]]:
+        # Detached HEAD: a branch can only be checked out in one worktree at a time.
+        return [
+            (["git", "checkout", "--detach", ref], "Checkout target revision (detached)"),
+            (["git", "reset", "--hard", ref], "Hard reset worktree to target revision"),
+            (["git", "clean", "-fdx"], "Remove untracked files (full replace)"),
+        ]
+
+    @staticmethod
+    def _shared_checkout_commands(
+        branch: str, target_commit: Optional[str]
+    ) -> list[tuple[list[str], str]]:
         commands: list[tuple[list[str], str]] = [
             (["git", "fetch", "origin"], "Fetch latest refs from origin"),
         ]
@@ -705,46 +1093,123 @@ class DeployService:
         commands.append(
             (["git", "clean", "-fdx"], "Remove untracked files (full replace)")
         )
+        return commands
 
-        for cmd, description in commands:
-            steps.append(
-                await self._run_command(
-                    cmd,
-                    cwd=self.chatbot_repo_path,
-                    description=description,
-                )
+    async def _run_build_stage(self, branch: Optional[str] = None) -> Dict[str, Any]:
+        steps: list[Dict[str, Any]] = []
+        stage_metadata: Dict[str, Any] = {
+            "project_path": str(self.frontend_project_path),
+            "output_path": str(self.frontend_build_output_path)
+            if self.frontend_build_output_path
+            else None,
+            "dry_run": self.dry_run,
+            "cache_hit": False,
+            "steps": steps,
+        }
+
+        cache_key: Optional[str] = None
+        skip_reason = self._artifact_cache_skip_reason()
+        if skip_reason:
+            stage_metadata["cache"] = {"status": "skipped", "reason": skip_reason}
+        else:
+            cache_key = await self._compute_build_fingerprint(steps)
+            restored = await self._restore_build_artifact(cache_key)
+            if restored is not None:
+                stage_metadata["cache_hit"] = True
+                stage_metadata["cache"] = {"status": "hit", "key": cache_key, **restored}
+                return stage_metadata
+            stage_metadata["cache"] = {"status": "miss", "key": cache_key}
+
+        await self._install_frontend_dependencies(steps, stage_metadata)
+
+        build_cache_key = await self._restore_next_build_cache(branch or self.default_branch, stage_metadata)
+        build_started = time.monotonic()
+        steps.append(
+            await self._run_command(
+                self.frontend_build_command or ["npm", "run", "build"],
+                cwd=self.frontend_project_path,
+                description="Build frontend application",
+            )
+        )
+        if build_cache_key:
+            await self._save_next_build_cache(
+                build_cache_key, time.monotonic() - build_started, stage_metadata
             )
 
-        if force_push and target_commit and not self.dry_run:
+        if self.frontend_export_command:
             steps.append(
                 await self._run_command(
-                    ["git", "push", "origin", f"+{target_commit}:{branch}"],
-                    cwd=self.chatbot_repo_path,
-                    description="Force push branch to target commit",
+                    self.frontend_export_command,
+                    cwd=self.frontend_project_path,
+                    description="Export static frontend assets",
                 )
             )
-        elif force_push and target_commit and self.dry_run:
-            steps.append(
-                {
-                    "description": "Force push branch to target commit",
-                    "command": f"git push origin +{target_commit}:{branch}",
-                    "cwd": str(self.chatbot_repo_path),
-                    "dry_run": True,
-                }
-            )
 
-        return {
-            "branch": branch,
-            "target_commit": target_commit,
-            "force_push": force_push,
-            "dry_run": self.dry_run,
-            "steps": steps,
-        }
+        if cache_key and self.artifact_cache and self.frontend_build_output_path:
+            try:
+                stored = await self.artifact_cache.store(cache_key, self.frontend_build_output_path)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Failed to store build artifact key=%s (%s)", cache_key, exc)
+                stored = {"stored": False, "reason": str(exc)}
+            stage_metadata["cache"].update(stored)
 
-    async def _run_build_stage(self) -> Dict[str, Any]:
-        steps: list[Dict[str, Any]] = []
+        return stage_metadata
 
-        if self.frontend_install_command:
+    async def _restore_next_build_cache(self, branch: str, stage_metadata: Dict[str, Any]) -> Optional[str]:
+        if self.next_build_cache is None or self.dry_run:
+            stage_metadata["build_cache"] = {
+                "status": "skipped",
+                "reason": "disabled" if self.next_build_cache is None else "dry run",
+            }
+            return None
+        key = NextBuildCache.key_for(self.frontend_project_subdir, branch)
+        fallback_key = NextBuildCache.key_for(self.frontend_project_subdir, self.default_branch)
+        cache_meta: Dict[str, Any] = {"key": key}
+        stage_metadata["build_cache"] = cache_meta
+        try:
+            restored = await self.next_build_cache.restore(
+                key, self.frontend_project_path, fallback_key=fallback_key
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Next.js build cache restore failed key=%s (%s); building cold.", key, exc)
+            restored = None
+        cache_meta["status"] = "warm" if restored else "cold"
+        if restored:
+            cache_meta.update(restored)
+        return key
+
+    async def _save_next_build_cache(
+        self, key: str, build_seconds: float, stage_metadata: Dict[str, Any]
+    ) -> None:
+        if self.next_build_cache is None:
+            return
+        cache_meta = stage_metadata["build_cache"]
+        try:
+            cache_meta["metrics"] = await self.next_build_cache.record_build(
+                key, warm=cache_meta.get("status") == "warm", seconds=build_seconds
+            )
+            cache_meta.update(await self.next_build_cache.save(key, self.frontend_project_path))
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Failed to save Next.js build cache key=%s (%s)", key, exc)
+            cache_meta.update({"saved": False, "reason": str(exc)})
+
+    async def _install_frontend_dependencies(
+        self, steps: list[Dict[str, Any]], stage_metadata: Dict[str, Any]
+    ) -> None:
+        if not self.frontend_install_command:
+            stage_metadata["dependency_cache"] = {"status": "skipped", "reason": "install disabled"}
+            return
+
+        lockfile = self.frontend_project_path / "package-lock.json"
+        skip_reason: Optional[str] = None
+        if self.dependency_cache is None:
+            skip_reason = "disabled"
+        elif self.dry_run:
+            skip_reason = "dry run"
+        elif not lockfile.is_file():
+            skip_reason = "package-lock.json missing"
+        if skip_reason or self.dependency_cache is None:
+            stage_metadata["dependency_cache"] = {"status": "skipped", "reason": skip_reason}
             steps.append(
                 await self._run_command(
                     self.frontend_install_command,
@@ -752,32 +1217,112 @@ class DeployService:
                     description="Install frontend dependencies",
                 )
             )
+            return
 
+        lockfile_hash = await asyncio.to_thread(hash_file, lockfile)
+        cache_key = DependencyCache.key_for(lockfile_hash, self.frontend_ci_install_command)
+        cache_meta: Dict[str, Any] = {"key": cache_key, "lockfile_hash": lockfile_hash}
+        stage_metadata["dependency_cache"] = cache_meta
+        try:
+            restored = await self.dependency_cache.restore(cache_key, self.frontend_project_path)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("node_modules restore failed key=%s (%s); reinstalling.", cache_key, exc)
+            restored = None
+        if restored is not None:
+            cache_meta.update({"status": "hit", **restored})
+            steps.append(
+                {
+                    "description": "Restore node_modules from dependency cache",
+                    "command": f"restore node_modules snapshot {cache_key[:12]}",
+                    "cwd": str(self.frontend_project_path),
+                    "dry_run": False,
+                    "cache_hit": True,
+                }
+            )
+            return
+
+        cache_meta["status"] = "miss"
         steps.append(
             await self._run_command(
-                self.frontend_build_command or ["npm", "run", "build"],
+                self.frontend_ci_install_command + ["--cache", str(self.dependency_cache.npm_cache_dir)],
                 cwd=self.frontend_project_path,
-                description="Build frontend application",
+                description="Install frontend dependencies (npm ci, offline-preferred)",
             )
         )
+        try:
+            cache_meta.update(await self.dependency_cache.save(cache_key, self.frontend_project_path))
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Failed to snapshot node_modules key=%s (%s)", cache_key, exc)
+            cache_meta.update({"saved": False, "reason": str(exc)})
 
-        if self.frontend_export_command:
-            steps.append(
-                await self._run_command(
-                    self.frontend_export_command,
-                    cwd=self.frontend_project_path,
-                    description="Export static frontend assets",
+    def _artifact_cache_skip_reason(self) -> Optional[str]:
+        if self.artifact_cache is None:
+            return "disabled"
+        if self.dry_run:
+            return "dry run"
+        if self.frontend_build_output_path is None:
+            return "dev-server mode has no build output to cache"
+        return None
+
+    async def _compute_build_fingerprint(self, steps: list[Dict[str, Any]]) -> str:
+        """Fingerprint = frontend tree hash + lockfile hash + build commands + build env."""
+        tree_hash: Optional[str] = None
+        try:
+            subdir = self.frontend_project_path.resolve().relative_to(self.chatbot_repo_path.resolve())
+        except ValueError:
+            subdir = None
+        if subdir is not None:
+            # After reset --hard + clean -fdx the working tree equals HEAD, so git's tree id is exact.
+            tree_spec = "" if subdir == Path(".") else subdir.as_posix()
+            try:
+                result = await self._run_command(
+                    ["git", "rev-parse", f"HEAD:{tree_spec}"],
+                    cwd=self.chatbot_repo_path,
+                    description="Fingerprint frontend tree",
                 )
+            except CommandExecutionError as exc:
+                logger.info("git tree fingerprint unavailable (%s); hashing files instead.", exc)
+            else:
+                steps.append(result)
+                tree_hash = (result.get("stdout") or "").strip() or None
+        if not tree_hash:
+            excluded = BUILD_FINGERPRINT_EXCLUDED_DIRS + (
+                (self.frontend_build_output_path.name,) if self.frontend_build_output_path else ()
             )
+            tree_hash = await asyncio.to_thread(hash_tree, self.frontend_project_path, exclude=excluded)
 
-        return {
-            "project_path": str(self.frontend_project_path),
-            "output_path": str(self.frontend_build_output_path)
-            if self.frontend_build_output_path
-            else None,
-            "dry_run": self.dry_run,
-            "steps": steps,
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if key in BUILD_FINGERPRINT_ENV_KEYS or key.startswith(BUILD_FINGERPRINT_ENV_PREFIXES)
         }
+        return BuildArtifactCache.fingerprint(
+            tree_hash=tree_hash,
+            lockfile_hash=await asyncio.to_thread(self._hash_lockfile, self.frontend_project_path),
+            commands=(
+                self.frontend_install_command,
+                self.frontend_build_command,
+                self.frontend_export_command,
+            ),
+            env=env,
+        )
+
+    @staticmethod
+    def _hash_lockfile(project_path: Path) -> Optional[str]:
+        for name in LOCKFILE_NAMES:
+            candidate = project_path / name
+            if candidate.is_file():
+                return hash_file(candidate)
+        return None
+
+    async def _restore_build_artifact(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        if self.artifact_cache is None or self.frontend_build_output_path is None:
+            return None
+        try:
+            return await self.artifact_cache.restore(cache_key, self.frontend_build_output_path)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Build artifact restore failed key=%s (%s); rebuilding.", cache_key, exc)
+            return None
 
     async def _run_cutover_stage(self) -> Dict[str, Any]:
         if self.frontend_build_output_path is None:
@@ -806,18 +1351,25 @@ class DeployService:
             raise RuntimeError(f"build output is not a directory: {build_dir}")
 
         next_target.parent.mkdir(parents=True, exist_ok=True)
-        if next_target.exists():
-            shutil.rmtree(next_target)
-        shutil.copytree(build_dir, next_target)
-
-        if self.nginx_live_symlink.exists() or self.nginx_live_symlink.is_symlink():
-            self.nginx_live_symlink.unlink()
-        self.nginx_live_symlink.symlink_to(next_target, target_is_directory=True)
+        metadata["sync"] = await self.slot_sync.sync(build_dir, next_target, link_from=current_target)
+        self._switch_live_symlink(next_target)
 
         metadata["copied"] = True
         metadata["switched"] = True
         return metadata
 
+    def _switch_live_symlink(self, next_target: Path) -> None:
+        # Build the new link beside the old one and rename it over, so Nginx never sees a gap.
+        symlink = self.nginx_live_symlink
+        symlink.parent.mkdir(parents=True, exist_ok=True)
+        staging_link = symlink.with_name(f".{symlink.name}.next")
+        if staging_link.exists() or staging_link.is_symlink():
+            staging_link.unlink()
+        staging_link.symlink_to(next_target, target_is_directory=True)
+        if symlink.is_dir() and not symlink.is_symlink():
+            shutil.rmtree(symlink)
+        os.replace(staging_link, symlink)
+
     async def _run_observability_stage(self) -> Dict[str, Any]:
         # Placeholder for future Lighthouse or monitoring integrations.
         return {
@@ -959,7 +1511,14 @@ class DeployService:
         }
         return payload
 
-    async def _resolve_preview_context(self) -> Dict[str, Any]:
+    async def _resolve_preview_context(self, *, head_commit: Optional[str] = None) -> Dict[str, Any]:
+        return await self.single_flight.run(
+            "preview_context",
+            (str(self.chatbot_repo_path), head_commit),
+            lambda: self._compute_preview_context(head_commit=head_commit),
+        )
+
+    async def _compute_preview_context(self, *, head_commit: Optional[str] = None) -> Dict[str, Any]:
         context: Dict[str, Any] = {
             "ready": False,
             "reason": None,
@@ -972,21 +1531,12 @@ class DeployService:
         }
 
         try:
-            successes = await self.repository.get_recent_successes(
-                branch=self.default_branch,
-                limit=1,
-            )
+            base_commit = await self.preview_cache.pointer("base", self._get_last_deployed_commit)
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.exception("Failed to read recent successes: %s", exc)
             context["reason"] = f"Unable to read deploy history: {exc}"
             return context
 
-        base_commit: Optional[str] = None
-        if successes:
-            summary = successes[0].metadata.get("summary")
-            if isinstance(summary, dict):
-                base_commit = summary.get("commit")
-
         if not self._looks_like_commit(base_commit):
             context["reason"] = "No previous successful deployment to diff against."
             context["base_commit"] = base_commit
@@ -994,7 +1544,7 @@ class DeployService:
 
         context["base_commit"] = base_commit
 
-        head_commit = await self._get_current_commit()
+        head_commit = head_commit or await self.preview_cache.pointer("head", self._get_current_commit)
         context["head_commit"] = head_commit
         if not self._looks_like_commit(head_commit):
             context["reason"] = "Current HEAD is not a valid commit."
@@ -1003,6 +1553,15 @@ class DeployService:
             context["reason"] = "Working tree matches last successful deployment."
             return context
 
+        # GITHUB_COMPARE_HEAD_REF may name a moving branch, so local HEAD does not identify the
+        # diff; that mode relies on the compare client's ETag-revalidated cache instead.
+        preview_key: Optional[str] = None
+        if not (self._should_use_github_compare() and self.github_compare_head_ref):
+            preview_key = self.preview_cache.key(base_commit, head_commit)
+            cached = await self.preview_cache.get(preview_key)
+            if cached is not None:
+                return copy.deepcopy(cached.diff_context)
+
         diff_source = "working_tree"
         compare_metadata: Optional[Dict[str, Any]] = None
         diff_output: str
@@ -1015,7 +1574,7 @@ class DeployService:
             diff_stats = compare_result.get("diff_stats", {})
             compare_metadata = compare_result.get("compare_metadata")
         else:
-            diff_output, diff_stats = await self._collect_diff_details(base_commit)
+            diff_output, diff_stats = await self._collect_diff_details(base_commit, head_commit)
 
         context.update(
             {
@@ -1026,11 +1585,38 @@ class DeployService:
                 "compare_metadata": compare_metadata,
             }
         )
+        if preview_key is not None:
+            await self.preview_cache.put(
+                preview_key,
+                base_commit=base_commit,
+                head_commit=head_commit,
+                diff_context=copy.deepcopy(context),
+            )
         return context
 
-    async def _collect_diff_details(self, base_commit: str) -> tuple[str, Dict[str, Any]]:
+    async def _get_last_deployed_commit(self) -> Optional[str]:
+        successes = await self.repository.get_recent_successes(
+            branch=self.default_branch,
+            limit=1,
+        )
+        if successes:
+            summary = successes[0].metadata.get("summary")
+            if isinstance(summary, dict):
+                return summary.get("commit")
+        return None
+
+    async def _collect_diff_details(
+        self, base_commit: str, head_commit: str = "HEAD"
+    ) -> tuple[str, Dict[str, Any]]:
+        return await self.single_flight.run(
+            "git_diff",
+            (str(self.chatbot_repo_path), base_commit, head_commit),
+            lambda: self._compute_diff_details(base_commit, head_commit),
+        )
+
+    async def _compute_diff_details(self, base_commit: str, head_commit: str) -> tuple[str, Dict[str, Any]]:
         diff_result = await self._run_command(
-            ["git", "diff", "--name-status", f"{base_commit}..HEAD"],
+            ["git", "diff", "--name-status", f"{base_commit}..{head_commit}"],
             cwd=self.chatbot_repo_path,
             description="Collect diff summary for preview",
         )
@@ -1039,38 +1625,50 @@ class DeployService:
         return diff_output, diff_stats
 
     def _should_use_github_compare(self) -> bool:
-        return self.preview_use_github_compare and bool(self.github_compare_repo)
-
-    def _github_compare_cache_key(self, base_commit: str, head_ref: str) -> str:
-        return f"{self.github_compare_repo}:{base_commit}:{head_ref}"
+        return self.github_compare is not None
 
     async def _fetch_compare_diff(
         self, base_commit: str, head_commit: str
     ) -> Optional[Dict[str, Any]]:
         if not self._should_use_github_compare():
             return None
+        return await self.single_flight.run(
+            "github_compare",
+            (base_commit, self.github_compare_head_ref or head_commit),
+            lambda: self._compute_compare_diff(base_commit, head_commit),
+        )
 
+    async def _compute_compare_diff(self, base_commit: str, head_commit: str) -> Optional[Dict[str, Any]]:
+        client = self.github_compare
+        if client is None:
+            return None
         head_ref = self.github_compare_head_ref or head_commit
-        cache_key = self._github_compare_cache_key(base_commit, head_ref)
-        ttl = self.github_compare_cache_seconds
-        now = time.time()
-        if ttl > 0:
-            cached = self._compare_cache.get(cache_key)
-            if cached and cached[0] > now:
-                return cached[1]
-
         try:
-            payload = await asyncio.to_thread(
-                self._call_github_compare_api,
-                base_commit,
-                head_ref,
-            )
+            payload = await client.compare(base_commit, head_ref)
         except Exception as exc:  # pylint: disable=broad-except
             logger.warning("GitHub Compare API failed, falling back to local diff: %s", exc)
             return None
 
-        diff_output, diff_stats = self._extract_compare_diff(payload)
-        result: Dict[str, Any] = {
+        files = payload.get("files")
+        total_commits = int(payload.get("total_commits") or 0)
+        # A full first page means GitHub cut the file list; rebuild it from the range's commits.
+        files_truncated = isinstance(files, list) and len(files) >= COMPARE_FILE_LIMIT
+        range_diff: Optional[tuple[str, Dict[str, Any]]] = None
+        if files_truncated and 0 < total_commits <= self.github_compare_max_commits:
+            try:
+                range_diff = await self._ingest_compare_range(client, base_commit, head_ref, total_commits)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Paging GitHub compare files failed; keeping the first page only: %s", exc)
+        if range_diff is not None:
+            diff_output, diff_stats = range_diff
+            files_truncated = False
+        else:
+            diff_output, diff_stats = self._extract_compare_diff(payload)
+            if files_truncated:
+                diff_stats["warnings"].append(
+                    f"GitHub listed only the first {COMPARE_FILE_LIMIT} changed files; counts are a lower bound."
+                )
+        return {
             "diff_output": diff_output,
             "diff_stats": diff_stats,
             "compare_metadata": {
@@ -1083,145 +1681,45 @@ class DeployService:
                 "status": payload.get("status"),
                 "base_commit": base_commit,
                 "head": head_ref,
+                "files_truncated": files_truncated,
             },
         }
 
-        if ttl > 0:
-            self._compare_cache[cache_key] = (now + ttl, result)
-        return result
-
-    def _call_github_compare_api(self, base_commit: str, head_ref: str) -> Dict[str, Any]:
-        if not self.github_compare_repo:
-            raise RuntimeError("GitHub compare repository is not configured.")
-
-        base = urllib_parse.quote(base_commit.strip())
-        head = urllib_parse.quote(head_ref.strip())
-        url = f"https://api.github.com/repos/{self.github_compare_repo}/compare/{base}...{head}"
-        headers = {
-            "Accept": "application/vnd.github+json",
-            "User-Agent": "cherry-deploy-preview",
-        }
-        if self.github_compare_token:
-            headers["Authorization"] = f"Bearer {self.github_compare_token}"
-
-        request = urllib_request.Request(url, headers=headers, method="GET")
-        try:
-            with urllib_request.urlopen(request, timeout=15) as response:
-                body = response.read()
-        except urllib_error.HTTPError as exc:
-            error_body = ""
-            try:
-                error_body = exc.read().decode("utf-8", errors="ignore")
-            except Exception:  # pragma: no cover - defensive
-                error_body = ""
-            details = error_body or exc.reason
-            raise RuntimeError(f"GitHub compare HTTP {exc.code}: {details}") from exc
-        except urllib_error.URLError as exc:
-            raise RuntimeError(f"GitHub compare request failed: {exc.reason}") from exc
-
-        try:
-            return json.loads(body.decode("utf-8"))
-        except Exception as exc:  # pragma: no cover - defensive
-            raise RuntimeError("Failed to parse GitHub compare response") from exc
+    async def _ingest_compare_range(
+        self, client: GitHubCompareClient, base_commit: str, head_ref: str, total_commits: int
+    ) -> tuple[str, Dict[str, Any]]:
+        """Net ``--name-status`` diff of a range too large for one compare response.
+
+        Each commit's files are folded in as its listing arrives, so only the net
+        change per path is held while the remaining pages are in flight.
+        """
+        changes = RangeChanges()
+        async for index, files in client.iter_range_files(base_commit, head_ref, total_commits=total_commits):
+            for code, path in github_file_changes(files, split_renames=True):
+                changes.add(index, code, path)
+        summary = DiffSummary()
+        lines: List[str] = []
+        for code, path in changes.net():
+            summary.add(code, path)
+            lines.append(f"{code}\t{path}")
+        return "\n".join(lines), summary.result()
 
     def _extract_compare_diff(self, payload: Dict[str, Any]) -> tuple[str, Dict[str, Any]]:
-        files = payload.get("files")
+        summary = DiffSummary()
         lines: List[str] = []
-        if isinstance(files, list):
-            for entry in files:
-                if not isinstance(entry, dict):
-                    continue
-                filename = entry.get("filename") or entry.get("previous_filename")
-                if not filename:
-                    continue
-                status = (entry.get("status") or "modified").lower()
-                status_map = {
-                    "added": "A",
-                    "modified": "M",
-                    "changed": "M",
-                    "removed": "D",
-                    "deleted": "D",
-                    "renamed": "R",
-                }
-                code = status_map.get(status, "M")
-                lines.append(f"{code}\t{filename}")
-        diff_output = "\n".join(lines)
-        diff_stats = self._summarize_diff(diff_output)
-        return diff_output, diff_stats
+        for code, path in github_file_changes(payload.get("files")):
+            summary.add(code, path)
+            lines.append(f"{code}\t{path}")
+        return "\n".join(lines), summary.result()
 
     @staticmethod
     def _summarize_diff(diff_output: str) -> Dict[str, Any]:
-        stats: Dict[str, Any] = {
-            "file_count": 0,
-            "added": 0,
-            "modified": 0,
-            "deleted": 0,
-            "lockfile_changed": False,
-            "config_changed": False,
-            "env_changed": False,
-            "test_files_changed": False,
-            "sensitive_changed": False,
-            "paths": [],
-            "warnings": [],
-        }
-
-        if not diff_output:
-            stats["risk_level"] = "low"
-            return stats
-
-        warnings: List[str] = []
+        summary = DiffSummary()
         for raw_line in diff_output.splitlines():
             parts = raw_line.split("\t", 1)
-            if len(parts) != 2:
-                continue
-            status_code, path = parts
-            stats["file_count"] += 1
-            stats["paths"].append(path)
-            code = status_code.strip().upper() or "M"
-            if code.startswith("A"):
-                stats["added"] += 1
-            elif code.startswith("D"):
-                stats["deleted"] += 1
-            else:
-                stats["modified"] += 1
-
-            lowered = path.lower()
-            if any(token in lowered for token in {"package-lock.json", "pnpm-lock.yaml", "yarn.lock"}):
-                stats["lockfile_changed"] = True
-            if lowered.endswith(".env") or "secrets" in lowered:
-                stats["env_changed"] = True
-            if any(lowered.endswith(ext) for ext in {".yml", ".yaml", ".json"}) and (
-                "infra" in lowered or "deploy" in lowered or "config" in lowered
-            ):
-                stats["config_changed"] = True
-            if any(keyword in lowered for keyword in {"secret", "cert", ".pem", ".key", ".crt"}):
-                stats["sensitive_changed"] = True
-            if any(part in lowered for part in {"tests/", "/test/", ".spec", ".test"}):
-                stats["test_files_changed"] = True
-
-        if stats["lockfile_changed"]:
-            warnings.append("Detected lockfile changes; npm install may take longer.")
-        if stats["env_changed"]:
-            warnings.append("Environment-related file modified; verify secrets.")
-        if stats["config_changed"]:
-            warnings.append("Configuration files updated; double-check blue/green sync.")
-        if stats["sensitive_changed"]:
-            warnings.append("Sensitive configuration detected in diff; rotate credentials if needed.")
-        if stats["test_files_changed"]:
-            warnings.append("Test files updated; ensure the relevant suites have been executed.")
-        if stats["file_count"] >= 20:
-            warnings.append("Large diff detected; smoke-test both frontend and API.")
-
-        if stats["file_count"] < 5 and not stats["env_changed"] and not stats["config_changed"]:
-            risk = "low"
-        elif stats["file_count"] < 15 and not stats["env_changed"]:
-            risk = "medium"
-        else:
-            risk = "high"
-
-        stats["risk_level"] = risk
-        stats["warnings"] = warnings
-        return stats
+            if len(parts) == 2:
+                summary.add(*parts)
+        return summary.result()
 
     async def get_preview(self, task_id: Optional[str] = None) -> Dict[str, Any]:
         """Return a preview payload with risk/cost notes for the deploy command."""
@@ -1232,7 +1730,12 @@ class DeployService:
             "git clean -fdx",
         ]
 
-        if self.frontend_install_command:
+        if self.frontend_install_command and self.dependency_cache is not None:
+            command_plan.append(
+                f"{' '.join(self.frontend_ci_install_command)} "
+                "(skipped when a node_modules snapshot matches package-lock.json)"
+            )
+        elif self.frontend_install_command:
             command_plan.append(" ".join(self.frontend_install_command))
 
         build_cmd = self.frontend_build_command or ["npm", "run", "build"]
@@ -1304,12 +1807,32 @@ class DeployService:
         return int(cost_estimate.get("runtime_minutes", 8))
 
     async def list_recent_tasks(self, limit: int = 5) -> list[Dict[str, Any]]:
-        tasks = await self.repository.get_recent_tasks(limit=limit)
+        tasks = await self.repository.get_recent_task_summaries(limit=limit)
         summaries: list[Dict[str, Any]] = []
         for task in tasks:
             summaries.append(self._assemble_task_context(task))
         return summaries
 
+    async def list_task_history(
+        self, query: DeployTaskQuery, *, limit: int = 20, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """One page of task history, newest first; ``next_cursor`` resumes right after it.
+
+        Pages are keyset-based on (``started_at``, ``_id``), so fetching page N costs the
+        same as page 1. Raises ``ValueError`` for a malformed cursor.
+        """
+        if cursor:
+            after_started_at, after_task_id = _decode_history_cursor(cursor)
+            query = query.model_copy(update={"after_started_at": after_started_at, "after_task_id": after_task_id})
+        # One extra row tells whether another page exists.
+        tasks = await self.repository.list_task_summaries(query, limit=limit + 1)
+        page = tasks[:limit]
+        next_cursor = _encode_history_cursor(page[-1]) if len(tasks) > limit else None
+        return {
+            "items": [self._assemble_task_context(task) for task in page],
+            "next_cursor": next_cursor,
+        }
+
     async def get_task_logs(self, task_id: str) -> Dict[str, Any]:
         task = await self.repository.get_task(task_id)
         if not task:
@@ -1324,6 +1847,12 @@ class DeployService:
             "failure_context": task.metadata.get("failure_context"),
         }
 
+    async def read_task_log(
+        self, task_id: str, step_id: str, *, stream: str = "stdout", offset: int = 0, limit: int = 1000
+    ) -> Dict[str, Any]:
+        """Page through a step's full output (``step_id`` comes from the step's ``log_ref``)."""
+        return await read_log_range(self.repository, task_id, step_id, stream, offset=offset, limit=limit)
+
     async def _run_command(
         self,
         command: list[str],
@@ -1344,17 +1873,52 @@ class DeployService:
         if cwd and not cwd.exists():
             raise RuntimeError(f"command working directory missing: {cwd}")
 
+        log_target = _STAGE_LOG_TARGET.get()
+        if log_target is not None:
+            self.events.publish(
+                log_target[0],
+                "step_started",
+                {"stage": log_target[1], "description": description, "command": metadata["command"]},
+            )
+        started = time.monotonic()
         process = await asyncio.create_subprocess_exec(
             *command,
             cwd=str(cwd) if cwd else None,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
-        stdout_bytes, stderr_bytes = await process.communicate()
-
-        metadata["stdout"] = stdout_bytes.decode().strip()
-        metadata["stderr"] = stderr_bytes.decode().strip()
+        # Stage steps keep their full output in the chunked log store; metadata gets a short tail.
+        log_writer = (
+            StepLogWriter(lambda: self.repository, log_target[0]) if log_target is not None else None
+        )
+        streamed = self.stream_command_output and log_writer is not None
+        if streamed:
+            metadata.update(
+                await self._stream_command_output(process, log_target, metadata, log_writer, started=started)
+            )
+        else:
+            stdout_bytes, stderr_bytes = await process.communicate()
+            metadata["stdout"] = stdout_bytes.decode(errors="replace").strip()
+            metadata["stderr"] = stderr_bytes.decode(errors="replace").strip()
+        if log_writer is not None:
+            for stream in ("stdout", "stderr"):
+                if not streamed:
+                    log_writer.extend(stream, metadata[stream])
+                metadata[stream] = tail_lines(metadata[stream], self.log_metadata_tail_lines)
+            await log_writer.flush()
+            metadata["log_ref"] = log_writer.reference()
         metadata["returncode"] = process.returncode
+        if log_target is not None:
+            self.events.publish(
+                log_target[0],
+                "step_finished",
+                {
+                    "stage": log_target[1],
+                    "description": description,
+                    "returncode": process.returncode,
+                    "duration_seconds": round(time.monotonic() - started, 3),
+                },
+            )
 
         if process.returncode != 0:
             raise CommandExecutionError(
@@ -1367,6 +1931,125 @@ class DeployService:
 
         return metadata
 
+    async def _stream_command_output(
+        self,
+        process: asyncio.subprocess.Process,
+        log_target: tuple[str, str],
+        step: Dict[str, Any],
+        log_writer: StepLogWriter,
+        *,
+        started: float,
+    ) -> Dict[str, Any]:
+        """Pump both pipes into ring buffers and the log store, flushing both on a timer."""
+        stdout_buffer = OutputRingBuffer(self.log_tail_lines)
+        stderr_buffer = OutputRingBuffer(self.log_tail_lines)
+        pumps = asyncio.gather(
+            pump_stream(process.stdout, stdout_buffer, functools.partial(log_writer.append, "stdout")),
+            pump_stream(process.stderr, stderr_buffer, functools.partial(log_writer.append, "stderr")),
+        )
+        flusher = asyncio.create_task(
+            self._flush_live_output_periodically(log_target, step, stdout_buffer, stderr_buffer, log_writer)
+        )
+        try:
+            await pumps
+            await process.wait()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+            raise
+        finally:
+            flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await flusher
+
+        await log_writer.flush()
+        await self._write_live_output(
+            log_target,
+            step,
+            stdout_buffer,
+            stderr_buffer,
+            log_writer,
+            running=False,
+            returncode=process.returncode,
+            duration_seconds=round(time.monotonic() - started, 3),
+        )
+        return {
+            "stdout": stdout_buffer.tail(),
+            "stderr": stderr_buffer.tail(),
+            "stdout_lines": stdout_buffer.total_lines,
+            "stderr_lines": stderr_buffer.total_lines,
+            "output_truncated": stdout_buffer.truncated or stderr_buffer.truncated,
+        }
+
+    async def _flush_live_output_periodically(
+        self,
+        log_target: tuple[str, str],
+        step: Dict[str, Any],
+        stdout_buffer: OutputRingBuffer,
+        stderr_buffer: OutputRingBuffer,
+        log_writer: StepLogWriter,
+    ) -> None:
+        flushed_lines = -1
+        while True:
+            await asyncio.sleep(self.log_flush_seconds)
+            seen_lines = stdout_buffer.total_lines + stderr_buffer.total_lines
+            if seen_lines == flushed_lines:
+                continue
+            flushed_lines = seen_lines
+            await log_writer.flush()
+            await self._write_live_output(
+                log_target, step, stdout_buffer, stderr_buffer, log_writer, running=True
+            )
+
+    async def _write_live_output(
+        self,
+        log_target: tuple[str, str],
+        step: Dict[str, Any],
+        stdout_buffer: OutputRingBuffer,
+        stderr_buffer: OutputRingBuffer,
+        log_writer: StepLogWriter,
+        *,
+        running: bool,
+        returncode: Optional[int] = None,
+        duration_seconds: Optional[float] = None,
+    ) -> None:
+        task_id, stage = log_target
+        live_output = {
+            "description": step.get("description"),
+            "command": step.get("command"),
+            "running": running,
+            "log_ref": log_writer.reference(),
+            "stdout": stdout_buffer.tail(self.log_metadata_tail_lines),
+            "stderr": stderr_buffer.tail(self.log_metadata_tail_lines),
+            "stdout_lines": stdout_buffer.total_lines,
+            "stderr_lines": stderr_buffer.total_lines,
+            "updated_at": utc_now().isoformat(),
+        }
+        if not running:
+            # Lets the change feed rebuild ``step_finished`` for other API workers.
+            live_output.update(returncode=returncode, duration_seconds=duration_seconds)
+        for stream, buffer in (("stdout", stdout_buffer), ("stderr", stderr_buffer)):
+            new_lines = buffer.lines_since(buffer.published_lines)
+            buffer.published_lines = buffer.total_lines
+            if new_lines:
+                self.events.publish(
+                    task_id,
+                    "log",
+                    {
+                        "stage": stage,
+                        "description": step.get("description"),
+                        "stream": stream,
+                        "lines": new_lines,
+                    },
+                )
+        try:
+            await self.repository.update_task(
+                task_id,
+                DeployTaskUpdate(append_metadata={stage: {"live_output": live_output}}),
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Failed to flush live output task=%s stage=%s (%s)", task_id, stage, exc)
+
     def _is_auto_recoverable_command(self, command: list[str]) -> bool:
         if not command:
             return False
@@ -1410,6 +2093,16 @@ class DeployService:
         }
 
     async def _generate_llm_preview(self, diff_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if not diff_context or not diff_context.get("ready"):
+            return await self._compute_llm_preview(diff_context)
+        # Same pair, same prompt: concurrent callers share one Gemini request.
+        return await self.single_flight.run(
+            "llm_preview",
+            (diff_context["base_commit"], diff_context["head_commit"]),
+            lambda: self._compute_llm_preview(diff_context),
+        )
+
+    async def _compute_llm_preview(self, diff_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         def _fallback(message: str) -> Dict[str, Any]:
             return {
                 "summary": message,
@@ -1453,6 +2146,11 @@ class DeployService:
             """
         ).strip()
 
+        model = self.settings.preview_llm_model
+        memo = await self._load_llm_memo(LLMPreviewMemo.key_for(model, prompt))
+        if memo is not None:
+            return {**memo.response, "cache": "hit"}
+
         try:
             summary_text = await asyncio.to_thread(self._call_gemini, prompt)
         except Exception as exc:  # pylint: disable=broad-except
@@ -1464,7 +2162,27 @@ class DeployService:
             structured["summary"] = (
                 f"Planned updates between {base_commit or 'previous'} and {head_commit or 'current'}."
             )
-        return structured
+        await self._save_llm_memo(
+            LLMPreviewMemo.build(model, prompt, structured, ttl_seconds=self.llm_memo_ttl_seconds)
+        )
+        return {**structured, "cache": "miss"}
+
+    async def _load_llm_memo(self, memo_key: str) -> Optional[LLMPreviewMemo]:
+        if not self.llm_memo_ttl_seconds:
+            return None
+        try:
+            return await self.repository.get_llm_memo(memo_key)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("LLM preview memo lookup failed (%s); calling the model.", exc)
+            return None
+
+    async def _save_llm_memo(self, memo: LLMPreviewMemo) -> None:
+        if not self.llm_memo_ttl_seconds:
+            return
+        try:
+            await self.repository.save_llm_memo(memo, max_entries=self.llm_memo_max_entries)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Failed to store LLM preview memo (%s).", exc)
 
     def _call_gemini(self, prompt: str) -> str:
         genai.configure(api_key=self.settings.gemini_api_key)
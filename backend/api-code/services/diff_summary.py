@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+LOCKFILE_NAMES = {"package-lock.json", "pnpm-lock.yaml", "yarn.lock"}
+CONFIG_EXTENSIONS = {".yml", ".yaml", ".json"}
+SENSITIVE_KEYWORDS = {"secret", "cert", ".pem", ".key", ".crt"}
+TEST_PATH_MARKERS = {"tests/", "/test/", ".spec", ".test"}
+GITHUB_STATUS_CODES = {
+    "added": "A",
+    "modified": "M",
+    "changed": "M",
+    "removed": "D",
+    "deleted": "D",
+    "renamed": "R",
+}
+
+
+def github_file_changes(files: Any, *, split_renames: bool = False) -> Iterator[Tuple[str, str]]:
+    """``(code, path)`` pairs from a GitHub ``files`` list, in ``--name-status`` codes.
+
+    With ``split_renames`` a rename is reported as its old path deleted and its new
+    path added, which is what ``RangeChanges`` needs to track both paths.
+    """
+    if not isinstance(files, list):
+        return
+    for entry in files:
+        if not isinstance(entry, dict):
+            continue
+        filename = entry.get("filename") or entry.get("previous_filename")
+        if not filename:
+            continue
+        code = GITHUB_STATUS_CODES.get((entry.get("status") or "modified").lower(), "M")
+        previous = entry.get("previous_filename")
+        if split_renames and code == "R" and previous and previous != filename:
+            yield "D", previous
+            yield "A", filename
+        else:
+            yield code, filename
+
+
+class DiffSummary:
+    """Incremental ``--name-status`` summary: feed ``add(code, path)`` then read ``result()``.
+
+    Only counters and flags are kept besides the path list, so a large diff can be
+    summarized as its pages arrive instead of being joined into one string first.
+    """
+
+    def __init__(self) -> None:
+        self.stats: Dict[str, Any] = {
+            "file_count": 0,
+            "added": 0,
+            "modified": 0,
+            "deleted": 0,
+            "lockfile_changed": False,
+            "config_changed": False,
+            "env_changed": False,
+            "test_files_changed": False,
+            "sensitive_changed": False,
+            "paths": [],
+            "warnings": [],
+        }
+
+    def add(self, status_code: str, path: str) -> None:
+        stats = self.stats
+        stats["file_count"] += 1
+        stats["paths"].append(path)
+        code = status_code.strip().upper() or "M"
+        if code.startswith("A"):
+            stats["added"] += 1
+        elif code.startswith("D"):
+            stats["deleted"] += 1
+        else:
+            stats["modified"] += 1
+
+        lowered = path.lower()
+        if any(token in lowered for token in LOCKFILE_NAMES):
+            stats["lockfile_changed"] = True
+        if lowered.endswith(".env") or "secrets" in lowered:
+            stats["env_changed"] = True
+        if any(lowered.endswith(ext) for ext in CONFIG_EXTENSIONS) and (
+            "infra" in lowered or "deploy" in lowered or "config" in lowered
+        ):
+            stats["config_changed"] = True
+        if any(keyword in lowered for keyword in SENSITIVE_KEYWORDS):
+            stats["sensitive_changed"] = True
+        if any(part in lowered for part in TEST_PATH_MARKERS):
+            stats["test_files_changed"] = True
+
+    def result(self) -> Dict[str, Any]:
+        stats = self.stats
+        warnings: List[str] = []
+        if stats["lockfile_changed"]:
+            warnings.append("Detected lockfile changes; npm install may take longer.")
+        if stats["env_changed"]:
+            warnings.append("Environment-related file modified; verify secrets.")
+        if stats["config_changed"]:
+            warnings.append("Configuration files updated; double-check blue/green sync.")
+        if stats["sensitive_changed"]:
+            warnings.append("Sensitive configuration detected in diff; rotate credentials if needed.")
+        if stats["test_files_changed"]:
+            warnings.append("Test files updated; ensure the relevant suites have been executed.")
+        if stats["file_count"] >= 20:
+            warnings.append("Large diff detected; smoke-test both frontend and API.")
+
+        if stats["file_count"] < 5 and not stats["env_changed"] and not stats["config_changed"]:
+            risk = "low"
+        elif stats["file_count"] < 15 and not stats["env_changed"]:
+            risk = "medium"
+        else:
+            risk = "high"
+
+        stats["risk_level"] = risk
+        stats["warnings"] = warnings
+        return stats
+
+
+class RangeChanges:
+    """Folds per-commit file changes into the net change of each path over a commit range.
+
+    Commits may be added in any order; ``index`` is the commit's position in the
+    range. Only the first and last change of each path is kept: a file added and
+    later deleted inside the range drops out, one deleted and re-added is modified.
+    """
+
+    def __init__(self) -> None:
+        # path -> (first_index, first_code, last_index, last_code)
+        self._paths: Dict[str, Tuple[int, str, int, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def add(self, index: int, code: str, path: str) -> None:
+        current = self._paths.get(path)
+        if current is None:
+            self._paths[path] = (index, code, index, code)
+            return
+        first_index, first_code, last_index, last_code = current
+        if index < first_index:
+            first_index, first_code = index, code
+        if index >= last_index:
+            last_index, last_code = index, code
+        self._paths[path] = (first_index, first_code, last_index, last_code)
+
+    def net(self) -> Iterator[Tuple[str, str]]:
+        """Yield ``(code, path)`` for every path that differs between the range ends."""
+        for path in sorted(self._paths):
+            _, first_code, _, last_code = self._paths[path]
+            if first_code == "A":
+                if last_code == "D":
+                    continue
+                yield "A", path
+            elif last_code == "D":
+                yield "D", path
+            else:
+                yield "M", path
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import contextlib
+import errno
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+from uuid import uuid4
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts
+    fcntl = None  # type: ignore
+
+
+HASH_CHUNK_BYTES = 1024 * 1024
+# ioctl(FICLONE) from linux/fs.h; clones extents on btrfs/xfs (reflink=1) without copying data.
+FICLONE = 0x40049409
+
+
+class KeyedLocks:
+    """One thread lock per cache key, shared by the pipelines using a cache root.
+
+    Restores hold an entry's lock for the whole copy out of it and saves hold it
+    across the remove-and-replace, so a reader never sees a half-replaced entry.
+    Eviction only takes entries whose lock is free and skips those in use.
+    """
+
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @contextlib.contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        with self._lock_for(key):
+            yield
+
+    @contextlib.contextmanager
+    def try_hold(self, key: str) -> Iterator[bool]:
+        lock = self._lock_for(key)
+        acquired = lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def temp_sibling(path: Path) -> Path:
+    return path.with_name(f".{path.name}.tmp-{uuid4().hex[:8]}")
+
+
+def _try_reflink(source: Path, destination: Path) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError as exc:
+        destination.unlink(missing_ok=True)
+        if exc.errno in {errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EBADF}:
+            return False
+        raise
+    return True
+
+
+def clone_file(source: Path, destination: Path) -> str:
+    """Copy ``source`` to ``destination`` (reflink when the filesystem allows it).
+
+    Returns ``"reflink"`` or ``"copy"`` depending on the strategy that succeeded.
+    """
+    if _try_reflink(source, destination):
+        shutil.copystat(source, destination)
+        return "reflink"
+    shutil.copy2(source, destination)
+    return "copy"
+
+
+def replace_with_clone(source: Path, destination: Path) -> str:
+    """Atomically replace ``destination`` with a fresh copy of ``source``.
+
+    Writing through a temporary sibling means an existing inode (which may be
+    hardlinked elsewhere) is never truncated in place.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = temp_sibling(destination)
+    try:
+        method = clone_file(source, temp_path)
+        os.replace(temp_path, destination)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return method
+
+
+def replace_with_link(source: Path, destination: Path) -> bool:
+    """Atomically point ``destination`` at ``source``'s inode; False when hardlinks are unsupported."""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = temp_sibling(destination)
+    try:
+        os.link(source, temp_path)
+        os.replace(temp_path, destination)
+    except OSError:
+        return False
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return True
+
+
+def copy_tree(source: Path, destination: Path) -> int:
+    """Replace ``destination`` with a copy of ``source`` (reflinks when possible); returns bytes copied."""
+    if destination.exists() or destination.is_symlink():
+        remove_path(destination)
+    copied = 0
+
+    def _copy(src: str, dst: str) -> str:
+        nonlocal copied
+        copied += os.path.getsize(src)
+        clone_file(Path(src), Path(dst))
+        return dst
+
+    shutil.copytree(source, destination, symlinks=True, copy_function=_copy)
+    return copied
+
+
+def tree_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def hash_tree(root: Path, *, exclude: Iterable[str] = ()) -> str:
+    """Stable SHA-256 over relative paths and file contents, skipping ``exclude`` directory names."""
+    excluded = set(exclude)
+    digest = hashlib.sha256()
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if name not in excluded)
+        for name in sorted(files):
+            full_path = Path(current) / name
+            digest.update(str(full_path.relative_to(root)).encode())
+            digest.update(b"\0")
+            if full_path.is_symlink():
+                digest.update(os.readlink(full_path).encode())
+            else:
+                digest.update(bytes.fromhex(hash_file(full_path)))
+    return digest.hexdigest()
+
+
+def remove_path(path: Path, *, missing_ok: bool = True) -> None:
+    if path.is_symlink() or path.is_file():
+        path.unlink(missing_ok=missing_ok)
+    elif path.exists():
+        shutil.rmtree(path)
+    elif not missing_ok:
+        raise FileNotFoundError(path)
+
+
+def read_optional_text(path: Path) -> Optional[str]:
+    try:
+        return path.read_text()
+    except (FileNotFoundError, IsADirectoryError):
+        return None
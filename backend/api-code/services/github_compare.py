@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar
+from urllib import parse as urllib_parse
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - fallback for test environments
+    httpx = None  # type: ignore
+
+
+T = TypeVar("T")
+
+# GitHub lists at most this many files in a compare response; later pages only carry commits.
+COMPARE_FILE_LIMIT = 300
+COMPARE_COMMITS_PER_PAGE = 100
+# A single commit's file list is paged 300 at a time, up to 3000 files.
+COMMIT_FILES_PER_PAGE = 300
+COMMIT_FILE_MAX_PAGES = 10
+
+
+class _CachedCompare(NamedTuple):
+    fetched_at: float
+    etag: Optional[str]
+    payload: Dict[str, Any]
+
+
+class GitHubCompareClient:
+    """Async GitHub Compare API client with keep-alive pooling and ETag revalidation.
+
+    One ``httpx.AsyncClient`` (created on first use) keeps connections to the API
+    open between comparisons. Responses are served from an LRU of ``max_entries``
+    for ``cache_seconds``; after that the stored ETag is sent as ``If-None-Match``
+    and a ``304 Not Modified``, which GitHub does not count against the rate limit,
+    renews the entry without a new body.
+
+    A range whose compare response hit ``COMPARE_FILE_LIMIT`` can be walked with
+    ``iter_range_files``: the commit list is paged and every commit's files are
+    fetched, at most ``concurrency`` requests at a time.
+    """
+
+    def __init__(
+        self,
+        repo: str,
+        *,
+        token: Optional[str] = None,
+        api_url: str = "https://api.github.com",
+        cache_seconds: float = 60.0,
+        max_entries: int = 128,
+        max_connections: int = 10,
+        concurrency: int = 8,
+        max_commit_entries: int = 1024,
+        timeout_seconds: float = 15.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if httpx is None:
+            raise RuntimeError("httpx is required for the GitHub compare client")
+        self.repo = repo
+        self.token = token
+        self.api_url = api_url.rstrip("/")
+        self.cache_seconds = max(0.0, cache_seconds)
+        self.max_entries = max(1, max_entries)
+        self.concurrency = max(1, concurrency)
+        self.max_connections = max(1, max_connections, self.concurrency)
+        self.max_commit_entries = max(1, max_commit_entries)
+        self.timeout_seconds = timeout_seconds
+        self.clock = clock
+        self.requests = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+        self._entries: OrderedDict[tuple[str, ...], _CachedCompare] = OrderedDict()
+        # Commit file lists never change for a SHA, so they are kept without revalidation.
+        self._commit_files: OrderedDict[str, List[Dict[str, Any]]] = OrderedDict()
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    async def compare(
+        self, base_commit: str, head_ref: str, *, page: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Compare payload for ``base...head``; raises ``RuntimeError`` on HTTP or parse errors.
+
+        With ``page`` the commit list is paged ``COMPARE_COMMITS_PER_PAGE`` at a time.
+        """
+        base = urllib_parse.quote(base_commit.strip())
+        head = urllib_parse.quote(head_ref.strip())
+        params = {"page": page, "per_page": COMPARE_COMMITS_PER_PAGE} if page is not None else {}
+        key = (base, head, *(f"{name}={value}" for name, value in params.items()))
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            if self.clock() - cached.fetched_at < self.cache_seconds:
+                self.cache_hits += 1
+                return cached.payload
+
+        headers: Dict[str, str] = {}
+        if cached is not None and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        response = await self._get(f"/repos/{self.repo}/compare/{base}...{head}", params, headers)
+        if response.status_code == 304 and cached is not None:
+            self.not_modified += 1
+            self._remember(key, _CachedCompare(self.clock(), cached.etag, cached.payload))
+            return cached.payload
+        payload = self._json(response)
+        self._remember(key, _CachedCompare(self.clock(), response.headers.get("ETag"), payload))
+        return payload
+
+    async def commit_files(self, sha: str) -> List[Dict[str, Any]]:
+        """Every file entry of one commit, following its file pages."""
+        sha = sha.strip()
+        cached = self._commit_files.get(sha)
+        if cached is not None:
+            self._commit_files.move_to_end(sha)
+            self.cache_hits += 1
+            return cached
+
+        files: List[Dict[str, Any]] = []
+        path = f"/repos/{self.repo}/commits/{urllib_parse.quote(sha)}"
+        for page in range(1, COMMIT_FILE_MAX_PAGES + 1):
+            payload = self._json(await self._get(path, {"page": page} if page > 1 else {}, {}))
+            page_files = payload.get("files")
+            if not isinstance(page_files, list):
+                break
+            files.extend(page_files)
+            if len(page_files) < COMMIT_FILES_PER_PAGE:
+                break
+        self._commit_files[sha] = files
+        while len(self._commit_files) > self.max_commit_entries:
+            self._commit_files.popitem(last=False)
+        return files
+
+    async def iter_range_files(
+        self, base_commit: str, head_ref: str, *, total_commits: int
+    ) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+        """Yield ``(commit_index, files)`` for each commit of ``base...head`` as it arrives.
+
+        ``commit_index`` is the commit's position in the range (oldest first); results
+        come in completion order. Commit pages and commit listings share one bound of
+        ``concurrency`` requests, so wall time follows ``commits / concurrency``.
+        """
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(factory: Callable[[], Awaitable[T]]) -> T:
+            async with slots:
+                return await factory()
+
+        page_count = max(1, math.ceil(total_commits / COMPARE_COMMITS_PER_PAGE))
+        pages = await asyncio.gather(
+            *(
+                bounded(lambda page=page: self.compare(base_commit, head_ref, page=page))
+                for page in range(1, page_count + 1)
+            )
+        )
+        shas = [
+            commit["sha"]
+            for payload in pages
+            for commit in payload.get("commits") or []
+            if isinstance(commit, dict) and commit.get("sha")
+        ]
+
+        async def listing(index: int, sha: str) -> Tuple[int, List[Dict[str, Any]]]:
+            return index, await bounded(lambda: self.commit_files(sha))
+
+        pending = [asyncio.ensure_future(listing(index, sha)) for index, sha in enumerate(shas)]
+        try:
+            for next_listing in asyncio.as_completed(pending):
+                yield await next_listing
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "commit_entries": len(self._commit_files),
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "not_modified": self.not_modified,
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _http(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            headers = {
+                "Accept": "application/vnd.github+json",
+                "User-Agent": "cherry-deploy-preview",
+            }
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers=headers,
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def _get(self, path: str, params: Dict[str, Any], headers: Dict[str, str]) -> "httpx.Response":
+        self.requests += 1
+        try:
+            response = await self._http().get(path, params=params, headers=headers)
+        except httpx.HTTPError as exc:
+            raise RuntimeError(f"GitHub compare request failed: {exc}") from exc
+        if response.status_code not in (200, 304):
+            details = response.text or response.reason_phrase
+            raise RuntimeError(f"GitHub compare HTTP {response.status_code}: {details}")
+        return response
+
+    @staticmethod
+    def _json(response: "httpx.Response") -> Dict[str, Any]:
+        try:
+            return response.json()
+        except ValueError as exc:  # pragma: no cover - defensive
+            raise RuntimeError("Failed to parse GitHub compare response") from exc
+
+    def _remember(self, key: tuple[str, ...], entry: _CachedCompare) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Dict, List
+from uuid import uuid4
+
+from models import DeployLogChunk
+
+
+logger = logging.getLogger("cherry-deploy.logs")
+
+LOG_STREAMS = ("stdout", "stderr")
+LOG_CHUNK_MAX_LINES = 1000
+LOG_CHUNK_MAX_BYTES = 256 * 1024
+MAX_LOG_RANGE_LINES = 5000
+
+
+class StepLogWriter:
+    """Collects one step's full stdout/stderr and persists it as compressed chunks.
+
+    ``append`` only buffers; ``flush`` (called from the live-output timer and when
+    the step ends) writes whatever is pending, so a build log of any length costs
+    the task document nothing beyond the ``reference()`` kept in step metadata.
+    The repository is resolved on every flush, so chunks written after the Mongo
+    supervisor swaps repositories mid-step land in the restored one.
+    """
+
+    def __init__(self, repository_getter: Callable[[], Any], task_id: str) -> None:
+        self.repository_getter = repository_getter
+        self.task_id = task_id
+        self.step_id = uuid4().hex[:16]
+        self.chunks = 0
+        self.failed = False
+        self._seq = 0
+        self._pending: Dict[str, List[str]] = {stream: [] for stream in LOG_STREAMS}
+        self._written_lines: Dict[str, int] = {stream: 0 for stream in LOG_STREAMS}
+
+    def append(self, stream: str, line: str) -> None:
+        self._pending[stream].append(line)
+
+    def extend(self, stream: str, text: str) -> None:
+        if text:
+            self._pending[stream].extend(text.splitlines())
+
+    def line_count(self, stream: str) -> int:
+        return self._written_lines[stream] + len(self._pending[stream])
+
+    async def flush(self) -> None:
+        chunks: List[DeployLogChunk] = []
+        for stream in LOG_STREAMS:
+            pending, self._pending[stream] = self._pending[stream], []
+            for lines in _split_chunk_lines(pending):
+                chunks.append(
+                    DeployLogChunk.build(
+                        self.task_id, self.step_id, stream, self._seq, self._written_lines[stream], lines
+                    )
+                )
+                self._seq += 1
+                self._written_lines[stream] += len(lines)
+        if not chunks or self.failed:
+            return
+        try:
+            await self.repository_getter().insert_log_chunks(chunks)
+            self.chunks += len(chunks)
+        except Exception as exc:  # pylint: disable=broad-except
+            # The step tail in metadata still covers the end of the output.
+            self.failed = True
+            logger.warning("Failed to persist log chunks task=%s step=%s (%s)", self.task_id, self.step_id, exc)
+
+    def reference(self) -> Dict[str, Any]:
+        return {
+            "step_id": self.step_id,
+            "chunks": self.chunks,
+            "stdout_lines": self.line_count("stdout"),
+            "stderr_lines": self.line_count("stderr"),
+            "complete": not self.failed,
+        }
+
+
+def _split_chunk_lines(lines: List[str]) -> List[List[str]]:
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_bytes = 0
+    for line in lines:
+        if current and (len(current) >= LOG_CHUNK_MAX_LINES or current_bytes + len(line) > LOG_CHUNK_MAX_BYTES):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(line)
+        current_bytes += len(line) + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def read_log_range(
+    repository: Any, task_id: str, step_id: str, stream: str, *, offset: int, limit: int
+) -> Dict[str, Any]:
+    """Return up to ``limit`` lines of a step's stream starting at line ``offset``."""
+    limit = max(1, min(limit, MAX_LOG_RANGE_LINES))
+    offset = max(0, offset)
+    # One extra line tells the client whether another page exists.
+    chunks = await repository.get_log_chunks(
+        task_id, step_id, stream, from_line=offset, to_line=offset + limit + 1
+    )
+    lines: List[str] = []
+    for chunk in chunks:
+        chunk_lines = chunk.lines()
+        start = max(0, offset + len(lines) - chunk.first_line)
+        lines.extend(chunk_lines[start:])
+        if len(lines) > limit:
+            break
+    has_more = len(lines) > limit
+    lines = lines[:limit]
+    return {
+        "step_id": step_id,
+        "stream": stream,
+        "offset": offset,
+        "lines": lines,
+        "next_offset": offset + len(lines) if has_more else None,
+        "has_more": has_more,
+    }
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from repositories import InMemoryDeployTaskRepository
+
+from .deploy_service import DeployService
+
+
+logger = logging.getLogger("cherry-deploy.mongo")
+
+MAX_REPLAY_PASSES = 3
+
+
+class MongoReconnectSupervisor:
+    """Moves the service back to MongoDB after startup fell back to the in-memory repository.
+
+    Every ``interval_seconds`` it builds a Mongo repository with ``connect`` and runs
+    ``ensure_indexes`` as the probe. Once that succeeds, everything recorded in the
+    fallback is upserted into Mongo and ``deploy_service.repository`` is swapped.
+    The swap only happens after a replay pass during which the fallback saw no write
+    (``revision`` unchanged), so nothing written mid-replay is lost; a busy fallback
+    is retried on the next probe.
+    """
+
+    def __init__(
+        self,
+        deploy_service: DeployService,
+        fallback: InMemoryDeployTaskRepository,
+        connect: Callable[[], Any],
+        *,
+        interval_seconds: float,
+        on_restored: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        self.deploy_service = deploy_service
+        self.fallback = fallback
+        self.connect = connect
+        self.interval_seconds = max(0.05, interval_seconds)
+        self.on_restored = on_restored
+        self.attempts = 0
+        self.restored: Optional[Dict[str, int]] = None
+        self._worker: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="mongo-reconnect-supervisor")
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+
+    async def _run(self) -> None:
+        while self.restored is None:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.try_restore()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("MongoDB reconnect attempt failed (%s)", exc)
+
+    async def try_restore(self) -> bool:
+        """Probe Mongo once; on success replay the fallback and swap repositories."""
+        self.attempts += 1
+        try:
+            repository = self.connect()
+            await repository.ensure_indexes()
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.debug("MongoDB still unavailable (%s)", exc)
+            return False
+
+        for _ in range(MAX_REPLAY_PASSES):
+            revision = self.fallback.revision
+            counts = await repository.restore_snapshot(self.fallback.export_snapshot())
+            # No await between this check and the swap, so no fallback write can slip in.
+            if self.fallback.revision == revision:
+                self.deploy_service.repository = repository
+                self.restored = counts
+                logger.info(
+                    "MongoDB reachable again after %s probe(s); switched back from in-memory repository "
+                    "(replayed %s).",
+                    self.attempts,
+                    ", ".join(f"{name}={count}" for name, count in counts.items()),
+                )
+                if self.on_restored is not None:
+                    self.on_restored(repository)
+                return True
+        logger.info("In-memory repository kept changing during replay; retrying on the next probe.")
+        return False
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from models import DeployPreview, utc_now
+
+
+logger = logging.getLogger("cherry-deploy.preview")
+
+# Previews kept in process in front of the repository.
+LOCAL_PREVIEW_ENTRIES = 32
+
+
+class PreviewCache:
+    """Commit-pair keyed store of preview diffs shared by every preview caller.
+
+    A preview is fully determined by the (base, head) commit pair and the settings in
+    ``fingerprint``, so entries are never invalidated in place; they are persisted
+    through ``repository_getter()`` (surviving restarts and shared across workers) and
+    expire after ``ttl_seconds``. What moves is the pair itself: the base commit (last
+    successful deploy) and HEAD are memoized for ``pointer_seconds`` and forgotten as
+    soon as a deploy succeeds or a fetch moves HEAD, which points callers at a new key.
+    ``ttl_seconds`` of 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        repository_getter: Callable[[], Any],
+        *,
+        fingerprint: Any,
+        ttl_seconds: float,
+        pointer_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.repository_getter = repository_getter
+        self.fingerprint = json.dumps(fingerprint, sort_keys=True, default=str)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.pointer_seconds = max(0.0, pointer_seconds)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._local: OrderedDict[str, DeployPreview] = OrderedDict()
+        # name -> (expires_at, value); generations let forget() win over an in-flight resolve.
+        self._pointers: Dict[str, tuple[float, Optional[str]]] = {}
+        self._generations: Dict[str, int] = {"base": 0, "head": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def key(self, base_commit: str, head_commit: str) -> str:
+        return hashlib.sha256(f"{self.fingerprint}\0{base_commit}\0{head_commit}".encode()).hexdigest()
+
+    async def pointer(self, name: str, resolve: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """The memoized ``base``/``head`` commit, resolved again once stale or forgotten."""
+        if not self.enabled or not self.pointer_seconds:
+            return await resolve()
+        cached = self._pointers.get(name)
+        if cached is not None and cached[0] > self.clock():
+            return cached[1]
+        generation = self._generations[name]
+        value = await resolve()
+        if self._generations[name] == generation:
+            self._pointers[name] = (self.clock() + self.pointer_seconds, value)
+        return value
+
+    def forget_base(self) -> None:
+        self._forget("base")
+
+    def forget_head(self) -> None:
+        self._forget("head")
+
+    def _forget(self, name: str) -> None:
+        self._generations[name] += 1
+        self._pointers.pop(name, None)
+
+    async def get(self, preview_key: str) -> Optional[DeployPreview]:
+        if not self.enabled:
+            return None
+        preview = self._local.get(preview_key)
+        if preview is not None and _as_utc(preview.expires_at) <= utc_now():
+            self._local.pop(preview_key, None)
+            preview = None
+        if preview is None:
+            try:
+                preview = await self.repository_getter().get_preview(preview_key)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Preview cache read failed (%s); computing preview.", exc)
+                preview = None
+            if preview is not None:
+                self._remember(preview)
+        if preview is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return preview
+
+    async def put(
+        self,
+        preview_key: str,
+        *,
+        base_commit: str,
+        head_commit: str,
+        diff_context: Dict[str, Any],
+    ) -> None:
+        if not self.enabled:
+            return
+        preview = DeployPreview(
+            _id=preview_key,
+            base_commit=base_commit,
+            head_commit=head_commit,
+            diff_context=diff_context,
+            expires_at=utc_now() + timedelta(seconds=self.ttl_seconds),
+        )
+        self._remember(preview)
+        try:
+            await self.repository_getter().save_preview(preview)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Preview cache write failed (%s); keeping it in process only.", exc)
+
+    def _remember(self, preview: DeployPreview) -> None:
+        self._local[preview.preview_key] = preview
+        self._local.move_to_end(preview.preview_key)
+        while len(self._local) > LOCAL_PREVIEW_ENTRIES:
+            self._local.popitem(last=False)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
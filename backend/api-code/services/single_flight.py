@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one in-flight computation.
+
+    The first caller for ``(name, key)`` starts ``factory()`` as a task; callers
+    arriving while it runs await that task instead of starting their own, and get a
+    deep copy of its result (or its exception). The task is shielded, so a caller
+    that is cancelled does not cancel the work the others are waiting for. Nothing
+    is remembered once the task finishes: this deduplicates, it does not cache.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[tuple[str, Hashable], asyncio.Task[Any]] = {}
+        self._calls: Counter[str] = Counter()
+        self._deduplicated: Counter[str] = Counter()
+
+    async def run(self, name: str, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        flight_key = (name, key)
+        self._calls[name] += 1
+        task = self._in_flight.get(flight_key)
+        if task is not None:
+            self._deduplicated[name] += 1
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(factory())
+        self._in_flight[flight_key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(flight_key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": sum(self._calls.values()),
+            "deduplicated": sum(self._deduplicated.values()),
+            "by_name": {
+                name: {"calls": calls, "deduplicated": self._deduplicated[name]}
+                for name, calls in sorted(self._calls.items())
+            },
+        }
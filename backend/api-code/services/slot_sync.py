@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .file_ops import hash_file, read_optional_text, remove_path, replace_with_clone, replace_with_link
+
+
+logger = logging.getLogger("cherry-deploy.sync")
+
+MANIFEST_SUFFIX = ".sync-manifest.json"
+
+# relative path -> [size, mtime_ns, sha256]
+Manifest = Dict[str, List[Any]]
+
+
+def manifest_path_for(slot: Path) -> Path:
+    """Manifests live next to the slot so Nginx never serves them."""
+    return slot.parent / f".{slot.name}{MANIFEST_SUFFIX}"
+
+
+def _load_manifest(slot: Optional[Path]) -> Manifest:
+    if slot is None:
+        return {}
+    raw = read_optional_text(manifest_path_for(slot))
+    if not raw:
+        return {}
+    try:
+        payload = json.loads(raw)
+    except json.JSONDecodeError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def _parent_dirs(rel_paths: Any) -> set[str]:
+    parents: set[str] = set()
+    for rel_path in rel_paths:
+        parent = os.path.dirname(rel_path)
+        while parent and parent not in parents:
+            parents.add(parent)
+            parent = os.path.dirname(parent)
+    return parents
+
+
+def _entry_matches(entry: Optional[List[Any]], stat: os.stat_result) -> bool:
+    return bool(entry) and len(entry) == 3 and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns
+
+
+def _scan_files(root: Path) -> Dict[str, os.stat_result]:
+    entries: Dict[str, os.stat_result] = {}
+    if not root.is_dir():
+        return entries
+    for current, _dirs, files in os.walk(root):
+        for name in files:
+            full_path = os.path.join(current, name)
+            entries[os.path.relpath(full_path, root)] = os.lstat(full_path)
+    return entries
+
+
+class BlueGreenSyncEngine:
+    """Delta-sync a build output into a Blue/Green slot using a worker pool.
+
+    Files are compared by size, mtime and SHA-256 (cached per slot in a manifest).
+    Unchanged files stay in place, files identical to the live slot are hardlinked,
+    and everything else is reflinked/copied through an atomic rename so that an
+    inode shared with the live slot is never modified in place.
+    """
+
+    def __init__(self, *, workers: int) -> None:
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="slot-sync")
+
+    async def sync(self, source: Path, target: Path, *, link_from: Optional[Path] = None) -> Dict[str, Any]:
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        if link_from is not None and Path(link_from).resolve() == Path(target).resolve():
+            link_from = None
+
+        source_files, target_files, target_manifest, link_manifest = await loop.run_in_executor(
+            self._executor, self._scan, source, target, link_from
+        )
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self._executor,
+                    self._sync_file,
+                    rel_path,
+                    source,
+                    target,
+                    link_from,
+                    source_stat,
+                    target_files.get(rel_path),
+                    target_manifest.get(rel_path),
+                    link_manifest.get(rel_path),
+                )
+                for rel_path, source_stat in source_files.items()
+            )
+        )
+        stale = sorted(set(target_files) - set(source_files))
+        await loop.run_in_executor(
+            self._executor, self._finalize, target, stale, set(source_files), results
+        )
+
+        stats: Dict[str, Any] = {
+            "strategy": "delta",
+            "workers": self.workers,
+            "files_total": len(results),
+            "files_copied": 0,
+            "bytes_copied": 0,
+            "files_reflinked": 0,
+            "files_linked": 0,
+            "bytes_linked": 0,
+            "files_reused": 0,
+            "bytes_reused": 0,
+            "files_deleted": len(stale),
+            "bytes_hashed": 0,
+        }
+        for _rel_path, action, size, _entry, hashed in results:
+            stats["bytes_hashed"] += hashed
+            if action in {"copy", "reflink"}:
+                stats["files_copied"] += 1
+                stats["bytes_copied"] += size
+                if action == "reflink":
+                    stats["files_reflinked"] += 1
+            elif action == "link":
+                stats["files_linked"] += 1
+                stats["bytes_linked"] += size
+            else:
+                stats["files_reused"] += 1
+                stats["bytes_reused"] += size
+        stats["duration_seconds"] = round(time.monotonic() - started, 3)
+        return stats
+
+    @staticmethod
+    def _scan(
+        source: Path, target: Path, link_from: Optional[Path]
+    ) -> Tuple[Dict[str, os.stat_result], Dict[str, os.stat_result], Manifest, Manifest]:
+        if target.exists() and not target.is_dir():
+            remove_path(target)
+        target.mkdir(parents=True, exist_ok=True)
+        source_files = _scan_files(source)
+        target_files = _scan_files(target)
+        # A file in the slot that must become a directory is removed up front.
+        for rel_path in _parent_dirs(source_files) & set(target_files):
+            (target / rel_path).unlink(missing_ok=True)
+            target_files.pop(rel_path, None)
+        return source_files, target_files, _load_manifest(target), _load_manifest(link_from)
+
+    @staticmethod
+    def _cached_hash(path: Path, stat: os.stat_result, entry: Optional[List[Any]]) -> Tuple[str, int]:
+        if _entry_matches(entry, stat):
+            return str(entry[2]), 0  # type: ignore[index]
+        return hash_file(path), stat.st_size
+
+    def _sync_file(
+        self,
+        rel_path: str,
+        source: Path,
+        target: Path,
+        link_from: Optional[Path],
+        source_stat: os.stat_result,
+        target_stat: Optional[os.stat_result],
+        target_entry: Optional[List[Any]],
+        link_entry: Optional[List[Any]],
+    ) -> Tuple[str, str, int, List[Any], int]:
+        source_path = source / rel_path
+        target_path = target / rel_path
+        size = source_stat.st_size
+        hashed = 0
+        source_hash: Optional[str] = None
+
+        if target_stat is not None and target_stat.st_size == size:
+            if target_stat.st_mtime_ns == source_stat.st_mtime_ns and _entry_matches(target_entry, target_stat):
+                return rel_path, "reuse", size, list(target_entry), hashed  # type: ignore[arg-type]
+            source_hash = hash_file(source_path)
+            hashed += size
+            target_hash, cost = self._cached_hash(target_path, target_stat, target_entry)
+            hashed += cost
+            if target_hash == source_hash:
+                return rel_path, "reuse", size, [size, target_stat.st_mtime_ns, source_hash], hashed
+
+        if link_from is not None:
+            link_path = link_from / rel_path
+            try:
+                link_stat = os.lstat(link_path)
+            except OSError:
+                link_stat = None
+            if link_stat is not None and link_stat.st_size == size:
+                if source_hash is None:
+                    source_hash = hash_file(source_path)
+                    hashed += size
+                link_hash, cost = self._cached_hash(link_path, link_stat, link_entry)
+                hashed += cost
+                if link_hash == source_hash:
+                    if target_path.is_dir():
+                        remove_path(target_path)
+                    if replace_with_link(link_path, target_path):
+                        return rel_path, "link", size, [size, link_stat.st_mtime_ns, source_hash], hashed
+
+        if source_hash is None:
+            source_hash = hash_file(source_path)
+            hashed += size
+        if target_path.is_dir():
+            remove_path(target_path)
+        method = replace_with_clone(source_path, target_path)
+        mtime_ns = os.lstat(target_path).st_mtime_ns
+        return rel_path, method, size, [size, mtime_ns, source_hash], hashed
+
+    @staticmethod
+    def _finalize(
+        target: Path,
+        stale: List[str],
+        kept: set[str],
+        results: List[Tuple[str, str, int, List[Any], int]],
+    ) -> None:
+        for rel_path in stale:
+            (target / rel_path).unlink(missing_ok=True)
+        kept_dirs = _parent_dirs(kept)
+        for current, _dirs, _files in os.walk(target, topdown=False):
+            rel_dir = os.path.relpath(current, target)
+            if rel_dir == "." or rel_dir in kept_dirs:
+                continue
+            try:
+                os.rmdir(current)
+            except OSError:
+                logger.debug("Keeping non-empty directory during slot sync: %s", current)
+        manifest = {rel_path: entry for rel_path, _action, _size, entry, _hashed in results}
+        manifest_path = manifest_path_for(target)
+        temp_manifest = manifest_path.with_name(manifest_path.name + ".tmp")
+        temp_manifest.write_text(json.dumps(manifest, separators=(",", ":")))
+        os.replace(temp_manifest, manifest_path)
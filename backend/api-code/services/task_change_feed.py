@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from domain import DeployStatus
+
+from .deploy_service import DeployService
+from .log_store import LOG_STREAMS
+
+
+logger = logging.getLogger("cherry-deploy.change-feed")
+
+# MongoDB error code for "$changeStream is only supported on replica sets".
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+# Running tasks whose relayed step progress is remembered (entries also go at a terminal status).
+RELAYED_TASK_MEMORY = 256
+
+
+class TaskChangeRelay:
+    """Republishes ``deploy_tasks`` changes made by other processes on the local event broker.
+
+    Follows ``repository.watch_task_changes`` (a change stream on Mongo, a tail of
+    the change log on the in-memory repository). Changes to tasks this process runs
+    itself are skipped; for the rest the cached document (and, for a completed deploy,
+    the memoized preview base commit) is dropped and the same stage / step / log events
+    the pipeline publishes locally are rebuilt from the write, so SSE clients of any API
+    worker get live updates without polling.
+    ``restart`` re-attaches after the repository is swapped.
+    """
+
+    def __init__(
+        self,
+        deploy_service: DeployService,
+        *,
+        poll_seconds: float = 1.0,
+        retry_seconds: float = 5.0,
+    ) -> None:
+        self.deploy_service = deploy_service
+        self.poll_seconds = max(0.05, poll_seconds)
+        self.retry_seconds = max(0.05, retry_seconds)
+        self.changes_seen = 0
+        self.events_relayed = 0
+        self._resume_token: Any = None
+        self._steps: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()
+        self._worker: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="task-change-relay")
+
+    def restart(self) -> None:
+        # The resume token belongs to the previous repository's stream.
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self._resume_token = None
+        self._steps.clear()
+        self.start()
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+
+    async def _run(self) -> None:
+        while True:
+            repository = self.deploy_service.repository
+            try:
+                async for change in repository.watch_task_changes(
+                    resume_after=self._resume_token, poll_seconds=self.poll_seconds
+                ):
+                    self._resume_token = change["resume_token"]
+                    self.relay(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                if getattr(exc, "code", None) == CHANGE_STREAM_UNSUPPORTED:
+                    logger.warning("MongoDB is not a replica set; task change feed disabled (%s)", exc)
+                    return
+                logger.warning("Task change feed interrupted (%s); retrying in %.0fs", exc, self.retry_seconds)
+            await asyncio.sleep(self.retry_seconds)
+
+    def relay(self, change: Dict[str, Any]) -> int:
+        """Publish the events for one change; returns how many were published."""
+        self.changes_seen += 1
+        task_id = change["task_id"]
+        events = self.deploy_service.events
+        if events.is_local(task_id):
+            return 0
+        invalidate = getattr(self.deploy_service.repository, "invalidate", None)
+        if invalidate is not None:
+            invalidate(task_id)
+        if change.get("status") == DeployStatus.COMPLETED.value:
+            # Another worker deployed; previews must diff against its commit now.
+            self.deploy_service.preview_cache.forget_base()
+        steps = self._steps.setdefault(task_id, {})
+        self._steps.move_to_end(task_id)
+        while len(self._steps) > RELAYED_TASK_MEMORY:
+            self._steps.popitem(last=False)
+        event_list = events_for_change(change, steps)
+        if change.get("status") is not None and DeployStatus(change["status"]).is_terminal:
+            self._steps.pop(task_id, None)
+        published = 0
+        for event_type, data in event_list:
+            events.publish(task_id, event_type, data, relayed=True)
+            published += 1
+        self.events_relayed += published
+        return published
+
+
+def events_for_change(
+    change: Dict[str, Any], steps: Optional[Dict[str, Dict[str, Any]]] = None
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Map a task change onto the event types the local pipeline publishes.
+
+    ``live_output`` writes become ``step_started`` / ``log`` / ``step_finished``.
+    ``steps`` holds what was already relayed for this task's stages (step id, lines
+    seen per stream); pass the same dict for every change of a task. ``log`` events
+    carry at most the tail stored in the document, so a burst larger than
+    ``DEPLOY_LOG_METADATA_TAIL_LINES`` between two flushes arrives shortened.
+    """
+    events: List[Tuple[str, Dict[str, Any]]] = []
+    status = change.get("status")
+    updated: Dict[str, Any] = change.get("updated") or {}
+    if change["operation"] == "insert":
+        events.append(("created", {"status": status}))
+    elif status is not None:
+        if DeployStatus(status).is_terminal:
+            data: Dict[str, Any] = {"status": status, "terminal": True}
+            if updated.get("error_log"):
+                data["error_log"] = updated["error_log"]
+            events.append(("status", data))
+        else:
+            events.append(("stage_started", {"status": status, "stage": status}))
+
+    # Updates arrive as flattened $set paths: metadata.<stage>.live_output.<field>.
+    live_output: Dict[str, Dict[str, Any]] = {}
+    for path, value in updated.items():
+        parts = path.split(".", 3)
+        if len(parts) < 3 or parts[0] != "metadata" or parts[2] != "live_output":
+            continue
+        fields = live_output.setdefault(parts[1], {})
+        if len(parts) == 3:
+            if isinstance(value, dict):
+                fields.update(value)
+            continue
+        *parents, leaf = parts[3].split(".")
+        for key in parents:
+            fields = fields.setdefault(key, {})
+        fields[leaf] = value
+    steps = {} if steps is None else steps
+    for stage, fields in live_output.items():
+        events.extend(_step_events(stage, fields, steps))
+    return events
+
+
+def _step_events(
+    stage: str, fields: Dict[str, Any], steps: Dict[str, Dict[str, Any]]
+) -> List[Tuple[str, Dict[str, Any]]]:
+    events: List[Tuple[str, Dict[str, Any]]] = []
+    step_id = (fields.get("log_ref") or {}).get("step_id")
+    step = steps.get(stage)
+    # Unchanged fields may be left out of an update, so a step is only new when its id changes.
+    if step is None or (step_id is not None and step_id != step["step_id"]):
+        step = {"step_id": step_id, "description": None, "command": None, "lines": {}, "finished": False}
+        steps[stage] = step
+        started = True
+    else:
+        started = False
+    for key in ("description", "command"):
+        if key in fields:
+            step[key] = fields[key]
+    if started:
+        events.append(
+            ("step_started", {"stage": stage, "description": step["description"], "command": step["command"]})
+        )
+
+    for stream in LOG_STREAMS:
+        total = fields.get(f"{stream}_lines")
+        seen = step["lines"].get(stream, 0)
+        if not isinstance(total, int) or total <= seen:
+            continue
+        step["lines"][stream] = total
+        tail = str(fields.get(stream) or "").splitlines()
+        unseen = min(total - seen, len(tail))
+        if unseen:
+            data = {"stage": stage, "description": step["description"], "stream": stream}
+            events.append(("log", {**data, "lines": tail[-unseen:]}))
+
+    if fields.get("running") is False and not step["finished"]:
+        step["finished"] = True
+        events.append(
+            (
+                "step_finished",
+                {
+                    "stage": stage,
+                    "description": step["description"],
+                    "returncode": fields.get("returncode"),
+                    "duration_seconds": fields.get("duration_seconds"),
+                },
+            )
+        )
+    return events
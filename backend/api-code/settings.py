@@ -23,6 +23,79 @@ class Settings(BaseModel):
         alias="MONGODB_DB_NAME",
         description="MongoDB database name",
     )
+    mongodb_server_selection_timeout_ms: int = Field(
+        default=3000,
+        alias="MONGODB_SERVER_SELECTION_TIMEOUT_MS",
+        description=(
+            "How long an operation waits for a usable MongoDB server before failing; keeps startup "
+            "from stalling on an unreachable host before the in-memory fallback takes over."
+        ),
+    )
+    mongodb_connect_timeout_ms: int = Field(
+        default=3000,
+        alias="MONGODB_CONNECT_TIMEOUT_MS",
+        description="TCP connect timeout for new MongoDB connections.",
+    )
+    mongodb_max_pool_size: int = Field(
+        default=50,
+        alias="MONGODB_MAX_POOL_SIZE",
+        description="Maximum connections in the MongoDB client pool.",
+    )
+    mongodb_min_pool_size: int = Field(
+        default=0,
+        alias="MONGODB_MIN_POOL_SIZE",
+        description="Connections the MongoDB client keeps open while idle.",
+    )
+    mongodb_reconnect_interval_seconds: float = Field(
+        default=15.0,
+        alias="MONGODB_RECONNECT_INTERVAL_SECONDS",
+        description=(
+            "While running on the in-memory fallback, probe MongoDB this often and switch back "
+            "(replaying tasks recorded during the outage) once it answers. 0 disables reconnection."
+        ),
+    )
+    mongodb_verify_query_plans: bool = Field(
+        default=False,
+        alias="MONGODB_VERIFY_QUERY_PLANS",
+        description=(
+            "Explain every catalogued repository query at startup and log plans that fall back to "
+            "a collection scan or an in-memory sort."
+        ),
+    )
+    task_cache_ttl_seconds: float = Field(
+        default=5.0,
+        alias="TASK_CACHE_TTL_SECONDS",
+        description=(
+            "Lifetime of a task document in the read-through cache in front of MongoDB. "
+            "Writes from this process refresh it immediately; 0 disables the cache."
+        ),
+    )
+    task_cache_max_entries: int = Field(
+        default=256,
+        alias="TASK_CACHE_MAX_ENTRIES",
+        description="Task documents held by the read-through cache (least recently used evicted first).",
+    )
+    task_change_feed_enabled: bool = Field(
+        default=True,
+        alias="TASK_CHANGE_FEED_ENABLED",
+        description=(
+            "Follow deploy_tasks changes (Mongo change stream, needs a replica set) and republish "
+            "updates made by other workers/nodes as live status events."
+        ),
+    )
+    task_change_feed_poll_seconds: float = Field(
+        default=1.0,
+        alias="TASK_CHANGE_FEED_POLL_SECONDS",
+        description="Poll interval of the change feed when it tails the in-memory repository.",
+    )
+    memory_repository_max_tasks: int = Field(
+        default=5000,
+        alias="MEMORY_REPOSITORY_MAX_TASKS",
+        description=(
+            "Tasks kept by the in-memory fallback repository; the oldest finished tasks (with their "
+            "reports and log files) are evicted beyond this. 0 keeps everything."
+        ),
+    )
     chatbot_repo_path: str = Field(
         default="/home/ec2-user/projects/SB_Hackathon_Cherry_Chatbot",
         alias="CHATBOT_REPO_PATH",
@@ -43,6 +116,14 @@ class Settings(BaseModel):
         alias="NGINX_LIVE_SYMLINK",
         description="Symlink that Nginx uses as its document root.",
     )
+    cutover_sync_workers: int = Field(
+        default=0,
+        alias="CUTOVER_SYNC_WORKERS",
+        description=(
+            "Worker threads used to hash/copy files during the Blue/Green slot sync. "
+            "0 picks a value based on CPU cores."
+        ),
+    )
     deploy_dry_run: bool = Field(
         default=False,
         alias="DEPLOY_DRY_RUN",
@@ -58,6 +139,90 @@ class Settings(BaseModel):
         alias="DEPLOY_ALLOWED_BRANCHES",
         description="Comma-separated list of branches permitted for deploy operations.",
     )
+    deploy_isolation_mode: str = Field(
+        default="shared",
+        alias="DEPLOY_ISOLATION_MODE",
+        description=(
+            "'shared' runs every pipeline in CHATBOT_REPO_PATH behind one lock; 'worktree' gives each "
+            "branch its own git worktree and lock so different branches build in parallel."
+        ),
+    )
+    deploy_worktree_root: Optional[str] = Field(
+        default=None,
+        alias="DEPLOY_WORKTREE_ROOT",
+        description="Directory holding per-branch worktrees (defaults to '<CHATBOT_REPO_PATH>-worktrees').",
+    )
+    deploy_max_parallel_pipelines: int = Field(
+        default=0,
+        alias="DEPLOY_MAX_PARALLEL_PIPELINES",
+        description="Global cap on concurrently running pipelines in worktree mode. 0 uses half the CPU cores.",
+    )
+    preflight_wait_seconds: float = Field(
+        default=30.0,
+        alias="PREFLIGHT_WAIT_SECONDS",
+        description=(
+            "How long a finished pipeline waits for the concurrent preflight analysis (diff, cost, "
+            "LLM preview) before closing the task; a slower snapshot is still written when ready."
+        ),
+    )
+    deploy_stream_command_output: bool = Field(
+        default=True,
+        alias="DEPLOY_STREAM_COMMAND_OUTPUT",
+        description=(
+            "When true, stage commands stream stdout/stderr into a bounded tail that is "
+            "flushed to the task metadata while the command is still running."
+        ),
+    )
+    deploy_log_tail_lines: int = Field(
+        default=200,
+        alias="DEPLOY_LOG_TAIL_LINES",
+        description="Number of trailing stdout/stderr lines retained per streamed command.",
+    )
+    deploy_log_metadata_tail_lines: int = Field(
+        default=20,
+        alias="DEPLOY_LOG_METADATA_TAIL_LINES",
+        description=(
+            "Lines of stdout/stderr kept inline in step metadata; the full output goes to the "
+            "chunked log store and is paged through /tasks/{task_id}/logs."
+        ),
+    )
+    deploy_log_flush_seconds: float = Field(
+        default=2.0,
+        alias="DEPLOY_LOG_FLUSH_SECONDS",
+        description="Interval (seconds) between live log flushes to the repository.",
+    )
+    deploy_queue_worker_id: Optional[str] = Field(
+        default=None,
+        alias="DEPLOY_QUEUE_WORKER_ID",
+        description=(
+            "Stable identity of this host's queue worker (defaults to the hostname); leases it held "
+            "before a restart are reclaimed immediately. Give each API process its own id when "
+            "several run on one host."
+        ),
+    )
+    deploy_coalesce_requests: bool = Field(
+        default=True,
+        alias="DEPLOY_COALESCE_REQUESTS",
+        description=(
+            "Fold a deploy request into an already queued, not yet started deploy for the same branch "
+            "(it fetches the latest commit when it runs anyway)."
+        ),
+    )
+    deploy_queue_lease_seconds: float = Field(
+        default=60.0,
+        alias="DEPLOY_QUEUE_LEASE_SECONDS",
+        description="Lease on a claimed deploy job; renewed by heartbeats every third of the lease.",
+    )
+    deploy_queue_poll_seconds: float = Field(
+        default=2.0,
+        alias="DEPLOY_QUEUE_POLL_SECONDS",
+        description="Idle interval between queue polls when no enqueue wakes the worker.",
+    )
+    deploy_queue_max_attempts: int = Field(
+        default=3,
+        alias="DEPLOY_QUEUE_MAX_ATTEMPTS",
+        description="Interrupted jobs are retried up to this many claims before the task is failed.",
+    )
     frontend_project_subdir: str = Field(
         default="frontend/my-dashboard",
         alias="FRONTEND_PROJECT_SUBDIR",
@@ -89,6 +254,54 @@ class Settings(BaseModel):
             "after build/export."
         ),
     )
+    deploy_cache_root: str = Field(
+        default="~/.cache/cherry-deploy",
+        alias="DEPLOY_CACHE_ROOT",
+        description="Directory (outside the chatbot repository) that holds build/dependency caches.",
+    )
+    build_artifact_cache_enabled: bool = Field(
+        default=True,
+        alias="BUILD_ARTIFACT_CACHE_ENABLED",
+        description="Reuse exported build output when the frontend tree fingerprint matches a previous build.",
+    )
+    build_artifact_cache_max_mb: int = Field(
+        default=2048,
+        alias="BUILD_ARTIFACT_CACHE_MAX_MB",
+        description="Disk budget (MiB) for cached build artifacts; least recently used entries are evicted.",
+    )
+    next_build_cache_enabled: bool = Field(
+        default=True,
+        alias="NEXT_BUILD_CACHE_ENABLED",
+        description="Restore/save the Next.js .next/cache directory per project and branch around builds.",
+    )
+    next_build_cache_max_mb: int = Field(
+        default=1024,
+        alias="NEXT_BUILD_CACHE_MAX_MB",
+        description="Total disk budget (MiB) for Next.js build caches; least recently used branches are evicted.",
+    )
+    next_build_cache_entry_max_mb: int = Field(
+        default=512,
+        alias="NEXT_BUILD_CACHE_ENTRY_MAX_MB",
+        description="Build caches larger than this (MiB) are not saved.",
+    )
+    dependency_cache_enabled: bool = Field(
+        default=True,
+        alias="DEPENDENCY_CACHE_ENABLED",
+        description=(
+            "Restore node_modules from a snapshot keyed by the package-lock.json hash instead of "
+            "reinstalling after git clean."
+        ),
+    )
+    dependency_cache_max_snapshots: int = Field(
+        default=3,
+        alias="DEPENDENCY_CACHE_MAX_SNAPSHOTS",
+        description="Number of node_modules snapshots retained (least recently used are evicted).",
+    )
+    frontend_ci_install_command: str = Field(
+        default="npm ci --prefer-offline --no-audit --no-fund",
+        alias="FRONTEND_CI_INSTALL_COMMAND",
+        description="Install command used on dependency cache misses (runs against the shared npm cache).",
+    )
     preview_llm_model: str = Field(
         default="gemini-2.5-flash",
         alias="PREVIEW_LLM_MODEL",
@@ -152,7 +365,36 @@ class Settings(BaseModel):
     github_compare_cache_seconds: int = Field(
         default=60,
         alias="GITHUB_COMPARE_CACHE_SECONDS",
-        description="TTL for cached GitHub Compare responses (seconds).",
+        description=(
+            "How long a cached GitHub Compare response is served without a request; afterwards it is "
+            "revalidated with If-None-Match (a 304 does not count against the rate limit)."
+        ),
+    )
+    github_compare_cache_max_entries: int = Field(
+        default=128,
+        alias="GITHUB_COMPARE_CACHE_MAX_ENTRIES",
+        description="Number of GitHub Compare responses (and ETags) kept; least recently used are evicted.",
+    )
+    github_compare_concurrency: int = Field(
+        default=8,
+        alias="GITHUB_COMPARE_CONCURRENCY",
+        description=(
+            "Maximum GitHub API requests in flight while paging a compare whose file list hit "
+            "GitHub's 300-file cap."
+        ),
+    )
+    github_compare_max_commits: int = Field(
+        default=500,
+        alias="GITHUB_COMPARE_MAX_COMMITS",
+        description=(
+            "Largest range (in commits) whose files are collected commit by commit when the compare "
+            "response is truncated; larger ranges keep the first 300 files and are flagged."
+        ),
+    )
+    github_api_url: str = Field(
+        default="https://api.github.com",
+        alias="GITHUB_API_URL",
+        description="GitHub REST API base URL (GitHub Enterprise: https://<host>/api/v3).",
     )
     preview_diff_command: str = Field(
         default="git diff --name-status {base_commit}..HEAD",
@@ -164,6 +406,35 @@ class Settings(BaseModel):
         alias="PREVIEW_DIFF_MAX_CHARS",
         description="Maximum number of diff characters supplied to the preview LLM.",
     )
+    preview_cache_ttl_seconds: int = Field(
+        default=7 * 24 * 3600,
+        alias="PREVIEW_CACHE_TTL_SECONDS",
+        description=(
+            "How long a commit pair's preview diff (summary, stats, compare metadata) stays in the deploy_previews "
+            "collection. 0 disables the preview cache."
+        ),
+    )
+    preview_cache_pointer_seconds: float = Field(
+        default=30.0,
+        alias="PREVIEW_CACHE_POINTER_SECONDS",
+        description=(
+            "How long the last-deployed and HEAD commits are reused between previews; both are also "
+            "refreshed as soon as a deploy succeeds or a clone stage moves HEAD."
+        ),
+    )
+    llm_memo_ttl_seconds: int = Field(
+        default=30 * 24 * 3600,
+        alias="LLM_MEMO_TTL_SECONDS",
+        description=(
+            "How long a Gemini preview is reused for the same model and prompt (llm_preview_memos collection, "
+            "or files under DEPLOY_CACHE_ROOT/llm-memo without MongoDB). 0 disables the memo."
+        ),
+    )
+    llm_memo_max_entries: int = Field(
+        default=1000,
+        alias="LLM_MEMO_MAX_ENTRIES",
+        description="Maximum number of stored LLM previews; the oldest are evicted first (0 = unbounded).",
+    )
     display_timezone: str = Field(
         default="Asia/Seoul",
         alias="DISPLAY_TIMEZONE",
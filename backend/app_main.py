@@ -14,14 +14,25 @@ if str(API_CODE_PATH) not in sys.path:
     sys.path.insert(0, str(API_CODE_PATH))
 
 from env_loader import load_local_env  # noqa: E402
-from repositories import DeployTaskRepository, InMemoryDeployTaskRepository  # noqa: E402
+from repositories import (  # noqa: E402
+    CachingDeployTaskRepository,
+    DeployTaskRepository,
+    InMemoryDeployTaskRepository,
+)
 from routers import (  # noqa: E402
     build_auth_router,
     build_chat_router,
     build_deploy_router,
     build_health_router,
 )
-from services import AuthService, DeployService, GeminiChatService  # noqa: E402
+from services import (  # noqa: E402
+    AuthService,
+    DeployQueue,
+    DeployService,
+    GeminiChatService,
+    MongoReconnectSupervisor,
+    TaskChangeRelay,
+)
 from settings import get_settings  # noqa: E402
 
 
@@ -46,20 +57,42 @@ app.add_middleware(
 )
 
 chat_service = GeminiChatService(api_key=settings.gemini_api_key)
-deploy_repository: DeployTaskRepository | InMemoryDeployTaskRepository = DeployTaskRepository()
+
+
+def _build_mongo_repository() -> DeployTaskRepository | CachingDeployTaskRepository:
+    repository = DeployTaskRepository()
+    if settings.task_cache_ttl_seconds <= 0:
+        return repository
+    return CachingDeployTaskRepository(
+        repository,
+        max_entries=settings.task_cache_max_entries,
+        ttl_seconds=settings.task_cache_ttl_seconds,
+    )
+
+
+deploy_repository: DeployTaskRepository | CachingDeployTaskRepository | InMemoryDeployTaskRepository = (
+    _build_mongo_repository()
+)
 deploy_service = DeployService(deploy_repository, settings)
+deploy_queue = DeployQueue(deploy_service, settings)
 auth_service = AuthService(settings)
 auth_dependency = auth_service.build_auth_dependency()
+mongo_supervisor: MongoReconnectSupervisor | None = None
+task_change_relay = (
+    TaskChangeRelay(deploy_service, poll_seconds=settings.task_change_feed_poll_seconds)
+    if settings.task_change_feed_enabled
+    else None
+)
 
 app.include_router(build_chat_router(chat_service))
 app.include_router(build_auth_router(auth_service))
-app.include_router(build_deploy_router(deploy_service, auth_dependency))
-app.include_router(build_health_router(deploy_service))
+app.include_router(build_deploy_router(deploy_service, auth_dependency, deploy_queue))
+app.include_router(build_health_router(deploy_service, deploy_queue))
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    global deploy_repository, deploy_service  # pylint: disable=global-statement
+    global deploy_repository, deploy_service, mongo_supervisor  # pylint: disable=global-statement
     try:
         await deploy_repository.ensure_indexes()
         logger.info("MongoDB repository initialized successfully.")
@@ -67,8 +100,62 @@ async def on_startup() -> None:
         logger.warning(
             "MongoDB unavailable (%s); falling back to in-memory repository.", exc
         )
-        deploy_repository = InMemoryDeployTaskRepository()
+        fallback = InMemoryDeployTaskRepository(
+            memo_root=Path(settings.deploy_cache_root).expanduser() / "llm-memo",
+            max_tasks=settings.memory_repository_max_tasks,
+        )
+        deploy_repository = fallback
         deploy_service.repository = deploy_repository  # type: ignore[assignment]
+        if settings.mongodb_reconnect_interval_seconds > 0:
+            mongo_supervisor = MongoReconnectSupervisor(
+                deploy_service,
+                fallback,
+                _build_mongo_repository,
+                interval_seconds=settings.mongodb_reconnect_interval_seconds,
+                on_restored=_on_mongo_restored,
+            )
+            mongo_supervisor.start()
+    else:
+        if settings.mongodb_verify_query_plans:
+            await _log_query_plan_problems()
+    deploy_queue.start()
+    if task_change_relay is not None:
+        task_change_relay.start()
+
+
+def _on_mongo_restored(repository: DeployTaskRepository | CachingDeployTaskRepository) -> None:
+    global deploy_repository  # pylint: disable=global-statement
+    deploy_repository = repository
+    if task_change_relay is not None:
+        task_change_relay.restart()
+
+
+async def _log_query_plan_problems() -> None:
+    try:
+        report = await deploy_repository.verify_query_plans()  # type: ignore[union-attr]
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning("Query plan verification failed (%s)", exc)
+        return
+    for entry in report:
+        if entry["problems"]:
+            logger.warning(
+                "Unindexed query plan %s.%s: %s (%s)",
+                entry["collection"],
+                entry["query"],
+                ",".join(entry["problems"]),
+                " > ".join(entry["stages"]),
+            )
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    if mongo_supervisor is not None:
+        await mongo_supervisor.stop()
+    if task_change_relay is not None:
+        await task_change_relay.stop()
+    await deploy_queue.stop()
+    if deploy_service.github_compare is not None:
+        await deploy_service.github_compare.aclose()
 
 
 if __name__ == "__main__":
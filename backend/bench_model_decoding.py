@@ -0,0 +1,143 @@
+"""Per-document cost of reading a stored task and answering ``/status`` with it.
+
+For a typical task and a large one (a multi-MB ``npm run build`` stdout in the build
+stage plus its ``live_output`` tail) it times each step of the read path: BSON
+decoding (what the driver does), the validating ``from_mongo`` and the trusted
+``from_trusted`` model construction, building the ``DeployStatusResponse`` and
+serializing it to JSON::
+
+    python bench_model_decoding.py
+"""
+
+from __future__ import annotations
+
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+try:
+    import bson
+except ImportError:  # pragma: no cover - pymongo is installed with motor
+    bson = None  # type: ignore
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from models import DeployReport, DeployTask  # noqa: E402
+from schemas import DeployStatusResponse  # noqa: E402
+
+
+LIVE_OUTPUT_TAIL_LINES = 200
+
+
+def _output(lines: int) -> str:
+    return "\n".join(f"[{index:06d}] compiled ./src/app/page.tsx in 12ms" for index in range(lines))
+
+
+def build_task_document(build_output_lines: int) -> Dict[str, Any]:
+    started = datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc)
+    stdout = _output(build_output_lines)
+    tail = "\n".join(stdout.splitlines()[-LIVE_OUTPUT_TAIL_LINES:])
+    log_ref = {"step_id": "a1b2c3d4e5f60718", "chunks": 3, "stdout_lines": build_output_lines}
+    return {
+        "_id": "5f1d7c8e-3a1b-4c2d-9e8f-0a1b2c3d4e5f",
+        "status": "completed",
+        "started_at": started,
+        "completed_at": started + timedelta(minutes=4),
+        "revision": 42,
+        "metadata": {
+            "branch": "deploy",
+            "action": "deploy",
+            "requested_by": "ops",
+            "summary": {"commit": "0" * 40, "preflight": {"risk_assessment": {"level": "low"}}},
+            "running_clone": {"timestamp": started.isoformat(), "steps": [{"command": "git pull"}]},
+            "running_build": {
+                "timestamp": started.isoformat(),
+                "steps": [
+                    {
+                        "command": "npm run build",
+                        "returncode": 0,
+                        "duration_seconds": 182.4,
+                        "stdout": stdout,
+                        "stderr": "",
+                        "log_ref": log_ref,
+                    }
+                ],
+                "live_output": {
+                    "command": "npm run build",
+                    "running": False,
+                    "stdout": tail,
+                    "stderr": "",
+                    "stdout_lines": build_output_lines,
+                    "stderr_lines": 0,
+                    "log_ref": log_ref,
+                },
+            },
+        },
+    }
+
+
+def build_report_document() -> Dict[str, Any]:
+    return {
+        "_id": "report-1",
+        "task_id": "5f1d7c8e-3a1b-4c2d-9e8f-0a1b2c3d4e5f",
+        "metrics": {stage: {"duration_seconds": 12.5} for stage in ("clone", "build", "cutover")},
+        "created_at": datetime(2024, 5, 1, 9, 4),
+    }
+
+
+def status_response(task: DeployTask) -> DeployStatusResponse:
+    # What the /status handler builds; FastAPI passes the instance through unvalidated.
+    return DeployStatusResponse(
+        task_id=task.task_id,
+        status=task.status,
+        metadata=task.metadata,
+        stages={},
+        started_at=task.started_at,
+        completed_at=task.completed_at,
+        error_log=task.error_log,
+        blue_green_plan={"active_slot": "blue", "standby_slot": "green"},
+        timezone="Asia/Seoul",
+    )
+
+
+def per_call_microseconds(function: Callable[[], Any]) -> float:
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e6
+
+
+def main() -> None:
+    header = ("document", "size MB", "bson.decode", "from_mongo", "from_trusted", "response", "to JSON")
+    print("{:<10} {:>8} {:>12} {:>11} {:>13} {:>9} {:>10}   (us per document)".format(*header))
+    for name, document in (("typical", build_task_document(40)), ("large", build_task_document(60_000))):
+        assert DeployTask.from_trusted(document) == DeployTask.from_mongo(document)
+        raw = bson.encode(document) if bson is not None else None
+        task = DeployTask.from_trusted(document)
+        response = status_response(task)
+        row = (
+            name,
+            len(raw) / 1e6 if raw is not None else float("nan"),
+            per_call_microseconds(lambda: bson.decode(raw)) if raw is not None else float("nan"),
+            per_call_microseconds(lambda: DeployTask.from_mongo(document)),
+            per_call_microseconds(lambda: DeployTask.from_trusted(document)),
+            per_call_microseconds(lambda: status_response(task)),
+            per_call_microseconds(response.model_dump_json),
+        )
+        print("{:<10} {:>8.2f} {:>12.1f} {:>11.1f} {:>13.1f} {:>9.1f} {:>10.1f}".format(*row))
+
+    report = build_report_document()
+    assert DeployReport.from_trusted(report) == DeployReport.from_mongo(report)
+    validated = per_call_microseconds(lambda: DeployReport.from_mongo(report))
+    trusted = per_call_microseconds(lambda: DeployReport.from_trusted(report))
+    print(f"report: from_mongo {validated:.1f} us, from_trusted {trusted:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Create the declared indexes and explain every repository query against MongoDB.
+
+Exits non-zero when a winning plan contains a COLLSCAN or an in-memory SORT::
+
+    python check_query_plans.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from db.mongo import get_database  # noqa: E402
+from env_loader import load_local_env  # noqa: E402
+from repositories.indexes import ensure_catalog_indexes, verify_query_plans  # noqa: E402
+
+
+async def main() -> int:
+    database = get_database()
+    await ensure_catalog_indexes(database)
+    report = await verify_query_plans(database)
+    for entry in report:
+        verdict = "OK" if not entry["problems"] else "PROBLEM " + ",".join(entry["problems"])
+        print(f"{entry['collection']:<16} {entry['query']:<24} {verdict:<20} {' > '.join(entry['stages'])}")
+    return 1 if any(entry["problems"] for entry in report) else 0
+
+
+if __name__ == "__main__":
+    load_local_env()
+    raise SystemExit(asyncio.run(main()))
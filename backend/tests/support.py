@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from settings import Settings
+
+# Dry-run deploys against the current directory, without Gemini.
+TEST_SETTINGS: dict[str, Any] = {
+    "GEMINI_API_KEY": None,
+    "CHATBOT_REPO_PATH": ".",
+    "NGINX_GREEN_PATH": "./green",
+    "NGINX_BLUE_PATH": "./blue",
+    "NGINX_LIVE_SYMLINK": "./current",
+    "DEPLOY_DRY_RUN": True,
+}
+
+
+def make_settings(**overrides: Any) -> Settings:
+    """``Settings`` for tests; ``overrides`` use the environment variable names."""
+    return Settings.model_validate({**TEST_SETTINGS, **overrides})
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from services.artifact_cache import BuildArtifactCache
+from services.dependency_cache import DependencyCache
+
+
+class CacheEntryLockingTest(unittest.TestCase):
+    def setUp(self) -> None:  # noqa: N802
+        self.root = Path(tempfile.mkdtemp(prefix="cache-locking-test-"))
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def _project(self, name: str, content: str) -> Path:
+        project = self.root / name
+        (project / "node_modules" / "pkg").mkdir(parents=True)
+        (project / "node_modules" / "pkg" / "index.js").write_text(content)
+        return project
+
+    def test_snapshot_replace_waits_for_a_restore_in_progress(self) -> None:
+        cache = DependencyCache(self.root / "cache", max_snapshots=2)
+        cache._save("lock-a", self._project("first", "v1"))
+
+        saver = threading.Thread(target=cache._save, args=("lock-a", self._project("second", "v2")))
+        with cache._locks.hold("lock-a"):  # a pipeline copying out of the snapshot
+            saver.start()
+            saver.join(0.2)
+            self.assertTrue(saver.is_alive())
+            snapshot_file = self.root / "cache" / "node_modules" / "lock-a" / "node_modules" / "pkg" / "index.js"
+            self.assertEqual(snapshot_file.read_text(), "v1")
+        saver.join(5)
+
+        self.assertFalse(saver.is_alive())
+        self.assertEqual(snapshot_file.read_text(), "v2")
+
+    def test_eviction_skips_snapshots_being_restored(self) -> None:
+        cache = DependencyCache(self.root / "cache", max_snapshots=1)
+        cache._save("lock-a", self._project("first", "v1"))
+
+        with cache._locks.hold("lock-a"):
+            result = cache._save("lock-b", self._project("second", "v2"))
+        self.assertEqual(result["evicted"], 0)
+        self.assertTrue(cache.has_snapshot("lock-a"))
+
+        self.assertEqual(cache._save("lock-b", self._project("third", "v3"))["evicted"], 1)
+        self.assertFalse(cache.has_snapshot("lock-a"))
+
+    def test_artifact_eviction_keeps_entries_being_restored(self) -> None:
+        cache = BuildArtifactCache(self.root / "artifacts", max_bytes=3)
+        cache._store("tree-a", self._project("first", "v1") / "node_modules")
+
+        with cache._entry_locks.hold("tree-a"):
+            result = cache._store("tree-b", self._project("second", "v2") / "node_modules")
+
+        self.assertEqual(result["evicted"], 0)
+        restored = cache._restore("tree-a", self.root / "out")
+        self.assertIsNotNone(restored)
+        self.assertEqual((self.root / "out" / "pkg" / "index.js").read_text(), "v1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import sys
+from datetime import timedelta
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from domain import DeployJobState, DeployStatus
+from models import DeployTaskUpdate, utc_now
+from repositories import InMemoryDeployTaskRepository
+from services import DeployQueue, DeployService
+from support import make_settings
+
+
+class DeployQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:  # noqa: N802
+        self.repository = InMemoryDeployTaskRepository()
+        self.settings = make_settings(DEPLOY_QUEUE_WORKER_ID="worker-a", DEPLOY_QUEUE_POLL_SECONDS=0.05)
+        self.service = DeployService(self.repository, self.settings)
+        self.queue = DeployQueue(self.service, self.settings)
+
+    async def asyncTearDown(self) -> None:  # noqa: N802
+        await self.queue.stop()
+
+    async def test_restart_with_default_worker_id_reclaims_its_leases_immediately(self) -> None:
+        task = await self.service.create_task(branch="deploy")
+        await self.queue.enqueue(task)
+        # The previous process on this host claimed the job and was restarted mid-run.
+        await self.repository.claim_next_job(socket.gethostname(), lease_seconds=60)
+        default_id = self.settings.model_copy(update={"deploy_queue_worker_id": None})
+        restarted = DeployQueue(self.service, default_id)
+        self.assertEqual(restarted.worker_id, socket.gethostname())
+
+        restarted.start()
+        try:
+            for _ in range(100):
+                if self.repository._jobs[task.task_id].state == DeployJobState.DONE:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await restarted.stop()
+
+        self.assertEqual(self.repository._jobs[task.task_id].state, DeployJobState.DONE)
+        self.assertEqual(self.repository._jobs[task.task_id].attempts, 2)
+
+    async def test_worker_drains_burst_in_fifo_order(self) -> None:
+        tasks = [await self.service.create_task(branch="deploy") for _ in range(3)]
+        for task in tasks:
+            await self.queue.enqueue(task)
+        self.assertEqual((await self.queue.stats())["queued"], 3)
+
+        started_order: list[str] = []
+        original_run_pipeline = self.service.run_pipeline
+
+        async def recording_run_pipeline(task_id: str, branch: str, **kwargs) -> None:
+            started_order.append(task_id)
+            await original_run_pipeline(task_id, branch, **kwargs)
+
+        self.service.run_pipeline = recording_run_pipeline  # type: ignore[assignment]
+        self.queue.start()
+        for _ in range(200):
+            stats = await self.queue.stats()
+            if stats["processed"] == 3:
+                break
+            await asyncio.sleep(0.02)
+
+        self.assertEqual(started_order, [task.task_id for task in tasks])
+        self.assertEqual(stats["queued"], 0)
+        self.assertIsNotNone(stats["avg_wait_seconds"])
+        for task in tasks:
+            stored = await self.repository.get_task(task.task_id)
+            self.assertEqual(stored.status, DeployStatus.COMPLETED)
+            self.assertEqual(stored.metadata["queue"]["worker_id"], "worker-a")
+
+    async def test_expired_lease_is_reclaimed_and_stuck_task_rerun(self) -> None:
+        task = await self.service.create_task(branch="deploy")
+        await self.queue.enqueue(task)
+        # A previous process claimed the job, got to the build stage and died.
+        claimed = await self.repository.claim_next_job("worker-dead", lease_seconds=60)
+        await self.repository.update_task(task.task_id, DeployTaskUpdate(status=DeployStatus.RUNNING_BUILD))
+        self.assertIsNone(await self.queue.run_once())
+
+        self.repository._jobs[claimed.job_id].lease_expires_at = utc_now() - timedelta(seconds=1)
+        job = await self.queue.run_once()
+
+        self.assertIsNotNone(job)
+        self.assertEqual(job.attempts, 2)
+        stored = await self.repository.get_task(task.task_id)
+        self.assertEqual(stored.status, DeployStatus.COMPLETED)
+        self.assertEqual(stored.metadata["queue"]["recovered_from"], DeployStatus.RUNNING_BUILD.value)
+        self.assertEqual(self.repository._jobs[task.task_id].state, DeployJobState.DONE)
+
+    async def test_burst_of_deploy_requests_collapses_into_one_queued_task(self) -> None:
+        results = await asyncio.gather(*(self.queue.submit_deploy("deploy") for _ in range(4)))
+        other_branch, other_job = await self.queue.submit_deploy("main")
+
+        task_ids = {task.task_id for task, _job in results}
+        self.assertEqual(len(task_ids), 1)
+        self.assertIsNone(results[0][1])
+        self.assertEqual([job.coalesced for _task, job in results[1:]], [1, 2, 3])
+        self.assertIsNone(other_job)
+        self.assertNotIn(other_branch.task_id, task_ids)
+        self.assertEqual((await self.queue.stats())["queued"], 2)
+        stored = await self.repository.get_task(results[0][0].task_id)
+        self.assertEqual(stored.metadata["coalesced"]["requests"], 3)
+
+        # Once the absorbing job has been claimed, new requests get a fresh task.
+        await self.queue.run_once()
+        next_task, next_job = await self.queue.submit_deploy("deploy")
+        self.assertIsNone(next_job)
+        self.assertNotIn(next_task.task_id, task_ids)
+
+    async def test_request_is_not_coalesced_into_a_job_whose_task_is_gone(self) -> None:
+        orphan, _ = await self.queue.submit_deploy("deploy")
+        self.repository._drop_task(orphan.task_id)
+
+        task, absorbing_job = await self.queue.submit_deploy("deploy")
+        again, again_job = await self.queue.submit_deploy("deploy")
+
+        self.assertIsNone(absorbing_job)
+        self.assertNotEqual(task.task_id, orphan.task_id)
+        orphan_job = self.repository._jobs[orphan.task_id]
+        self.assertEqual(orphan_job.state, DeployJobState.FAILED)
+        self.assertEqual(orphan_job.coalesced, 0)
+        # Later requests fold into the live job instead of hitting the orphan again.
+        self.assertEqual(again.task_id, task.task_id)
+        self.assertEqual(again_job.coalesced, 1)
+        self.assertEqual((await self.queue.stats())["queued"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+import shutil
 import sys
 from pathlib import Path
+import tempfile
 import unittest
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -10,8 +12,15 @@ API_CODE_PATH = PROJECT_ROOT / "api-code"
 if str(API_CODE_PATH) not in sys.path:
     sys.path.insert(0, str(API_CODE_PATH))
 
-from domain import DeployStatus
-from models import DeployTask, DeployTaskCreate, DeployTaskUpdate, utc_now
+from domain import DeployStatus, is_valid_transition
+from models import (
+    TASK_SUMMARY_METADATA_KEYS,
+    DeployLogChunk,
+    DeployTask,
+    DeployTaskCreate,
+    DeployTaskUpdate,
+    utc_now,
+)
 from schemas import DeployRequest
 from services import DeployService
 from settings import Settings
@@ -20,6 +29,8 @@ from settings import Settings
 class InMemoryDeployTaskRepository:
     def __init__(self) -> None:
         self.tasks: dict[str, DeployTask] = {}
+        self.transition_writes = 0
+        self.log_chunks: list[DeployLogChunk] = []
 
     async def ensure_indexes(self) -> None:  # pragma: no cover - not used in tests
         return
@@ -72,6 +83,25 @@ class InMemoryDeployTaskRepository:
         self.tasks[task_id] = task
         return task
 
+    async def transition_status(
+        self,
+        task_id: str,
+        status: DeployStatus,
+        *,
+        append_metadata: dict | None = None,
+    ) -> DeployStatus | None:
+        self.transition_writes += 1
+        task = self.tasks.get(task_id)
+        if not task or not is_valid_transition(DeployStatus(task.status), status):
+            return None
+        previous = DeployStatus(task.status)
+        task.status = status
+        if status.is_terminal:
+            task.completed_at = utc_now()
+        if append_metadata:
+            _merge_metadata(task.metadata, append_metadata)
+        return previous
+
     async def get_recent_successes(self, branch: str, limit: int = 2) -> list[DeployTask]:
         successes = [
             task
@@ -85,6 +115,33 @@ class InMemoryDeployTaskRepository:
         ordered = sorted(self.tasks.values(), key=lambda t: t.started_at, reverse=True)
         return ordered[:limit]
 
+    async def get_recent_task_summaries(self, limit: int = 5) -> list[DeployTask]:
+        return [
+            task.model_copy(
+                update={
+                    "metadata": {
+                        key: value for key, value in task.metadata.items() if key in TASK_SUMMARY_METADATA_KEYS
+                    }
+                }
+            )
+            for task in await self.get_recent_tasks(limit=limit)
+        ]
+
+    async def insert_log_chunks(self, chunks: list[DeployLogChunk]) -> None:
+        self.log_chunks.extend(chunks)
+
+    async def get_log_chunks(
+        self, task_id: str, step_id: str, stream: str, *, from_line: int, to_line: int
+    ) -> list[DeployLogChunk]:
+        matching = [
+            chunk
+            for chunk in self.log_chunks
+            if (chunk.task_id, chunk.step_id, chunk.stream) == (task_id, step_id, stream)
+            and chunk.end_line > from_line
+            and chunk.first_line < to_line
+        ]
+        return sorted(matching, key=lambda chunk: chunk.end_line)
+
 
 class DeployServiceTest(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self) -> None:  # noqa: N802
@@ -141,6 +198,22 @@ class DeployServiceTest(unittest.IsolatedAsyncioTestCase):
         self.assertIn("summary", preflight["llm_preview"])
         self.assertTrue(preflight["risk_assessment"]["notes"])
 
+    async def test_stage_transitions_are_single_conditional_writes(self) -> None:
+        task = await self.service.create_task(branch="deploy")
+
+        await self.service.run_pipeline(task.task_id, "deploy")
+
+        # Four stage starts plus completion; each carries the previous stage's metadata.
+        self.assertEqual(self.repository.transition_writes, 5)
+        stored = await self.repository.get_task(task.task_id)
+        self.assertEqual(stored.status, DeployStatus.COMPLETED)
+        self.assertIn("dry_run", stored.metadata[DeployStatus.RUNNING_OBSERVABILITY.value])
+
+        # A stale transition does not match the filter and leaves the task untouched.
+        with self.assertRaisesRegex(RuntimeError, "invalid status transition"):
+            await self.service._ensure_valid_transition(task.task_id, DeployStatus.RUNNING_BUILD)
+        self.assertEqual((await self.repository.get_task(task.task_id)).status, DeployStatus.COMPLETED)
+
     async def test_get_task_returns_document(self) -> None:
         request = DeployRequest(branch="main")
         task = await self.service.create_task(branch=request.branch or "")
@@ -257,6 +330,13 @@ class DeployServiceTest(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(summary["timezone"], self.service.display_timezone_name)
         self.assertIsNotNone(summary["started_at"])
         self.assertEqual(summary["started_at"].tzinfo, self.service.display_timezone)
+        self.assertEqual(summary["summary"]["result"], "success")
+        # Stage payloads (commands, output tails) stay out of list rows.
+        stored = await self.repository.get_task(task.task_id)
+        self.assertIn(DeployStatus.RUNNING_BUILD.value, stored.metadata)
+        self.assertNotIn(DeployStatus.RUNNING_BUILD.value, summary)
+        (row,) = await self.repository.get_recent_task_summaries(limit=1)
+        self.assertLessEqual(set(row.metadata), set(TASK_SUMMARY_METADATA_KEYS))
 
     async def test_run_pipeline_serializes_concurrent_invocations(self) -> None:
         request = DeployRequest(branch="deploy")
@@ -300,6 +380,76 @@ class DeployServiceTest(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(stored_first.status, DeployStatus.COMPLETED)
         self.assertEqual(stored_second.status, DeployStatus.COMPLETED)
 
+    async def test_preflight_llm_preview_does_not_delay_cutover(self) -> None:
+        release_preview = asyncio.Event()
+
+        async def slow_llm_preview(diff_context=None):  # type: ignore[override]
+            await release_preview.wait()
+            return {"summary": "slow model", "source": "test"}
+
+        self.service._generate_llm_preview = slow_llm_preview  # type: ignore[assignment]
+        task = await self.service.create_task(branch="deploy")
+        pipeline = asyncio.create_task(self.service.run_pipeline(task.task_id, "deploy"))
+
+        stored = None
+        for _ in range(200):
+            stored = await self.repository.get_task(task.task_id)
+            if DeployStatus.RUNNING_OBSERVABILITY.value in stored.metadata:
+                break
+            await asyncio.sleep(0.01)
+        assert stored is not None
+        self.assertIn(DeployStatus.RUNNING_CUTOVER.value, stored.metadata)
+        self.assertNotIn("preflight", stored.metadata.get("summary", {}))
+        self.assertFalse(pipeline.done())
+
+        release_preview.set()
+        await pipeline
+        stored = await self.repository.get_task(task.task_id)
+        assert stored is not None
+        self.assertEqual(stored.status, DeployStatus.COMPLETED)
+        self.assertEqual(stored.metadata["summary"]["preflight"]["llm_preview"]["summary"], "slow model")
+
+    async def test_worktree_mode_runs_different_branches_in_parallel(self) -> None:
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        worktree_root = Path(workspace.name) / "worktrees"
+        settings = self.settings.model_copy(
+            update={
+                "deploy_isolation_mode": "worktree",
+                "deploy_worktree_root": str(worktree_root),
+                "deploy_max_parallel_pipelines": 2,
+            }
+        )
+        service = DeployService(self.repository, settings)
+        running = 0
+        peak = 0
+
+        async def fake_run_command(command, *, cwd=None, description):  # type: ignore[override]
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"description": description, "command": " ".join(command), "cwd": str(cwd), "dry_run": True}
+
+        service._run_command = fake_run_command  # type: ignore[assignment]
+        deploy_task = await service.create_task(branch="deploy")
+        main_task = await service.create_task(branch="main")
+        await asyncio.gather(
+            service.run_pipeline(deploy_task.task_id, "deploy"),
+            service.run_pipeline(main_task.task_id, "main"),
+        )
+
+        self.assertEqual(peak, 2)
+        for task, branch in ((deploy_task, "deploy"), (main_task, "main")):
+            stored = await self.repository.get_task(task.task_id)
+            assert stored is not None
+            self.assertEqual(stored.status, DeployStatus.COMPLETED)
+            clone_meta = stored.metadata[DeployStatus.RUNNING_CLONE.value]
+            self.assertEqual(clone_meta["checkout_path"], str(worktree_root / branch))
+            build_meta = stored.metadata[DeployStatus.RUNNING_BUILD.value]
+            self.assertTrue(build_meta["project_path"].startswith(str((worktree_root / branch).resolve())))
+        self.assertEqual(service.chatbot_repo_path, Path("."))
 
     async def test_cutover_metadata_cycles_between_targets(self) -> None:
         self.service.frontend_build_output_path = Path("./fake_build")
@@ -326,6 +476,194 @@ class DeployServiceTest(unittest.IsolatedAsyncioTestCase):
         )
         self.assertTrue(cutover_meta["dry_run"])
 
+    async def test_streamed_command_keeps_bounded_tail_and_flushes_live_output(self) -> None:
+        settings = self.settings.model_copy(
+            update={
+                "deploy_dry_run": False,
+                "deploy_log_tail_lines": 5,
+                "deploy_log_flush_seconds": 0.1,
+            }
+        )
+        service = DeployService(self.repository, settings)
+        task = await service.create_task(branch="deploy")
+        script = "import time\nfor i in range(1000): print(i)\ntime.sleep(0.3)\nprint('done')"
+
+        with service._stage_log_target(task.task_id, DeployStatus.RUNNING_BUILD):
+            step = await service._run_command(
+                [sys.executable, "-c", script],
+                description="Chatty command",
+            )
+
+        self.assertEqual(step["stdout"].splitlines(), ["996", "997", "998", "999", "done"])
+        self.assertEqual(step["stdout_lines"], 1001)
+        self.assertTrue(step["output_truncated"])
+        stored = await self.repository.get_task(task.task_id)
+        assert stored is not None
+        live_output = stored.metadata[DeployStatus.RUNNING_BUILD.value]["live_output"]
+        self.assertFalse(live_output["running"])
+        self.assertEqual(live_output["description"], "Chatty command")
+        self.assertTrue(live_output["stdout"].endswith("done"))
+
+        # The full output is paged from the chunked log store.
+        log_ref = step["log_ref"]
+        self.assertEqual(log_ref["stdout_lines"], 1001)
+        first_page = await service.read_task_log(task.task_id, log_ref["step_id"], offset=0, limit=400)
+        self.assertEqual(first_page["lines"][:2], ["0", "1"])
+        self.assertEqual(first_page["next_offset"], 400)
+        last_page = await service.read_task_log(task.task_id, log_ref["step_id"], offset=998, limit=400)
+        self.assertEqual(last_page["lines"], ["998", "999", "done"])
+        self.assertFalse(last_page["has_more"])
+
+    async def test_pipeline_events_fan_out_to_all_subscribers(self) -> None:
+        task = await self.service.create_task(branch="deploy")
+        first = self.service.subscribe_task_events(task.task_id)
+        second = self.service.subscribe_task_events(task.task_id)
+
+        await self.service.run_pipeline(task.task_id, "deploy")
+
+        for subscription in (first, second):
+            events = []
+            while True:
+                event = await subscription.get(timeout=0)
+                if event is None:
+                    break
+                events.append(event)
+            subscription.close()
+            started = [e["data"]["stage"] for e in events if e["type"] == "stage_started"]
+            self.assertEqual(
+                started,
+                [
+                    DeployStatus.RUNNING_CLONE.value,
+                    DeployStatus.RUNNING_BUILD.value,
+                    DeployStatus.RUNNING_CUTOVER.value,
+                    DeployStatus.RUNNING_OBSERVABILITY.value,
+                ],
+            )
+            self.assertEqual(events[-1]["type"], "status")
+            self.assertEqual(events[-1]["data"]["status"], DeployStatus.COMPLETED.value)
+        self.assertEqual(self.service.events.subscriber_count(task.task_id), 0)
+
+    async def test_build_stage_restores_cached_artifact_for_identical_tree(self) -> None:
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        root = Path(workspace.name)
+        project = root / "repo" / "frontend"
+        project.mkdir(parents=True)
+        (project / "package-lock.json").write_text("{}")
+        (project / "page.tsx").write_text("export default 1;")
+        build_script = (
+            "import pathlib; out = pathlib.Path('out'); out.mkdir(exist_ok=True); "
+            "(out / 'index.html').write_text('built'); "
+            "counter = pathlib.Path('builds.txt'); "
+            "counter.write_text(str(int(counter.read_text()) + 1) if counter.exists() else '1')"
+        )
+        settings = self.settings.model_copy(
+            update={
+                "deploy_dry_run": False,
+                "chatbot_repo_path": str(root / "repo"),
+                "frontend_project_subdir": "frontend",
+                "frontend_install_command": "",
+                "frontend_build_command": f'{sys.executable} -c "{build_script}"',
+                "frontend_export_command": "",
+                "deploy_cache_root": str(root / "cache"),
+            }
+        )
+        service = DeployService(self.repository, settings)
+
+        first = await service._run_build_stage()
+        (project / "builds.txt").unlink()
+        shutil.rmtree(project / "out")
+        second = await service._run_build_stage()
+
+        self.assertFalse(first["cache_hit"])
+        self.assertTrue(first["cache"]["stored"])
+        self.assertTrue(second["cache_hit"])
+        self.assertEqual(second["cache"]["key"], first["cache"]["key"])
+        self.assertFalse((project / "builds.txt").exists())
+        self.assertEqual((project / "out" / "index.html").read_text(), "built")
+
+    async def test_dependency_snapshot_skips_install_when_lockfile_unchanged(self) -> None:
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        root = Path(workspace.name)
+        project = root / "repo" / "frontend"
+        project.mkdir(parents=True)
+        (project / "package-lock.json").write_text('{"lockfileVersion": 3}')
+        install_script = (
+            "import pathlib; pkg = pathlib.Path('node_modules/left-pad'); pkg.mkdir(parents=True); "
+            "(pkg / 'index.js').write_text('module.exports = 1'); "
+            "counter = pathlib.Path('installs.txt'); "
+            "counter.write_text(str(int(counter.read_text()) + 1) if counter.exists() else '1')"
+        )
+        settings = self.settings.model_copy(
+            update={
+                "deploy_dry_run": False,
+                "chatbot_repo_path": str(root / "repo"),
+                "frontend_project_subdir": "frontend",
+                "frontend_ci_install_command": f'{sys.executable} -c "{install_script}"',
+                "frontend_build_command": f'{sys.executable} -c "print(1)"',
+                "frontend_export_command": "",
+                "frontend_build_output_subdir": ".",
+                "build_artifact_cache_enabled": False,
+                "deploy_cache_root": str(root / "cache"),
+            }
+        )
+        service = DeployService(self.repository, settings)
+
+        first = await service._run_build_stage()
+        shutil.rmtree(project / "node_modules")  # what git clean -fdx does between deploys
+        second = await service._run_build_stage()
+
+        self.assertEqual(first["dependency_cache"]["status"], "miss")
+        self.assertTrue(first["dependency_cache"]["saved"])
+        self.assertEqual(second["dependency_cache"]["status"], "hit")
+        self.assertEqual((project / "installs.txt").read_text(), "1")
+        self.assertTrue((project / "node_modules" / "left-pad" / "index.js").exists())
+
+    async def test_next_build_cache_survives_clean_and_reports_warm_vs_cold(self) -> None:
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        root = Path(workspace.name)
+        project = root / "repo" / "frontend"
+        project.mkdir(parents=True)
+        build_script = (
+            "import pathlib; cache = pathlib.Path('.next/cache/swc'); "
+            "pathlib.Path('seen.txt').write_text('warm' if cache.exists() else 'cold'); "
+            "cache.mkdir(parents=True, exist_ok=True); (cache / 'entry').write_text('compiled')"
+        )
+        settings = self.settings.model_copy(
+            update={
+                "deploy_dry_run": False,
+                "chatbot_repo_path": str(root / "repo"),
+                "frontend_project_subdir": "frontend",
+                "frontend_install_command": "",
+                "frontend_build_command": f'{sys.executable} -c "{build_script}"',
+                "frontend_export_command": "",
+                "frontend_build_output_subdir": ".",
+                "build_artifact_cache_enabled": False,
+                "deploy_cache_root": str(root / "cache"),
+            }
+        )
+        service = DeployService(self.repository, settings)
+
+        first = await service._run_build_stage("deploy")
+        shutil.rmtree(project / ".next")
+        second = await service._run_build_stage("deploy")
+        shutil.rmtree(project / ".next")
+        third = await service._run_build_stage("main")
+
+        self.assertEqual(first["build_cache"]["status"], "cold")
+        self.assertTrue(first["build_cache"]["saved"])
+        self.assertEqual(second["build_cache"]["status"], "warm")
+        self.assertEqual((project / "seen.txt").read_text(), "warm")
+        metrics = second["build_cache"]["metrics"]
+        self.assertEqual((metrics["warm_builds"], metrics["cold_builds"]), (1, 1))
+        self.assertIn("speedup_vs_cold", metrics)
+        # A branch without its own cache starts from the default branch's one.
+        self.assertEqual(third["build_cache"]["status"], "warm")
+        self.assertEqual(third["build_cache"]["source_key"], second["build_cache"]["key"])
+
+
 def _merge_metadata(base: dict, extra: dict) -> None:
     for key, value in extra.items():
         if isinstance(value, dict):
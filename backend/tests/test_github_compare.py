@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from services import DeployService
+from services.diff_summary import RangeChanges
+from services.github_compare import GitHubCompareClient, httpx
+from repositories import InMemoryDeployTaskRepository
+from support import make_settings
+
+BIG_RANGE_COMMITS = 120
+
+
+def _big_range_commit_files(index: int) -> list[dict]:
+    """Commit ``index`` of the ``big`` range: one new file each, plus a few transient changes."""
+    files = [{"filename": f"src/file{index:03d}.ts", "status": "added"}]
+    if index == 0:
+        files.append({"filename": "tmp/scratch.txt", "status": "added"})
+    if index == 5:
+        files.append({"filename": "new/name.ts", "previous_filename": "old/name.ts", "status": "renamed"})
+    if index == BIG_RANGE_COMMITS - 1:
+        files.append({"filename": "tmp/scratch.txt", "status": "removed"})
+    return files
+
+
+class _StubGitHub(BaseHTTPRequestHandler):
+    """Serves /repos/<repo>/compare/<base>...<head> with an ETag per comparison.
+
+    The ``big`` head is a range whose compare response hits the 300-file cap; its
+    commits are listed 100 per page and served one by one from /commits/<sha>.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    requests: list[dict] = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self) -> None:  # noqa: N802
+        url = urlsplit(self.path)
+        if "/commits/" in url.path:
+            self._serve_commit(url.path.rsplit("/", 1)[-1])
+            return
+        self.requests.append(
+            {
+                "path": self.path,
+                "peer": self.client_address,
+                "if_none_match": self.headers.get("If-None-Match"),
+                "authorization": self.headers.get("Authorization"),
+            }
+        )
+        if "missing" in self.path:
+            self._reply(404, b'{"message": "Not Found"}')
+            return
+        spec = url.path.rsplit("/", 1)[-1]
+        etag = f'"{spec}{url.query}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._reply(304, b"")
+            return
+        base, head = spec.split("...")
+        payload = {"status": "ahead", "ahead_by": 1, "base": base, "head": head, "files": []}
+        if head == "big":
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            per_page = int(parse_qs(url.query).get("per_page", ["250"])[0])
+            start = (page - 1) * per_page
+            payload.update(
+                total_commits=BIG_RANGE_COMMITS,
+                commits=[{"sha": f"c{index:03d}"} for index in range(start, min(start + per_page, BIG_RANGE_COMMITS))],
+                files=[{"filename": f"src/file{index:03d}.ts", "status": "added"} for index in range(300)]
+                if page == 1
+                else [],
+            )
+        body = json.dumps(payload).encode()
+        self._reply(200, body, {"ETag": etag})
+
+    def _serve_commit(self, sha: str) -> None:
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(0.01)
+            body = json.dumps({"sha": sha, "files": _big_range_commit_files(int(sha[1:]))}).encode()
+            self._reply(200, body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def _reply(self, status: int, body: bytes, headers: dict | None = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, *args) -> None:  # silence test output
+        pass
+
+
+class RangeChangesTest(unittest.TestCase):
+    def test_net_change_depends_on_first_and_last_change_in_any_arrival_order(self) -> None:
+        changes = RangeChanges()
+        changes.add(3, "D", "tmp/scratch.txt")
+        changes.add(1, "A", "tmp/scratch.txt")
+        changes.add(2, "M", "src/app.ts")
+        changes.add(4, "A", "src/gone.ts")
+        changes.add(0, "D", "src/gone.ts")
+        changes.add(1, "A", "src/new.ts")
+        changes.add(2, "M", "src/new.ts")
+
+        self.assertEqual(list(changes.net()), [("M", "src/app.ts"), ("M", "src/gone.ts"), ("A", "src/new.ts")])
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class GitHubCompareClientTest(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:  # noqa: N802
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubGitHub)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:  # noqa: N802
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    async def asyncSetUp(self) -> None:  # noqa: N802
+        _StubGitHub.requests = []
+        _StubGitHub.max_in_flight = 0
+        self.now = 0.0
+        self.client = GitHubCompareClient(
+            "org/app",
+            token="secret",
+            api_url=f"http://127.0.0.1:{self.server.server_port}",
+            cache_seconds=60,
+            max_entries=2,
+            clock=lambda: self.now,
+        )
+
+    async def asyncTearDown(self) -> None:  # noqa: N802
+        await self.client.aclose()
+
+    async def test_fresh_hits_skip_requests_and_stale_entries_revalidate_with_etag(self) -> None:
+        first = await self.client.compare("aaa", "bbb")
+        again = await self.client.compare("aaa", "bbb")
+        self.now = 61
+        revalidated = await self.client.compare("aaa", "bbb")
+
+        self.assertEqual(first["head"], "bbb")
+        self.assertIs(again, first)
+        self.assertEqual(revalidated, first)
+        self.assertEqual([request["if_none_match"] for request in _StubGitHub.requests], [None, '"aaa...bbb"'])
+        self.assertEqual(_StubGitHub.requests[0]["authorization"], "Bearer secret")
+        self.assertEqual(self.client.stats()["not_modified"], 1)
+        self.assertEqual(self.client.stats()["cache_hits"], 1)
+
+    async def test_requests_reuse_one_pooled_connection(self) -> None:
+        for head in ("h1", "h2", "h3"):
+            await self.client.compare("base", head)
+
+        self.assertEqual(len(_StubGitHub.requests), 3)
+        self.assertEqual(len({request["peer"] for request in _StubGitHub.requests}), 1)
+
+    async def test_lru_bound_evicts_least_recently_used_comparison(self) -> None:
+        await self.client.compare("base", "h1")
+        await self.client.compare("base", "h2")
+        await self.client.compare("base", "h1")  # h1 is now the most recently used
+        await self.client.compare("base", "h3")  # evicts h2
+
+        self.assertEqual(self.client.stats()["entries"], 2)
+        await self.client.compare("base", "h1")
+        await self.client.compare("base", "h2")
+        self.assertEqual(
+            [request["path"].rsplit("/", 1)[-1] for request in _StubGitHub.requests],
+            ["base...h1", "base...h2", "base...h3", "base...h2"],
+        )
+
+    async def test_http_errors_raise_runtime_error(self) -> None:
+        with self.assertRaisesRegex(RuntimeError, "HTTP 404"):
+            await self.client.compare("base", "missing")
+
+    async def test_range_files_are_fetched_with_bounded_fan_out(self) -> None:
+        client = GitHubCompareClient(
+            "org/app", api_url=f"http://127.0.0.1:{self.server.server_port}", concurrency=4
+        )
+        try:
+            started = time.monotonic()
+            listings = [
+                listing async for listing in client.iter_range_files("base", "big", total_commits=BIG_RANGE_COMMITS)
+            ]
+            elapsed = time.monotonic() - started
+        finally:
+            await client.aclose()
+
+        self.assertEqual(sorted(index for index, _ in listings), list(range(BIG_RANGE_COMMITS)))
+        self.assertLessEqual(_StubGitHub.max_in_flight, 4)
+        self.assertGreater(_StubGitHub.max_in_flight, 1)
+        # Serially the commit listings alone would take BIG_RANGE_COMMITS * 10ms.
+        self.assertLess(elapsed, BIG_RANGE_COMMITS * 0.01)
+        compare_pages = [request["path"] for request in _StubGitHub.requests if "/compare/" in request["path"]]
+        self.assertEqual(len(compare_pages), 2)
+
+    async def test_service_stats_cover_files_beyond_the_compare_cap(self) -> None:
+        settings = make_settings(
+            PREVIEW_USE_GITHUB_COMPARE=True,
+            GITHUB_COMPARE_REPO="org/app",
+            GITHUB_COMPARE_HEAD_REF="big",
+            GITHUB_API_URL=f"http://127.0.0.1:{self.server.server_port}",
+        )
+        service = DeployService(InMemoryDeployTaskRepository(), settings)
+        try:
+            result = await service._compute_compare_diff("base", "ignored")
+            capped = await service._compute_compare_diff("base", "ignored")
+            service.github_compare_max_commits = BIG_RANGE_COMMITS - 1
+            service.github_compare._entries.clear()
+            truncated = await service._compute_compare_diff("base", "ignored")
+        finally:
+            await service.github_compare.aclose()
+
+        stats = result["diff_stats"]
+        self.assertFalse(result["compare_metadata"]["files_truncated"])
+        # 120 new files plus the rename (old path deleted, new path added); tmp/scratch.txt nets out.
+        self.assertEqual(stats["file_count"], BIG_RANGE_COMMITS + 2)
+        self.assertEqual((stats["added"], stats["deleted"]), (BIG_RANGE_COMMITS + 1, 1))
+        self.assertNotIn("tmp/scratch.txt", stats["paths"])
+        self.assertIn("D\told/name.ts", result["diff_output"])
+        self.assertEqual(capped["diff_stats"], stats)
+
+        self.assertTrue(truncated["compare_metadata"]["files_truncated"])
+        self.assertEqual(truncated["diff_stats"]["file_count"], 300)
+        self.assertIn("lower bound", truncated["diff_stats"]["warnings"][-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
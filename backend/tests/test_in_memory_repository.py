@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import tempfile
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from domain import DeployStatus
+from models import (
+    TASK_SUMMARY_METADATA_KEYS,
+    DeployLogChunk,
+    DeployReport,
+    DeployTaskCreate,
+    DeployTaskUpdate,
+)
+from repositories import DeployTaskRepository, InMemoryDeployTaskRepository
+
+
+BASE_TIME = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+async def _create(repository: InMemoryDeployTaskRepository, index: int, *, branch: str = "deploy") -> str:
+    task = await repository.create_task(
+        DeployTaskCreate(
+            task_id=f"task-{index}",
+            metadata={"branch": branch},
+            started_at=BASE_TIME + timedelta(minutes=index),
+        )
+    )
+    return task.task_id
+
+
+STAGE_METADATA = {
+    "branch": "deploy",
+    "summary": {"result": "success", "commit": "a" * 40},
+    DeployStatus.RUNNING_BUILD.value: {
+        "steps": [{"command": "npm run build", "stdout": "x" * 4096, "stderr": ""}],
+        "live_output": {"stdout": "compiled", "running": False},
+    },
+}
+
+
+class _ProjectingCursor:
+    def __init__(self, documents: list[dict]) -> None:
+        self.documents = documents
+
+    def sort(self, *_args) -> "_ProjectingCursor":
+        return self
+
+    def limit(self, _limit: int) -> "_ProjectingCursor":
+        return self
+
+    async def to_list(self, length: int) -> list[dict]:
+        return self.documents[:length]
+
+
+class _ProjectingCollection:
+    """Applies a find() inclusion projection the way MongoDB does, dotted paths included."""
+
+    def __init__(self, documents: list[dict]) -> None:
+        self.documents = documents
+
+    def find(self, _filter: dict, projection: dict) -> _ProjectingCursor:
+        projected = []
+        for document in self.documents:
+            row: dict = {"_id": document["_id"]}
+            for path in projection:
+                source, target = document, row
+                *parents, leaf = path.split(".")
+                for part in parents:
+                    source = source.get(part, {})
+                    target = target.setdefault(part, {})
+                if leaf in source:
+                    target[leaf] = source[leaf]
+            projected.append(row)
+        return _ProjectingCursor(projected)
+
+
+class TaskSummaryProjectionTest(unittest.IsolatedAsyncioTestCase):
+    def _assert_summary_only(self, metadata: dict) -> None:
+        self.assertNotIn(DeployStatus.RUNNING_BUILD.value, metadata)
+        self.assertLessEqual(set(metadata), set(TASK_SUMMARY_METADATA_KEYS))
+        self.assertEqual(metadata["summary"]["result"], "success")
+
+    async def test_in_memory_summaries_omit_stage_output(self) -> None:
+        repository = InMemoryDeployTaskRepository()
+        await repository.create_task(
+            DeployTaskCreate(task_id="task-0", metadata=STAGE_METADATA, started_at=BASE_TIME)
+        )
+
+        (row,) = await repository.get_recent_task_summaries(limit=1)
+
+        self._assert_summary_only(row.metadata)
+        stored = await repository.get_task("task-0")
+        self.assertIn(DeployStatus.RUNNING_BUILD.value, stored.metadata)
+
+    async def test_mongo_summaries_project_away_stage_output(self) -> None:
+        created = DeployTaskCreate(task_id="task-0", metadata=STAGE_METADATA, started_at=BASE_TIME)
+        document = created.to_document()
+        collections = (
+            "deploy_tasks",
+            "deploy_reports",
+            "deploy_jobs",
+            "deploy_log_chunks",
+            "deploy_previews",
+            "llm_preview_memos",
+        )
+        repository = DeployTaskRepository({name: _ProjectingCollection([document]) for name in collections})
+
+        (row,) = await repository.get_recent_task_summaries(limit=1)
+
+        self._assert_summary_only(row.metadata)
+        self.assertEqual(row.status, document["status"])
+
+
+class InMemoryRepositoryIndexTest(unittest.IsolatedAsyncioTestCase):
+    async def test_indexes_follow_status_and_branch_changes(self) -> None:
+        repository = InMemoryDeployTaskRepository()
+        for index in (2, 0, 1):
+            await _create(repository, index)
+
+        await repository.mark_status("task-0", DeployStatus.COMPLETED)
+        await repository.mark_status("task-2", DeployStatus.COMPLETED)
+        await repository.update_task(
+            "task-1",
+            DeployTaskUpdate(
+                status=DeployStatus.COMPLETED,
+                completed_at=datetime.now(timezone.utc) + timedelta(hours=1),
+            ),
+        )
+        await repository.update_task("task-2", DeployTaskUpdate(metadata={"branch": "main"}))
+
+        recent = await repository.get_recent_tasks(limit=2)
+        self.assertEqual([task.task_id for task in recent], ["task-2", "task-1"])
+        self.assertEqual((await repository.get_latest_task()).task_id, "task-2")
+        successes = await repository.get_recent_successes("deploy", limit=5)
+        self.assertEqual([task.task_id for task in successes], ["task-1", "task-0"])
+        main = await repository.get_recent_successes("main")
+        self.assertEqual([task.task_id for task in main], ["task-2"])
+
+    async def test_retention_evicts_oldest_finished_tasks_only(self) -> None:
+        with tempfile.TemporaryDirectory() as log_root:
+            repository = InMemoryDeployTaskRepository(log_root=Path(log_root), max_tasks=3)
+            await _create(repository, 0)
+            await repository.mark_status("task-0", DeployStatus.RUNNING_CLONE)
+            for index in (1, 2):
+                await _create(repository, index)
+                await repository.mark_status(f"task-{index}", DeployStatus.COMPLETED)
+            await repository.insert_report(DeployReport(_id="report-1", task_id="task-1"))
+            await repository.insert_log_chunks([DeployLogChunk.build("task-1", "step", "stdout", 0, 0, ["line"])])
+
+            await _create(repository, 3)
+
+            self.assertIsNotNone(await repository.get_task("task-0"))
+            self.assertIsNone(await repository.get_task("task-1"))
+            self.assertIsNone(await repository.get_report("report-1"))
+            self.assertFalse((Path(log_root) / "task-1").exists())
+            successes = await repository.get_recent_successes("deploy", limit=5)
+            self.assertEqual([task.task_id for task in successes], ["task-2"])
+            recent = await repository.get_recent_tasks(limit=10)
+            self.assertEqual([task.task_id for task in recent], ["task-3", "task-2", "task-0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from repositories.indexes import INDEX_CATALOG, QUERY_CATALOG, verify_query_plans
+
+
+def _equality_fields(query_filter: dict) -> set[str]:
+    return {key for key, value in query_filter.items() if not key.startswith("$") and not isinstance(value, dict)}
+
+
+class _ExplainDatabase:
+    """Answers explain commands with canned winning plans per collection."""
+
+    def __init__(self, plans: dict[str, dict]) -> None:
+        self.plans = plans
+        self.commands: list[dict] = []
+
+    async def command(self, command: dict) -> dict:
+        self.commands.append(command)
+        return {"queryPlanner": {"winningPlan": self.plans[command["explain"]["find"]]}}
+
+
+class IndexCatalogTest(unittest.IsolatedAsyncioTestCase):
+    def test_every_sorted_query_has_a_matching_compound_index(self) -> None:
+        for shape in QUERY_CATALOG:
+            if not shape.sort:
+                continue
+            sort_field = shape.sort[0][0]
+            sort_fields = {field for field, _ in shape.sort}
+            clauses = shape.filter.get("$or") or [shape.filter]
+            for clause in clauses:
+                # Keyset clauses pin the sort key itself; that equality rides on the sort prefix.
+                equality = (_equality_fields(clause) | _equality_fields(shape.filter)) - sort_fields
+                matches = [
+                    spec
+                    for spec in INDEX_CATALOG
+                    if spec.collection == shape.collection
+                    and {field for field, _ in spec.keys[: len(equality)]} == equality
+                    and len(spec.keys) > len(equality)
+                    and spec.keys[len(equality)][0] == sort_field
+                ]
+                self.assertTrue(matches, f"{shape.name} has no index for {sorted(equality)} + {sort_field}")
+
+    async def test_verify_reports_collection_scans_and_blocking_sorts(self) -> None:
+        database = _ExplainDatabase(
+            {
+                "deploy_tasks": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}},
+                "deploy_jobs": {"queryPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}},
+                "deploy_log_chunks": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+                "llm_preview_memos": {"stage": "LIMIT", "inputStage": {"stage": "IXSCAN"}},
+            }
+        )
+
+        report = {entry["query"]: entry for entry in await verify_query_plans(database)}
+
+        self.assertEqual(report["get_recent_successes"]["problems"], [])
+        self.assertEqual(report["claim_next_job"]["problems"], ["COLLSCAN", "SORT"])
+        self.assertEqual(len(database.commands), len(QUERY_CATALOG))
+        explained = next(c for c in database.commands if c["explain"]["find"] == "deploy_tasks")
+        self.assertEqual(explained["verbosity"], "queryPlanner")
+
+
+if __name__ == "__main__":
+    unittest.main()
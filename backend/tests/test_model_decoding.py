@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from domain import DeployStatus
+from models import DeployReport, DeployTask
+
+
+class TrustedDecodingTest(unittest.TestCase):
+    def test_trusted_task_matches_validated_task(self) -> None:
+        document = DeployTask(
+            _id="task-1",
+            status=DeployStatus.FAILED,
+            error_log="npm ERR!",
+            metadata={"branch": "deploy", "build": {"steps": [{"returncode": 1}]}},
+        ).to_mongo()
+
+        trusted = DeployTask.from_trusted(document)
+
+        self.assertEqual(trusted, DeployTask.from_mongo(document))
+        self.assertEqual(trusted.status, "failed")
+        self.assertEqual(trusted.to_mongo(), document)
+
+    def test_projected_documents_fill_missing_fields(self) -> None:
+        document = {"_id": "task-2", "status": "completed", "started_at": datetime(2024, 5, 1)}
+
+        trusted = DeployTask.from_trusted(document)
+
+        self.assertEqual(trusted, DeployTask.from_mongo(document))
+        self.assertEqual(trusted.metadata, {})
+        report = {"_id": "report-1", "task_id": "task-2", "created_at": datetime(2024, 5, 1)}
+        self.assertEqual(DeployReport.from_trusted(report), DeployReport.from_mongo(report))
+
+    def test_projection_without_timestamps_is_rejected_not_stamped_now(self) -> None:
+        with self.assertRaises(KeyError):
+            DeployTask.from_trusted({"_id": "task-3", "status": "completed"})
+        with self.assertRaises(KeyError):
+            DeployReport.from_trusted({"_id": "report-2", "task_id": "task-3"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from domain import DeployStatus
+from models import DeployJob, DeployLogChunk, DeployTaskCreate
+from repositories import InMemoryDeployTaskRepository
+from services import DeployService, MongoReconnectSupervisor
+from services.log_store import StepLogWriter
+from support import make_settings
+
+
+class _RecoveredRepository(InMemoryDeployTaskRepository):
+    """Stands in for Mongo: optionally writes to the fallback during its first replay."""
+
+    def __init__(self, fallback: InMemoryDeployTaskRepository, *, write_during_replay: bool = False) -> None:
+        super().__init__()
+        self.fallback = fallback
+        self.write_during_replay = write_during_replay
+        self.replays = 0
+
+    async def restore_snapshot(self, snapshot):
+        self.replays += 1
+        if self.write_during_replay and self.replays == 1:
+            await self.fallback.create_task(DeployTaskCreate(task_id="during-replay"))
+        return await super().restore_snapshot(snapshot)
+
+
+class MongoReconnectSupervisorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:  # noqa: N802
+        self.fallback = InMemoryDeployTaskRepository()
+        settings = make_settings()
+        self.service = DeployService(self.fallback, settings)
+        await self.fallback.create_task(DeployTaskCreate(task_id="outage-task", metadata={"branch": "deploy"}))
+        await self.fallback.mark_status("outage-task", DeployStatus.COMPLETED)
+        await self.fallback.enqueue_job(DeployJob(_id="outage-task", branch="deploy"))
+        await self.fallback.insert_log_chunks(
+            [DeployLogChunk.build("outage-task", "step", "stdout", 0, 0, ["npm run build", "done"])]
+        )
+
+    async def test_replays_outage_data_and_swaps_repository(self) -> None:
+        recovered = _RecoveredRepository(self.fallback)
+        probes = iter([ConnectionError("no server"), recovered])
+
+        def connect():
+            outcome = next(probes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        supervisor = MongoReconnectSupervisor(self.service, self.fallback, connect, interval_seconds=1)
+
+        self.assertFalse(await supervisor.try_restore())
+        self.assertIs(self.service.repository, self.fallback)
+        self.assertTrue(await supervisor.try_restore())
+
+        self.assertIs(self.service.repository, recovered)
+        self.assertEqual(supervisor.restored, {"tasks": 1, "reports": 0, "jobs": 1, "log_chunks": 1})
+        successes = await recovered.get_recent_successes("deploy")
+        self.assertEqual([task.task_id for task in successes], ["outage-task"])
+        chunks = await recovered.get_log_chunks("outage-task", "step", "stdout", from_line=0, to_line=10)
+        self.assertEqual(chunks[0].lines(), ["npm run build", "done"])
+
+    async def test_writes_during_replay_trigger_another_pass(self) -> None:
+        recovered = _RecoveredRepository(self.fallback, write_during_replay=True)
+        supervisor = MongoReconnectSupervisor(self.service, self.fallback, lambda: recovered, interval_seconds=1)
+
+        self.assertTrue(await supervisor.try_restore())
+
+        self.assertEqual(recovered.replays, 2)
+        self.assertIsNotNone(await recovered.get_task("during-replay"))
+
+    async def test_step_log_written_across_a_swap_lands_in_the_restored_repository(self) -> None:
+        recovered = _RecoveredRepository(self.fallback)
+        supervisor = MongoReconnectSupervisor(self.service, self.fallback, lambda: recovered, interval_seconds=1)
+        writer = StepLogWriter(lambda: self.service.repository, "outage-task")
+        writer.append("stdout", "before swap")
+        await writer.flush()
+
+        self.assertTrue(await supervisor.try_restore())
+        writer.append("stdout", "after swap")
+        await writer.flush()
+
+        chunks = await recovered.get_log_chunks("outage-task", writer.step_id, "stdout", from_line=0, to_line=10)
+        self.assertEqual([line for chunk in chunks for line in chunk.lines()], ["before swap", "after swap"])
+
+
+if __name__ == "__main__":
+    unittest.main()
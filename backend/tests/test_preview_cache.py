@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from domain import DeployStatus
+from models import DeployTaskCreate, LLMPreviewMemo
+from repositories import InMemoryDeployTaskRepository
+from services import DeployService
+from support import make_settings
+
+BASE_COMMIT = "a" * 40
+HEAD_COMMIT = "b" * 40
+NEXT_HEAD_COMMIT = "c" * 40
+
+
+class PreviewCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:  # noqa: N802
+        self.memo_root = Path(tempfile.mkdtemp(prefix="llm-memo-test-"))
+        self.repository = InMemoryDeployTaskRepository(memo_root=self.memo_root)
+        self.settings = make_settings(GEMINI_API_KEY="test-key")
+        self.head = HEAD_COMMIT
+        self.calls = {"rev-parse": 0, "diff": 0, "llm": 0}
+        self.service = self._build_service()
+        await self.repository.create_task(
+            DeployTaskCreate(
+                task_id="last-deploy",
+                metadata={"branch": self.service.default_branch, "summary": {"commit": BASE_COMMIT}},
+            )
+        )
+        await self.repository.mark_status("last-deploy", DeployStatus.COMPLETED)
+
+    async def asyncTearDown(self) -> None:  # noqa: N802
+        shutil.rmtree(self.memo_root, ignore_errors=True)
+
+    def _build_service(self) -> DeployService:
+        service = DeployService(self.repository, self.settings)
+
+        async def fake_current_commit() -> str:
+            self.calls["rev-parse"] += 1
+            return self.head
+
+        async def fake_run_command(command, *, cwd=None, description):  # type: ignore[override]
+            if command[:2] == ["git", "diff"]:
+                self.calls["diff"] += 1
+                await asyncio.sleep(0.05)
+                return {"stdout": "M\tsrc/app/page.tsx\nA\tsrc/app/new.tsx", "returncode": 0}
+            return {"stdout": "", "returncode": 0}
+
+        def fake_call_gemini(prompt: str) -> str:
+            self.calls["llm"] += 1
+            time.sleep(0.05)
+            return '{"summary": "Adds a page.", "highlights": ["new page"], "risks": []}'
+
+        service._get_current_commit = fake_current_commit  # type: ignore[assignment]
+        service._run_command = fake_run_command  # type: ignore[assignment]
+        service._call_gemini = fake_call_gemini  # type: ignore[assignment]
+        return service
+
+    async def test_preview_deploy_and_preflight_share_one_diff_and_llm_call(self) -> None:
+        preview = await self.service.get_preview()
+        await self.service.estimate_runtime_minutes()
+        snapshot = await self.service._prime_preflight_metadata("last-deploy", head_commit=HEAD_COMMIT)
+
+        self.assertEqual(self.calls, {"rev-parse": 1, "diff": 1, "llm": 1})
+        self.assertEqual(preview["diff_stats"]["file_count"], 2)
+        self.assertEqual(preview["llm_preview"]["summary"], "Adds a page.")
+        self.assertEqual(preview["llm_preview"]["cache"], "miss")
+        self.assertEqual(snapshot["llm_preview"]["cache"], "hit")
+        self.assertEqual(snapshot["llm_preview"]["highlights"], preview["llm_preview"]["highlights"])
+
+    async def test_concurrent_cache_misses_run_diff_and_llm_once(self) -> None:
+        previews = await asyncio.gather(
+            self.service.get_preview(),
+            self.service.get_preview(),
+            self.service.estimate_runtime_minutes(),
+            self.service._prime_preflight_metadata("last-deploy", head_commit=HEAD_COMMIT),
+        )
+
+        self.assertEqual(self.calls["diff"], 1)
+        self.assertEqual(self.calls["llm"], 1)
+        self.assertEqual(previews[0]["llm_preview"], previews[1]["llm_preview"])
+        self.assertIsNot(previews[0]["llm_preview"], previews[1]["llm_preview"])
+        stats = self.service.single_flight.stats()
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["by_name"]["preview_context"]["deduplicated"], 2)
+        self.assertEqual(stats["by_name"]["llm_preview"]["deduplicated"], 2)
+
+    async def test_cached_preview_survives_restart(self) -> None:
+        await self.service.get_preview()
+
+        restarted = self._build_service()
+        preview = await restarted.get_preview()
+
+        self.assertEqual(self.calls, {"rev-parse": 2, "diff": 1, "llm": 1})
+        self.assertEqual(preview["llm_preview"]["summary"], "Adds a page.")
+        self.assertEqual(preview["llm_preview"]["cache"], "hit")
+
+    async def test_llm_memo_survives_in_memory_repository_restart(self) -> None:
+        await self.service.get_preview()
+
+        # Without MongoDB the memo lives on disk; a new fallback repository still finds it.
+        self.repository = InMemoryDeployTaskRepository(memo_root=self.memo_root)
+        await self.repository.create_task(
+            DeployTaskCreate(
+                task_id="last-deploy",
+                metadata={"branch": self.service.default_branch, "summary": {"commit": BASE_COMMIT}},
+            )
+        )
+        await self.repository.mark_status("last-deploy", DeployStatus.COMPLETED)
+        preview = await self._build_service().get_preview()
+
+        self.assertEqual(self.calls["diff"], 2)
+        self.assertEqual(self.calls["llm"], 1)
+        self.assertEqual(preview["llm_preview"]["cache"], "hit")
+
+    async def test_llm_memo_keys_ignore_layout_and_evict_oldest(self) -> None:
+        self.assertEqual(
+            LLMPreviewMemo.key_for("gemini", "  Summarize\n\n    the diff  "),
+            LLMPreviewMemo.key_for("gemini", "Summarize\nthe diff"),
+        )
+        self.assertNotEqual(
+            LLMPreviewMemo.key_for("gemini", "Summarize"), LLMPreviewMemo.key_for("other-model", "Summarize")
+        )
+
+        for index in range(3):
+            memo = LLMPreviewMemo.build("gemini", f"prompt {index}", {"summary": str(index)}, ttl_seconds=60)
+            await self.repository.save_llm_memo(memo, max_entries=2)
+            time.sleep(0.01)  # distinct mtimes
+        self.assertIsNone(await self.repository.get_llm_memo(LLMPreviewMemo.key_for("gemini", "prompt 0")))
+        stored = await self.repository.get_llm_memo(LLMPreviewMemo.key_for("gemini", "prompt 2"))
+        self.assertEqual(stored.response, {"summary": "2"})
+
+        expired = LLMPreviewMemo.build("gemini", "old", {"summary": "old"}, ttl_seconds=60)
+        expired.expires_at -= timedelta(seconds=120)
+        await self.repository.save_llm_memo(expired, max_entries=0)
+        self.assertIsNone(await self.repository.get_llm_memo(expired.memo_key))
+
+    async def test_compare_head_ref_bypasses_the_persistent_cache(self) -> None:
+        self.settings = make_settings(
+            GEMINI_API_KEY="test-key",
+            PREVIEW_USE_GITHUB_COMPARE=True,
+            GITHUB_COMPARE_REPO="org/app",
+            GITHUB_COMPARE_HEAD_REF="main",
+        )
+        service = self._build_service()
+        if service.github_compare is None:
+            self.skipTest("httpx is not installed")
+        remote_files = ["src/a.ts"]
+
+        async def fake_compare(base_commit: str, head_commit: str):
+            diff_output = "\n".join(f"M\t{path}" for path in remote_files)
+            return {
+                "diff_output": diff_output,
+                "diff_stats": service._summarize_diff(diff_output),
+                "compare_metadata": {"head": "main"},
+            }
+
+        service._compute_compare_diff = fake_compare  # type: ignore[assignment]
+        first = await service._resolve_preview_context()
+        remote_files.append("src/b.ts")  # main moved; local HEAD did not
+        second = await service._resolve_preview_context()
+
+        self.assertEqual(first["diff_stats"]["file_count"], 1)
+        self.assertEqual(second["diff_stats"]["file_count"], 2)
+        self.assertIsNone(await self.repository.get_preview(service.preview_cache.key(BASE_COMMIT, HEAD_COMMIT)))
+
+    async def test_moving_head_or_base_changes_the_key(self) -> None:
+        await self.service.get_preview()
+        self.head = NEXT_HEAD_COMMIT
+        await self.service.get_preview()
+        self.assertEqual(self.calls["diff"], 1)  # HEAD is memoized until a fetch moves it
+
+        await self.service._run_clone_stage(self.service.default_branch)
+        await self.service.get_preview()
+        self.assertEqual(self.calls, {"rev-parse": 2, "diff": 2, "llm": 2})
+
+        await self.repository.create_task(
+            DeployTaskCreate(
+                task_id="newer-deploy",
+                metadata={"branch": self.service.default_branch, "summary": {"commit": NEXT_HEAD_COMMIT}},
+            )
+        )
+        await self.repository.mark_status("newer-deploy", DeployStatus.COMPLETED)
+        self.service.preview_cache.forget_base()
+        context = await self.service._resolve_preview_context()
+        self.assertEqual(context["reason"], "Working tree matches last successful deployment.")
+
+
+if __name__ == "__main__":
+    unittest.main()
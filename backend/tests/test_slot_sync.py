@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from services.slot_sync import BlueGreenSyncEngine, manifest_path_for
+
+
+def _write(root: Path, rel_path: str, content: str) -> None:
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+class BlueGreenSyncEngineTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:  # noqa: N802
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.build = self.root / "out"
+        self.green = self.root / "www" / "green"
+        self.blue = self.root / "www" / "blue"
+        self.engine = BlueGreenSyncEngine(workers=2)
+
+    async def asyncTearDown(self) -> None:  # noqa: N802
+        self._tmp.cleanup()
+
+    async def test_first_sync_copies_everything_and_writes_manifest(self) -> None:
+        _write(self.build, "index.html", "<html>v1</html>")
+        _write(self.build, "_next/static/chunk-a.js", "a" * 100)
+
+        stats = await self.engine.sync(self.build, self.green)
+
+        self.assertEqual(stats["files_copied"], 2)
+        self.assertEqual(stats["files_reused"], 0)
+        self.assertEqual((self.green / "_next/static/chunk-a.js").read_text(), "a" * 100)
+        self.assertTrue(manifest_path_for(self.green).exists())
+        self.assertFalse((self.green / manifest_path_for(self.green).name).exists())
+
+    async def test_resync_reuses_unchanged_files_and_deletes_stale_ones(self) -> None:
+        _write(self.build, "index.html", "<html>v1</html>")
+        _write(self.build, "_next/static/chunk-a.js", "a" * 100)
+        _write(self.build, "old/removed.js", "bye")
+        await self.engine.sync(self.build, self.green)
+
+        # Simulate a rebuild: identical bytes with fresh mtimes, one changed file, one removed.
+        (self.build / "old/removed.js").unlink()
+        (self.build / "old").rmdir()
+        _write(self.build, "index.html", "<html>v2</html>")
+        chunk = self.build / "_next/static/chunk-a.js"
+        os.utime(chunk, ns=(chunk.stat().st_atime_ns, chunk.stat().st_mtime_ns + 10_000_000))
+
+        stats = await self.engine.sync(self.build, self.green)
+
+        self.assertEqual(stats["files_reused"], 1)
+        self.assertEqual(stats["bytes_reused"], 100)
+        self.assertEqual(stats["files_copied"], 1)
+        self.assertEqual(stats["files_deleted"], 1)
+        self.assertEqual((self.green / "index.html").read_text(), "<html>v2</html>")
+        self.assertFalse((self.green / "old").exists())
+
+    async def test_files_matching_live_slot_are_hardlinked_without_touching_live(self) -> None:
+        _write(self.build, "shared.js", "same")
+        _write(self.build, "index.html", "<html>live</html>")
+        await self.engine.sync(self.build, self.green)
+
+        _write(self.build, "index.html", "<html>next</html>")
+        stats = await self.engine.sync(self.build, self.blue, link_from=self.green)
+
+        self.assertEqual(stats["files_linked"], 1)
+        self.assertEqual(stats["files_copied"], 1)
+        self.assertTrue(os.path.samefile(self.blue / "shared.js", self.green / "shared.js"))
+        self.assertEqual((self.green / "index.html").read_text(), "<html>live</html>")
+        self.assertEqual((self.blue / "index.html").read_text(), "<html>next</html>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from domain import DeployStatus
+from models import DeployTaskCreate, DeployTaskUpdate
+from repositories import CachingDeployTaskRepository, InMemoryDeployTaskRepository
+
+
+class _CountingRepository(InMemoryDeployTaskRepository):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reads = 0
+
+    async def get_task(self, task_id: str):
+        self.reads += 1
+        task = await super().get_task(task_id)
+        # Hand out copies like the Mongo repository does.
+        return task.model_copy(deep=True) if task else None
+
+
+class TaskCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:  # noqa: N802
+        self.now = 0.0
+        self.inner = _CountingRepository()
+        self.repository = CachingDeployTaskRepository(
+            self.inner, max_entries=2, ttl_seconds=5.0, clock=lambda: self.now
+        )
+        await self.repository.create_task(DeployTaskCreate(task_id="task-1", metadata={"branch": "deploy"}))
+
+    async def test_polls_are_served_from_cache_until_a_write(self) -> None:
+        await self.repository.get_task("task-1")
+        await self.repository.get_task("task-1")
+        self.assertEqual(self.inner.reads, 0)
+
+        await self.repository.update_task("task-1", DeployTaskUpdate(append_metadata={"step": "clone"}))
+        task = await self.repository.get_task("task-1")
+        self.assertEqual(task.metadata["step"], "clone")
+
+        await self.repository.transition_status("task-1", DeployStatus.RUNNING_CLONE)
+        task = await self.repository.get_task("task-1")
+        self.assertEqual(task.status, DeployStatus.RUNNING_CLONE)
+        self.assertEqual(self.inner.reads, 1)
+        self.assertEqual(self.repository.cache_stats()["hit_ratio"], 0.75)
+
+    async def test_read_overlapping_a_write_is_not_cached(self) -> None:
+        self.repository.invalidate()
+        original_get_task = self.inner.get_task
+
+        async def read_then_write(task_id: str):
+            task = await original_get_task(task_id)
+            await self.repository.update_task("task-1", DeployTaskUpdate(append_metadata={"step": "build"}))
+            self.inner.get_task = original_get_task  # type: ignore[method-assign]
+            return task
+
+        self.inner.get_task = read_then_write  # type: ignore[method-assign]
+        stale = await self.repository.get_task("task-1")
+        fresh = await self.repository.get_task("task-1")
+
+        self.assertNotIn("step", stale.metadata)
+        self.assertEqual(fresh.metadata["step"], "build")
+
+    async def test_revision_tells_pollers_whether_the_task_changed(self) -> None:
+        await self.repository.get_task("task-1")
+        self.assertEqual(await self.repository.get_task_revision("task-1"), 0)
+        self.assertEqual(self.inner.reads, 0)
+
+        await self.repository.update_task("task-1", DeployTaskUpdate(append_metadata={"step": "clone"}))
+        await self.repository.transition_status("task-1", DeployStatus.RUNNING_CLONE)
+        self.assertEqual(await self.repository.get_task_revision("task-1"), 2)
+        self.assertEqual((await self.repository.get_task("task-1")).revision, 2)
+
+        # The revision is stored with the task, so another worker's cache agrees on it.
+        other_worker = CachingDeployTaskRepository(self.inner, clock=lambda: self.now)
+        self.assertEqual(await other_worker.get_task_revision("task-1"), 2)
+        await other_worker.mark_status("task-1", DeployStatus.RUNNING_BUILD)
+        self.now += 6.0
+        self.assertEqual(await self.repository.get_task_revision("task-1"), 3)
+        self.assertIsNone(await self.repository.get_task_revision("missing"))
+
+    async def test_least_recently_used_task_is_evicted(self) -> None:
+        for task_id in ("task-2", "task-3"):
+            await self.repository.create_task(DeployTaskCreate(task_id=task_id))
+
+        await self.repository.get_task("task-1")
+        self.assertEqual(self.inner.reads, 1)
+        self.assertEqual(self.repository.cache_stats()["entries"], 2)
+        self.assertIsNone(await self.repository.get_task("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
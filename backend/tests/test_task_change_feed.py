@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from domain import DeployStatus
+from models import DeployTaskCreate, DeployTaskUpdate
+from repositories import InMemoryDeployTaskRepository
+from services import DeployQueue, DeployService, TaskChangeRelay
+from services.task_change_feed import events_for_change
+from support import make_settings
+
+
+class TaskChangeFeedTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:  # noqa: N802
+        self.repository = InMemoryDeployTaskRepository()
+        settings = make_settings()
+        self.service = DeployService(self.repository, settings)
+        self.relay = TaskChangeRelay(self.service, poll_seconds=0.01)
+
+    async def asyncTearDown(self) -> None:  # noqa: N802
+        await self.relay.stop()
+
+    def test_flattened_updates_map_to_pipeline_events(self) -> None:
+        change = {
+            "task_id": "task-1",
+            "operation": "update",
+            "status": "failed",
+            "updated": {
+                "status": "failed",
+                "error_log": "npm ERR!",
+                "metadata.running_build.live_output.description": "Build",
+                "metadata.running_build.live_output.command": "npm run build",
+                "metadata.running_build.live_output.log_ref.step_id": "abc",
+                "metadata.running_build.live_output.stdout": "compiled\nbuilt",
+                "metadata.running_build.live_output.stdout_lines": 2,
+                "metadata.running_build.live_output.running": False,
+                "metadata.running_build.live_output.returncode": 1,
+                "metadata.running_build.live_output.duration_seconds": 3.5,
+                "metadata.running_build.timestamp": "2024-05-01T09:00:00",
+            },
+        }
+
+        step = {"stage": "running_build", "description": "Build"}
+        self.assertEqual(
+            events_for_change(change),
+            [
+                ("status", {"status": "failed", "terminal": True, "error_log": "npm ERR!"}),
+                ("step_started", {**step, "command": "npm run build"}),
+                ("log", {**step, "stream": "stdout", "lines": ["compiled", "built"]}),
+                ("step_finished", {**step, "returncode": 1, "duration_seconds": 3.5}),
+            ],
+        )
+
+    def test_live_output_flushes_relay_only_new_lines(self) -> None:
+        steps: dict = {}
+
+        def flush(stdout: str, total: int) -> list:
+            prefix = "metadata.running_build.live_output"
+            updated = {f"{prefix}.log_ref": {"step_id": "abc"}, f"{prefix}.running": True}
+            updated.update({f"{prefix}.stdout": stdout, f"{prefix}.stdout_lines": total})
+            change = {"task_id": "task-1", "operation": "update", "status": None, "updated": updated}
+            return events_for_change(change, steps)
+
+        first = flush("a\nb", 2)
+        second = flush("b\nc\nd", 4)  # the stored tail overlaps what was already sent
+        unchanged = flush("b\nc\nd", 4)
+
+        self.assertEqual([event_type for event_type, _ in first], ["step_started", "log"])
+        log = {"stage": "running_build", "description": None, "stream": "stdout", "lines": ["c", "d"]}
+        self.assertEqual(second, [("log", log)])
+        self.assertEqual(unchanged, [])
+
+    async def test_writes_from_other_processes_reach_subscribers(self) -> None:
+        await self.repository.create_task(DeployTaskCreate(task_id="remote"))
+        await self.repository.create_task(DeployTaskCreate(task_id="local"))
+        self.service.events.mark_local("local")
+        subscription = self.service.subscribe_task_events("remote")
+        local_subscription = self.service.subscribe_task_events("local")
+        self.relay.start()
+        await subscription.get(timeout=0.05)  # let the relay attach at the current end of the log
+
+        await self.repository.transition_status("remote", DeployStatus.RUNNING_CLONE)
+        live_output = {"log_ref": {"step_id": "s1"}, "stdout": "Cloning", "stdout_lines": 1}
+        await self.repository.update_task(
+            "remote", DeployTaskUpdate(append_metadata={"running_clone": {"live_output": live_output}})
+        )
+        await self.repository.transition_status("local", DeployStatus.RUNNING_CLONE)
+        await self.repository.mark_status("remote", DeployStatus.FAILED, error_log="boom")
+
+        received = []
+        while len(received) < 4:
+            event = await subscription.get(timeout=1)
+            self.assertIsNotNone(event)
+            received.append(event)
+
+        event_types = [event["type"] for event in received]
+        self.assertEqual(event_types, ["stage_started", "step_started", "log", "status"])
+        self.assertTrue(all(event["relayed"] for event in received))
+        self.assertEqual(received[2]["data"]["lines"], ["Cloning"])
+        self.assertEqual(received[3]["data"]["error_log"], "boom")
+        self.assertIsNone(await local_subscription.get(timeout=0.05))
+
+    async def test_relayed_step_events_match_the_local_ones(self) -> None:
+        settings = make_settings(DEPLOY_DRY_RUN=False, DEPLOY_LOG_FLUSH_SECONDS=30)
+        runner_service = DeployService(self.repository, settings)
+        task = await self.repository.create_task(DeployTaskCreate(task_id="streamed"))
+        local = runner_service.subscribe_task_events(task.task_id)
+        relayed = self.service.subscribe_task_events(task.task_id)
+        self.relay.start()
+        await relayed.get(timeout=0.05)  # let the relay attach at the current end of the log
+
+        with runner_service._stage_log_target(task.task_id, DeployStatus.RUNNING_BUILD):
+            await runner_service._run_command(
+                [sys.executable, "-c", "print('compiling'); print('done')"], description="Build"
+            )
+
+        async def drain(subscription: Any, count: int) -> list:
+            events = []
+            while len(events) < count:
+                event = await subscription.get(timeout=1)
+                self.assertIsNotNone(event)
+                events.append(event)
+            return events
+
+        local_events = await drain(local, 3)
+        relayed_events = await drain(relayed, 3)
+        for local_event, relayed_event in zip(local_events, relayed_events):
+            self.assertEqual(relayed_event["type"], local_event["type"])
+            self.assertEqual(relayed_event["data"].keys(), local_event["data"].keys())
+            local_event["data"].pop("duration_seconds", None)
+            relayed_event["data"].pop("duration_seconds", None)
+            self.assertEqual(relayed_event["data"], local_event["data"])
+        self.assertEqual([event["type"] for event in local_events], ["step_started", "log", "step_finished"])
+
+    async def test_task_coalesced_here_but_run_elsewhere_is_still_relayed(self) -> None:
+        settings = make_settings(DEPLOY_QUEUE_WORKER_ID="api-worker")
+        api_queue = DeployQueue(self.service, settings)
+        runner_service = DeployService(self.repository, settings)
+        runner_settings = settings.model_copy(update={"deploy_queue_worker_id": "runner"})
+        runner_queue = DeployQueue(runner_service, runner_settings)
+        self.relay.start()
+
+        task, _ = await api_queue.submit_deploy("deploy")
+        _, absorbing_job = await api_queue.submit_deploy("deploy")  # publishes "coalesced" on this worker
+        self.assertIsNotNone(absorbing_job)
+        subscription = self.service.subscribe_task_events(task.task_id)
+        await subscription.get(timeout=0.05)  # let the relay attach at the current end of the log
+
+        await runner_queue.run_once()
+
+        received = []
+        while True:
+            event = await subscription.get(timeout=1)
+            self.assertIsNotNone(event)
+            received.append(event)
+            if event["type"] == "status" and event["data"]["terminal"]:
+                break
+        self.assertIn("stage_started", [event["type"] for event in received])
+        self.assertTrue(all(event.get("relayed") for event in received))
+        self.assertEqual(received[-1]["data"]["status"], DeployStatus.COMPLETED.value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import unittest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+API_CODE_PATH = PROJECT_ROOT / "api-code"
+if str(API_CODE_PATH) not in sys.path:
+    sys.path.insert(0, str(API_CODE_PATH))
+
+from domain import DeployStatus
+from models import DeployTaskCreate, DeployTaskQuery
+from repositories import InMemoryDeployTaskRepository
+from services import DeployService
+from support import make_settings
+
+
+BASE_TIME = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+class TaskHistoryTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:  # noqa: N802
+        self.repository = InMemoryDeployTaskRepository()
+        self.settings = make_settings()
+        self.service = DeployService(self.repository, self.settings)
+        # Seven tasks an hour apart; two share a timestamp to exercise the _id tie-break.
+        self.task_ids: list[str] = []
+        for index in range(7):
+            task = await self.repository.create_task(
+                DeployTaskCreate(
+                    task_id=f"task-{index}",
+                    status=DeployStatus.FAILED if index == 3 else DeployStatus.PENDING,
+                    metadata={"branch": "main" if index % 2 else "deploy", "action": "deploy"},
+                    started_at=BASE_TIME + timedelta(hours=min(index, 5)),
+                )
+            )
+            self.task_ids.append(task.task_id)
+
+    async def test_cursor_pages_cover_history_without_gaps_or_repeats(self) -> None:
+        seen: list[str] = []
+        cursor = None
+        pages = 0
+        while True:
+            page = await self.service.list_task_history(DeployTaskQuery(), limit=3, cursor=cursor)
+            seen.extend(item["task_id"] for item in page["items"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), sorted(self.task_ids))
+        self.assertEqual(len(seen), len(set(seen)))
+        started = [self.repository._tasks[task_id].started_at for task_id in seen]
+        self.assertEqual(started, sorted(started, reverse=True))
+
+    async def test_filters_combine_with_cursor(self) -> None:
+        query = DeployTaskQuery(branch="main", started_after=BASE_TIME + timedelta(hours=1))
+        first = await self.service.list_task_history(query, limit=2)
+        second = await self.service.list_task_history(query, limit=2, cursor=first["next_cursor"])
+
+        branches = {item["branch"] for item in first["items"] + second["items"]}
+        self.assertEqual(branches, {"main"})
+        self.assertEqual(len(first["items"]) + len(second["items"]), 3)
+        self.assertIsNone(second["next_cursor"])
+
+        failed = await self.service.list_task_history(DeployTaskQuery(status=DeployStatus.FAILED), limit=10)
+        self.assertEqual([item["task_id"] for item in failed["items"]], [self.task_ids[3]])
+
+    async def test_malformed_cursor_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            await self.service.list_task_history(DeployTaskQuery(), cursor="not-a-cursor")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -27,6 +27,7 @@ export default function DeployPage() {
   const [isLoadingAnim, setIsLoadingAnim] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const pollRef = useRef<number | null>(null);
+  const streamRef = useRef<EventSource | null>(null);
 
   const animPath = useMemo(() => {
     const map: Record<VisualStatus, string> = {
@@ -63,6 +64,47 @@ export default function DeployPage() {
       window.clearInterval(pollRef.current);
       pollRef.current = null;
     }
+    if (streamRef.current) {
+      streamRef.current.close();
+      streamRef.current = null;
+    }
+  };
+
+  const startPolling = (id: string) => {
+    pollRef.current = window.setInterval(() => {
+      fetchStatus(id).catch((err) => {
+        console.error(err);
+        setError("상태 조회 실패");
+        clearPoll();
+      });
+    }, 3000);
+  };
+
+  // 서버 푸시(SSE)로 stage 전환을 받고, 스트림을 쓸 수 없으면 기존 폴링으로 대체합니다.
+  const subscribeStatus = (id: string) => {
+    if (typeof window === "undefined" || !("EventSource" in window)) {
+      startPolling(id);
+      return;
+    }
+    const source = new EventSource(`${API_BASE_URL}/api/v1/status/${id}/events`);
+    streamRef.current = source;
+    const onStatusEvent = (event: MessageEvent) => {
+      const payload = JSON.parse(event.data);
+      const nextStatus = payload.data?.status as DeployStatusEnum | undefined;
+      if (nextStatus) setStatus(nextStatus);
+      if (payload.data?.terminal) {
+        clearPoll();
+        fetchStatus(id).catch((err) => console.error(err));
+      }
+    };
+    source.addEventListener("snapshot", onStatusEvent);
+    source.addEventListener("stage_started", onStatusEvent);
+    source.addEventListener("status", onStatusEvent);
+    source.onerror = () => {
+      source.close();
+      streamRef.current = null;
+      if (!pollRef.current) startPolling(id);
+    };
   };
 
   const fetchStatus = async (id: string) => {
@@ -96,13 +138,7 @@ export default function DeployPage() {
       setTaskId(payload.task_id);
       setStatus(payload.status as DeployStatusEnum);
       fetchStatus(payload.task_id);
-      pollRef.current = window.setInterval(() => {
-        fetchStatus(payload.task_id).catch((err) => {
-          console.error(err);
-          setError("상태 조회 실패");
-          clearPoll();
-        });
-      }, 3000);
+      subscribeStatus(payload.task_id);
     } catch (err) {
       console.error(err);
       setError("배포 요청 실패");